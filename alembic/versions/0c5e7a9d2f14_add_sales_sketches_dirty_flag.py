@@ -0,0 +1,29 @@
+"""Add dirty flag to sales_sketches for background rebuilds
+
+Revision ID: 0c5e7a9d2f14
+Revises: f1b3d5e7a902
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c5e7a9d2f14'
+down_revision: Union[str, Sequence[str], None] = 'f1b3d5e7a902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sales_sketches', sa.Column('dirty', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('sales_sketches') as batch_op:
+        batch_op.drop_column('dirty')
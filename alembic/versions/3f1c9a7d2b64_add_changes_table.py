@@ -0,0 +1,42 @@
+"""Add changes table for incremental sync
+
+Revision ID: 3f1c9a7d2b64
+Revises: e53438f9e893
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'e53438f9e893'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('changes',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sa.String(length=10), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_changes_entity_seq', 'changes', ['entity', 'seq'], unique=False)
+
+    # Registros existentes entram no feed como "created" para que since=0 traga o estado completo
+    op.execute("INSERT INTO changes (entity, entity_id, operation) SELECT 'product', id, 'created' FROM products ORDER BY id")
+    op.execute("INSERT INTO changes (entity, entity_id, operation) SELECT 'user', id, 'created' FROM users ORDER BY id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_changes_entity_seq', table_name='changes')
+    op.drop_table('changes')
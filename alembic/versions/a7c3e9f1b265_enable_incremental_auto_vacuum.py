@@ -0,0 +1,32 @@
+"""Enable incremental auto_vacuum so deletes can return free pages
+
+Revision ID: a7c3e9f1b265
+Revises: 9e4b7c1d3a58
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f1b265'
+down_revision: Union[str, Sequence[str], None] = '9e4b7c1d3a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # auto_vacuum só muda num banco existente após VACUUM, que não roda em transação
+    with op.get_context().autocommit_block():
+        op.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        op.execute("VACUUM")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("PRAGMA auto_vacuum = NONE")
+        op.execute("VACUUM")
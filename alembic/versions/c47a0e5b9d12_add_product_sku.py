@@ -0,0 +1,32 @@
+"""Add unique sku to products
+
+Revision ID: c47a0e5b9d12
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e5b9d12'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    # Índice único: alvo do ON CONFLICT(sku) no upsert em lote
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_sku'), table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('sku')
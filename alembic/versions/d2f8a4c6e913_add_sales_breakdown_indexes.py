@@ -0,0 +1,31 @@
+"""Add composite covering indexes for sales breakdowns
+
+Revision ID: d2f8a4c6e913
+Revises: a7c3e9f1b265
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f8a4c6e913'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e9f1b265'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_sales_product_date', 'sales', ['product_id', 'sale_date', 'quantity', 'total_price'], unique=False)
+    op.create_index('ix_sales_user_date', 'sales', ['user_id', 'sale_date', 'quantity', 'total_price'], unique=False)
+    op.create_index('ix_sales_date_totals', 'sales', ['sale_date', 'product_id', 'user_id', 'quantity', 'total_price'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sales_date_totals', table_name='sales')
+    op.drop_index('ix_sales_user_date', table_name='sales')
+    op.drop_index('ix_sales_product_date', table_name='sales')
@@ -0,0 +1,43 @@
+"""Add product_prices history table with validity intervals
+
+Revision ID: f1b3d5e7a902
+Revises: d2f8a4c6e913
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b3d5e7a902'
+down_revision: Union[str, Sequence[str], None] = 'd2f8a4c6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_prices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('valid_from', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('valid_to', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_product_prices_product_valid_from', 'product_prices', ['product_id', 'valid_from'], unique=False)
+    # Preço atual de cada produto existente, vigente desde a criação
+    op.execute(
+        "INSERT INTO product_prices (product_id, price, valid_from) "
+        "SELECT id, price, COALESCE(created_at, CURRENT_TIMESTAMP) FROM products"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_prices_product_valid_from', table_name='product_prices')
+    op.drop_table('product_prices')
@@ -0,0 +1,186 @@
+"""
+Hub de broadcast em memória para o feed de vendas ao vivo (SSE)
+
+Cada evento é serializado uma única vez e o mesmo frame SSE é entregue a
+todos os assinantes. Cada assinante tem um buffer limitado; quem não
+consome a tempo é desconectado (e pode retomar via Last-Event-ID).
+O hub é local ao processo: com vários workers, cada um transmite apenas
+as vendas processadas por ele.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_BUFFER = int(os.getenv("SSE_SUBSCRIBER_BUFFER", "256"))
+KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+REPLAY_LIMIT = int(os.getenv("SSE_REPLAY_LIMIT", "1000"))
+CANCELLATION_HISTORY = int(os.getenv("SSE_CANCELLATION_HISTORY", "1000"))
+
+# Item entregue aos assinantes: (id da venda criada ou None, frame SSE)
+Frame = Tuple[Optional[int], bytes]
+
+
+def encode_event(event: str, data: str, event_id: Optional[int] = None) -> bytes:
+    """Montar frame SSE"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscriber:
+    """
+    Assinante com fila limitada
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[Frame]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    async def next_frame(self, timeout: float) -> Optional[Frame]:
+        """Aguardar próximo frame (None em caso de timeout)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BroadcastHub:
+    """
+    Hub de fan-out de eventos de vendas
+    """
+
+    def __init__(self, buffer_size: int = SUBSCRIBER_BUFFER, history_size: int = CANCELLATION_HISTORY):
+        self.buffer_size = buffer_size
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # Maior id de venda conhecido, usado como marca d'água dos cancelamentos
+        self.max_sale_id = 0
+        self._cancellations: Deque[Tuple[int, bytes]] = deque(maxlen=history_size)
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        """Registrar assinante (deve ser chamado dentro do event loop)"""
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.buffer_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Remover assinante"""
+        self._subscribers.discard(subscriber)
+
+    def publish_sale_created(self, sale_id: int, payload: str) -> None:
+        """Publicar criação de venda (id do evento = id da venda)"""
+        with self._lock:
+            self.max_sale_id = max(self.max_sale_id, sale_id)
+        self._publish((sale_id, encode_event("sale.created", payload, sale_id)))
+
+    def publish_sale_cancelled(self, sale_id: int, payload: str) -> None:
+        """
+        Publicar cancelamento de venda
+
+        Cancelamentos não têm id próprio: o frame é enviado sem "id:" para
+        que o Last-Event-ID do cliente continue apontando para a última venda
+        criada. Para retomada, é guardado com a marca d'água atual.
+        """
+        frame = encode_event("sale.cancelled", payload)
+        with self._lock:
+            watermark = max(self.max_sale_id, sale_id)
+            self._cancellations.append((watermark, frame))
+        self._publish((None, frame))
+
+    def cancellations_since(self, last_sale_id: int) -> List[bytes]:
+        """
+        Cancelamentos possivelmente não vistos por quem parou em last_sale_id
+
+        Pode reenviar cancelamentos já entregues; clientes devem tratá-los
+        de forma idempotente.
+        """
+        with self._lock:
+            return [frame for watermark, frame in self._cancellations if watermark >= last_sale_id]
+
+    def _publish(self, item: Frame) -> None:
+        self.published += 1
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(item)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, item)
+
+    def _deliver(self, item: Frame) -> None:
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Consumidor lento: desconectar em vez de bloquear o broadcast
+                subscriber.dropped = True
+                self._subscribers.discard(subscriber)
+                self.dropped += 1
+                logger.warning("Assinante SSE lento desconectado")
+
+
+sales_hub = BroadcastHub()
+
+
+async def stream_frames(
+    hub: BroadcastHub,
+    subscriber: Subscriber,
+    replay: List[bytes],
+    replayed_until: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[bytes]:
+    """
+    Gerar o corpo SSE: eventos de retomada seguidos dos eventos ao vivo
+    """
+    try:
+        yield b"retry: 3000\n\n"
+        for frame in replay:
+            yield frame
+        while not subscriber.dropped:
+            item = await subscriber.next_frame(KEEPALIVE_SECONDS)
+            if item is None:
+                if await is_disconnected():
+                    break
+                yield b": keepalive\n\n"
+                continue
+            sale_id, frame = item
+            # Vendas já enviadas na retomada
+            if sale_id is not None and sale_id <= replayed_until:
+                continue
+            yield frame
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def sale_payload(sale) -> str:
+    """Serializar venda para o feed"""
+    return json.dumps({
+        "id": sale.id,
+        "user_id": sale.user_id,
+        "product_id": sale.product_id,
+        "quantity": sale.quantity,
+        "unit_price": sale.unit_price,
+        "total_price": sale.total_price,
+        "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
+    })
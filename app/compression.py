@@ -0,0 +1,279 @@
+"""
+Middleware de compressão de respostas (gzip / brotli / zstd)
+
+Comprime respostas bufferizadas (corpo enviado em uma única mensagem, como
+JSONResponse) acima de um tamanho mínimo, escolhendo a codificação pela
+ordem de preferência do servidor entre as aceitas pelo cliente.
+Respostas com ETag são consideradas cacheáveis: o corpo comprimido é
+guardado em um cache LRU para não recomprimir páginas quentes do catálogo.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Dependências opcionais
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+# Níveis padrão: compromisso entre CPU e bytes economizados
+DEFAULT_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+def _compress_gzip(data: bytes, level: int) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compress_br(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+def _compress_zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def available_encodings() -> Dict[str, Callable[[bytes, int], bytes]]:
+    """Codificações suportadas no ambiente atual"""
+    encoders = {"gzip": _compress_gzip}
+    if brotli is not None:
+        encoders["br"] = _compress_br
+    if zstandard is not None:
+        encoders["zstd"] = _compress_zstd
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Interpretar Accept-Encoding em {codificação: q}"""
+    accepted = {}
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], preference: Iterable[str]) -> Optional[str]:
+    """Escolher a codificação preferida pelo servidor que o cliente aceita"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for coding in preference:
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class CompressedBodyCache:
+    """
+    Cache LRU de corpos comprimidos, limitado por entradas e bytes
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Tuple, body: bytes) -> None:
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressão com negociação de conteúdo
+    """
+
+    def __init__(
+        self,
+        app,
+        encodings: Iterable[str] = ("br", "zstd", "gzip"),
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        cache_size: int = 256,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.app = app
+        self.encoders = available_encodings()
+        # Mantém a ordem configurada, ignorando codificações indisponíveis
+        self.preference: List[str] = [
+            coding.strip().lower() for coding in encodings
+            if coding.strip().lower() in self.encoders
+        ]
+        self.minimum_size = minimum_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.cache = CompressedBodyCache(cache_size, cache_max_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.preference:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        accept = headers.get(b"accept-encoding", b"").decode("latin-1")
+        coding = negotiate(accept, self.preference)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, scope, coding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, coding: str, body: bytes) -> bytes:
+        return self.encoders[coding](body, self.levels[coding])
+
+
+class _CompressionResponder:
+    """Intercepta start/body de uma resposta para comprimi-la"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope, coding: str, send):
+        self.middleware = middleware
+        self.scope = scope
+        self.coding = coding
+        self._send = send
+        self.start_message = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Adiar o envio do cabeçalho até conhecer o corpo
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough or self.start_message is None:
+            await self._send(message)
+            return
+
+        start = self.start_message
+        self.start_message = None
+        body = message.get("body", b"")
+        headers = _MutableHeaders(start.get("headers") or [])
+
+        if (
+            message.get("more_body", False)
+            or start["status"] != 200
+            or headers.get("content-encoding")
+            or not _is_compressible(headers.get("content-type", ""))
+            or len(body) < self.middleware.minimum_size
+        ):
+            # Streaming, já codificado ou pequeno demais: enviar sem alterar
+            self.passthrough = True
+            if _is_compressible(headers.get("content-type", "")):
+                headers.add_vary("Accept-Encoding")
+                start = {**start, "headers": headers.raw}
+            await self._send(start)
+            await self._send(message)
+            return
+
+        etag = headers.get("etag")
+        cacheable = etag is not None and "no-store" not in headers.get("cache-control", "")
+        key = (self.scope.get("path"), self.scope.get("query_string"), etag, self.coding)
+
+        compressed = self.middleware.cache.get(key) if cacheable else None
+        if compressed is None:
+            compressed = self.middleware.compress(self.coding, body)
+            if cacheable:
+                self.middleware.cache.put(key, compressed)
+
+        headers.set("content-encoding", self.coding)
+        headers.set("content-length", str(len(compressed)))
+        headers.add_vary("Accept-Encoding")
+        if etag is not None and not etag.startswith("W/"):
+            # A representação comprimida não é idêntica byte a byte
+            headers.set("etag", f"W/{etag}")
+
+        await self._send({**start, "headers": headers.raw})
+        await self._send({"type": "http.response.body", "body": compressed})
+
+
+def _is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+class _MutableHeaders:
+    """Manipulação mínima da lista de cabeçalhos ASGI"""
+
+    def __init__(self, raw):
+        self.raw = [(bytes(k).lower(), bytes(v)) for k, v in raw]
+
+    def get(self, name: str, default=None):
+        key = name.encode("latin-1")
+        for k, v in self.raw:
+            if k == key:
+                return v.decode("latin-1")
+        return default
+
+    def set(self, name: str, value: str) -> None:
+        key = name.encode("latin-1")
+        self.raw = [(k, v) for k, v in self.raw if k != key]
+        self.raw.append((key, value.encode("latin-1")))
+
+    def add_vary(self, value: str) -> None:
+        current = self.get("vary")
+        if current is None:
+            self.set("vary", value)
+        elif value.lower() not in current.lower():
+            self.set("vary", f"{current}, {value}")
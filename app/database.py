@@ -1,32 +1,190 @@
 """
 Configuração do banco de dados SQLite
+
+Há uma engine de escrita e, opcionalmente, uma engine de leitura
+(DB_READ_SPLIT=true). A RoutingSession envia SELECTs para a leitura quando
+permitido e todo o resto para a escrita.
 """
-from sqlalchemy import create_engine
+import functools
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import Request
 import os
 
+from app import query_timeout  # noqa: F401 - instala o progress handler nas conexões SQLite
+from app.db_pool import instrument_engine, pool_options
+
 # URL do banco de dados SQLite
-DATABASE_URL = "sqlite:///./sales_portal.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sales_portal.db")
+# URL da réplica de leitura; no SQLite é derivada da principal (mode=ro)
+READER_DATABASE_URL = os.getenv("READER_DATABASE_URL")
+# Separar engines de leitura e escrita
+READ_SPLIT_ENABLED = os.getenv("DB_READ_SPLIT", "false").lower() == "true"
+# Após uma escrita, leituras da mesma sessão continuam na engine de escrita
+READ_YOUR_WRITES = os.getenv("DB_READ_YOUR_WRITES", "true").lower() == "true"
+
+# Métodos HTTP cujas leituras podem ir para a réplica
+READ_METHODS = ("GET", "HEAD")
+
+
+def _is_sqlite_file(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _enable_wal(engine) -> None:
+    """WAL permite leitores concorrentes enquanto há uma escrita em andamento"""
+    @event.listens_for(engine, "connect")
+    def _set_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+def _incremental_vacuum_for_new_files(engine) -> None:
+    """
+    Bancos novos já nascem com auto_vacuum=INCREMENTAL (app/maintenance.py)
+
+    Em bancos com tabelas o PRAGMA não tem efeito sem VACUUM; esses são
+    convertidos pela migration a7c3e9f1b265.
+    """
+    @event.listens_for(engine, "connect")
+    def _set_auto_vacuum(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.close()
+
+
+def create_reader_engine(writer_url: str, reader_url: str = None):
+    """
+    Criar engine de leitura
+
+    No SQLite usa uma conexão URI somente leitura (mode=ro) ao mesmo arquivo,
+    com query_only como proteção adicional.
+    """
+    url = make_url(reader_url or writer_url)
+    if not _is_sqlite_file(url):
+        return create_engine(url, **pool_options(url))
+    path = os.path.abspath(url.database)
+    reader = create_engine(
+        f"sqlite:///file:{path}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        **pool_options(url)
+    )
+
+    @event.listens_for(reader, "connect")
+    def _set_query_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return reader
+
+
+class RoutingSession(Session):
+    """
+    Sessão que escolhe a engine por statement
+
+    SELECTs vão para a engine de leitura quando `info["route_reads"]` está
+    ativo e a sessão não tem escrita pendente; com read-your-writes, qualquer
+    escrita fixa a sessão na engine de escrita até ser fechada.
+    """
+
+    def __init__(self, bind=None, writer=None, reader=None, read_your_writes: bool = READ_YOUR_WRITES, **kw):
+        writer = writer if writer is not None else bind
+        super().__init__(bind=writer, **kw)
+        self.writer = writer
+        self.reader = reader if reader is not None else writer
+        self.read_your_writes = read_your_writes
+
+    def _reads_allowed(self) -> bool:
+        if not self.info.get("route_reads") or self.info.get("pending_write"):
+            return False
+        return not (self.read_your_writes and self.info.get("wrote"))
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self.reader is self.writer:
+            return self.writer
+        if not self._flushing and clause is not None and clause.is_select and self._reads_allowed():
+            return self.reader
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info["wrote"] = self.info["pending_write"] = True
+        return self.writer
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(session, flush_context):
+    session.info["wrote"] = session.info["pending_write"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _clear_pending_write(session):
+    session.info.pop("pending_write", None)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _clear_pending_write_on_rollback(session):
+    session.info.pop("pending_write", None)
+
+
+def use_reader(func):
+    """
+    Permitir que as leituras da função usem a engine de leitura
+
+    A função deve receber a sessão como primeiro argumento.
+    """
+    @functools.wraps(func)
+    def wrapper(db, *args, **kwargs):
+        previous = db.info.get("route_reads")
+        db.info["route_reads"] = True
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            if previous is None:
+                db.info.pop("route_reads", None)
+            else:
+                db.info["route_reads"] = previous
+    return wrapper
+
 
 # Criar engine do SQLAlchemy
 engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Necessário para SQLite
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},  # Necessário para SQLite
+    **pool_options(DATABASE_URL)
 )
+instrument_engine(engine, "writer")
+if _is_sqlite_file(engine.url):
+    _incremental_vacuum_for_new_files(engine)
+reader_engine = engine
+if READ_SPLIT_ENABLED:
+    if _is_sqlite_file(engine.url):
+        _enable_wal(engine)
+    reader_engine = create_reader_engine(DATABASE_URL, READER_DATABASE_URL)
+    instrument_engine(reader_engine, "reader")
 
 # Criar sessionmaker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: a sessão dura uma requisição, então objetos já
+# carregados (ou devolvidos por RETURNING) são serializados após o commit
+# sem um SELECT de releitura
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, expire_on_commit=False,
+    writer=engine, reader=reader_engine
+)
 
 # Base para os modelos
 Base = declarative_base()
 
 # Dependência para obter sessão do banco
-def get_db():
+def get_db(request: Request):
     """
     Dependência para obter sessão do banco de dados
+
+    Em requisições GET/HEAD as leituras podem ir para a engine de leitura.
     """
     db = SessionLocal()
+    db.info["route_reads"] = request.method in READ_METHODS
     try:
         yield db
     finally:
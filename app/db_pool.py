@@ -0,0 +1,198 @@
+"""
+Pool de conexões configurável, com métricas e detecção de vazamentos
+
+Também exporta acertos do cache de statements compilados do SQLAlchemy.
+
+Variáveis de ambiente:
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_POOL_DEBUG e DB_POOL_LEAK_SECONDS.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+from typing import List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # segundos; -1 desativa
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# Modo debug: guardar a pilha de quem pegou a conexão e avisar retenções longas
+POOL_DEBUG = os.getenv("DB_POOL_DEBUG", os.getenv("DEBUG", "false")).lower() == "true"
+LEAK_THRESHOLD_SECONDS = float(os.getenv("DB_POOL_LEAK_SECONDS", "5"))
+
+checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Tempo de espera para obter uma conexão do pool"
+)
+checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts que excederam o timeout do pool"
+)
+hold_time = registry.histogram(
+    "db_pool_connection_hold_seconds", "Tempo entre checkout e devolução da conexão",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0),
+)
+held_too_long = registry.counter(
+    "db_pool_connections_held_too_long_total", "Conexões retidas além do limite do modo debug"
+)
+checked_out = registry.gauge("db_pool_checked_out", "Conexões em uso")
+idle = registry.gauge("db_pool_idle", "Conexões ociosas mantidas pelo pool")
+pool_overflow = registry.gauge("db_pool_overflow", "Conexões além de pool_size (negativo: capacidade não criada)")
+statement_cache = registry.counter(
+    "db_statement_cache_total", "Execuções por resultado no cache de compilação (cache_hit, cache_miss...)"
+)
+statement_cache_entries = registry.gauge("db_statement_cache_entries", "Statements compilados em cache")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mede o tempo de espera de cada checkout
+    """
+
+    metrics_label = "default"
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            checkout_timeouts.inc(engine=self.metrics_label)
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - start, engine=self.metrics_label)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+def pool_options(url) -> dict:
+    """
+    Argumentos de pool para create_engine
+
+    SQLite em memória mantém o pool padrão (conexão única por thread).
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def _origin_stack() -> str:
+    """Pilha de chamadas sem os frames do SQLAlchemy e deste módulo"""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if "sqlalchemy" not in frame.filename and frame.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames[-15:]))
+
+
+class LeakDetector:
+    """
+    Acompanha conexões em uso para medir retenção e apontar vazamentos
+    """
+
+    def __init__(self, label: str, threshold: float = LEAK_THRESHOLD_SECONDS, debug: bool = POOL_DEBUG):
+        self.label = label
+        self.threshold = threshold
+        self.debug = debug
+        self._held = {}  # id(registro) -> [início, pilha, já avisado]
+        self._lock = threading.Lock()
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self._held[id(connection_record)] = [now, _origin_stack() if self.debug else None, False]
+        if self.debug:
+            self.check(now)
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            entry = self._held.pop(id(connection_record), None)
+        if entry is None:
+            return
+        held = time.perf_counter() - entry[0]
+        hold_time.observe(held, engine=self.label)
+        if self.debug and held > self.threshold and not entry[2]:
+            held_too_long.inc(engine=self.label)
+            logger.warning("Conexão (%s) retida por %.2fs; obtida em:\n%s", self.label, held, entry[1])
+
+    def check(self, now: Optional[float] = None) -> List[dict]:
+        """Avisar conexões ainda em uso além do limite (uma vez por checkout)"""
+        now = time.perf_counter() if now is None else now
+        overdue = []
+        with self._lock:
+            for entry in self._held.values():
+                held = now - entry[0]
+                if held <= self.threshold:
+                    continue
+                overdue.append({"held_seconds": held, "stack": entry[1]})
+                if not entry[2]:
+                    entry[2] = True
+                    if self.debug:
+                        held_too_long.inc(engine=self.label)
+                        logger.warning("Conexão (%s) em uso há %.2fs; obtida em:\n%s", self.label, held, entry[1])
+        return overdue
+
+
+# Detectores por rótulo de engine
+detectors = {}
+
+
+def statement_cache_stats(label: str) -> dict:
+    """Contagem de execuções por resultado do cache de compilação"""
+    results = ("cache_hit", "cache_miss", "caching_disabled", "no_cache_key", "no_dialect_support")
+    stats = {result: int(statement_cache.value(engine=label, result=result)) for result in results}
+    total = stats["cache_hit"] + stats["cache_miss"]
+    stats["hit_ratio"] = stats["cache_hit"] / total if total else 0.0
+    return stats
+
+
+def instrument_engine(engine, label: str, threshold: float = LEAK_THRESHOLD_SECONDS, debug: bool = POOL_DEBUG) -> LeakDetector:
+    """
+    Registrar métricas de pool, cache de statements e detecção de vazamentos
+    """
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.metrics_label = label
+    detector = LeakDetector(label, threshold, debug)
+    event.listen(engine, "checkout", detector.on_checkout)
+    event.listen(engine, "checkin", detector.on_checkin)
+    detectors[label] = detector
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _count_cache(conn, cursor, statement, parameters, context, executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit is not None:
+            statement_cache.inc(engine=label, result=cache_hit.name.lower())
+
+    statement_cache_entries.set_function(lambda: len(getattr(engine, "_compiled_cache", None) or ()), engine=label)
+
+    checked_out.set_function(lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0, engine=label)
+    idle.set_function(lambda: engine.pool.checkedin() if hasattr(engine.pool, "checkedin") else 0, engine=label)
+    pool_overflow.set_function(lambda: engine.pool.overflow() if hasattr(engine.pool, "overflow") else 0, engine=label)
+    return detector
+
+
+def check_held_connections() -> List[dict]:
+    """Verificar todas as engines instrumentadas"""
+    overdue = []
+    for label, detector in list(detectors.items()):
+        overdue.extend(dict(item, engine=label) for item in detector.check())
+    return overdue
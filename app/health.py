@@ -0,0 +1,200 @@
+"""
+Sondas de liveness e readiness
+
+`/health/live` só indica que o processo responde. `/health/ready` indica se
+o worker deve receber tráfego: inicialização concluída, ping ao banco
+dentro do limite de latência, pool sem saturação, WAL abaixo do limite e
+fila de escritas do limitador de taxa curta.
+
+O ping (`PRAGMA schema_version`) lê o cabeçalho do arquivo e por isso
+precisa do lock de leitura: um arquivo bloqueado aparece como ping lento.
+O resultado fica em cache por HEALTH_CACHE_SECONDS e só um ping roda por
+vez, numa thread própria; um ping travado não é repetido até terminar.
+Assim sondas frequentes, de vários balanceadores, não geram carga.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+from app import startup
+from app.database import engine, reader_engine
+from app.metrics import registry
+from app.rate_limit import queued
+
+logger = logging.getLogger(__name__)
+
+# Validade do último resultado (segundos)
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "1"))
+# Espera máxima pelo ping; acima disso o worker fica fora
+HEALTH_DB_TIMEOUT = float(os.getenv("HEALTH_DB_TIMEOUT", "1"))
+# Latência do ping acima da qual o worker fica fora (ms)
+HEALTH_DB_LATENCY_MS = float(os.getenv("HEALTH_DB_LATENCY_MS", "250"))
+# Fração de conexões em uso (pool_size + max_overflow)
+HEALTH_POOL_SATURATION = float(os.getenv("HEALTH_POOL_SATURATION", "0.9"))
+# Tamanho do arquivo -wal (MB)
+HEALTH_WAL_MAX_MB = float(os.getenv("HEALTH_WAL_MAX_MB", "256"))
+# Requisições de escrita aguardando vaga no limitador de taxa
+HEALTH_WRITER_QUEUE_MAX = int(os.getenv("HEALTH_WRITER_QUEUE_MAX", "64"))
+
+# Classes do limitador que disputam a engine de escrita
+WRITER_CLASSES = ("sales_write", "write")
+
+ready_state = registry.gauge("health_ready", "Último resultado da sonda de readiness (1 pronto, 0 fora)")
+ping_latency = registry.histogram(
+    "health_db_ping_seconds", "Latência do ping da sonda de readiness",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+def pool_status(engine) -> Optional[dict]:
+    """Conexões em uso e saturação do pool (None para pools sem limite)"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return None
+    capacity = pool.size() + pool._max_overflow
+    in_use = pool.checkedout()
+    return {"checked_out": in_use, "capacity": capacity, "saturation": round(in_use / capacity, 3)}
+
+
+def wal_size(engine) -> Optional[int]:
+    """Tamanho do arquivo -wal em bytes (None fora de SQLite em arquivo)"""
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    try:
+        return os.path.getsize(f"{url.database}-wal")
+    except OSError:
+        return 0
+
+
+def writer_queue() -> int:
+    """Requisições de escrita aguardando vaga no limitador de taxa"""
+    return int(sum(queued.value(priority=name) for name in WRITER_CLASSES))
+
+
+def ping(engine) -> float:
+    """Executar o ping e retornar a latência em segundos"""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA schema_version").scalar()
+    return time.perf_counter() - start
+
+
+class ReadinessProbe:
+    """
+    Avaliação de readiness com cache e ping único em andamento
+    """
+
+    def __init__(
+        self,
+        engine,
+        reader=None,
+        cache_seconds: float = HEALTH_CACHE_SECONDS,
+        db_timeout: float = HEALTH_DB_TIMEOUT,
+        max_latency_ms: float = HEALTH_DB_LATENCY_MS,
+        pool_saturation: float = HEALTH_POOL_SATURATION,
+        wal_max_bytes: float = HEALTH_WAL_MAX_MB * 1024 * 1024,
+        writer_queue_max: int = HEALTH_WRITER_QUEUE_MAX,
+        is_started: Callable[[], bool] = startup.is_ready,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engines = {"writer": engine}
+        if reader is not None and reader is not engine:
+            self.engines["reader"] = reader
+        self.cache_seconds = cache_seconds
+        self.db_timeout = db_timeout
+        self.max_latency_ms = max_latency_ms
+        self.pool_saturation = pool_saturation
+        self.wal_max_bytes = wal_max_bytes
+        self.writer_queue_max = writer_queue_max
+        self.is_started = is_started
+        self.clock = clock
+        self.draining = False
+        self.pings = 0
+        self._cached: Optional[Tuple[float, dict]] = None
+        self._pending: Optional[Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health-ping")
+
+    def drain(self) -> None:
+        """Encerramento: sair do balanceador antes de fechar as conexões"""
+        self.draining = True
+        self._cached = None
+
+    async def check(self) -> dict:
+        """Resultado da sonda, reaproveitado dentro de `cache_seconds`"""
+        cached = self._cached
+        if cached is not None and self.clock() - cached[0] < self.cache_seconds:
+            return cached[1]
+        result = await self._evaluate()
+        self._cached = (self.clock(), result)
+        if result["status"] != "ready":
+            logger.warning("Worker fora do balanceamento: %s", "; ".join(result["reasons"]))
+        return result
+
+    async def _ping(self) -> Tuple[Optional[float], Optional[str]]:
+        if self._pending is None or self._pending.done():
+            self._pending = self._executor.submit(ping, self.engines["writer"])
+            self.pings += 1
+        pending = self._pending
+        done, _ = await asyncio.wait({asyncio.wrap_future(pending)}, timeout=self.db_timeout)
+        if not done:
+            return None, f"sem resposta em {self.db_timeout:g}s"
+        error = pending.exception()
+        if error is not None:
+            return None, str(getattr(error, "orig", None) or error)
+        latency = pending.result()
+        ping_latency.observe(latency)
+        return latency, None
+
+    async def _evaluate(self) -> dict:
+        reasons = []
+        if self.draining:
+            reasons.append("encerrando")
+        elif not self.is_started():
+            reasons.append("inicialização em andamento")
+
+        pools = {label: pool_status(engine) for label, engine in self.engines.items()}
+        for label, status in pools.items():
+            if status is not None and status["saturation"] >= self.pool_saturation:
+                reasons.append(f"pool {label} saturado ({status['checked_out']}/{status['capacity']})")
+
+        writer_pool = pools["writer"]
+        if writer_pool is not None and writer_pool["saturation"] >= 1:
+            # Sem conexão livre o ping esperaria o timeout do pool
+            latency, error = None, "pool esgotado"
+        else:
+            latency, error = await self._ping()
+        latency_ms = round(latency * 1000, 2) if latency is not None else None
+        if error is not None:
+            reasons.append(f"banco indisponível: {error}")
+        elif latency_ms > self.max_latency_ms:
+            reasons.append(f"ping lento ({latency_ms}ms)")
+
+        wal = wal_size(self.engines["writer"])
+        if wal is not None and wal > self.wal_max_bytes:
+            reasons.append(f"WAL com {wal / 1024 / 1024:.1f}MB")
+
+        waiting = writer_queue()
+        if waiting > self.writer_queue_max:
+            reasons.append(f"fila de escrita com {waiting} requisições")
+
+        return {
+            "status": "unready" if reasons else "ready",
+            "reasons": reasons,
+            "checks": {
+                "db": {"latency_ms": latency_ms, "error": error},
+                "pool": pools,
+                "wal_bytes": wal,
+                "writer_queue": waiting,
+            },
+        }
+
+
+# Sonda das engines da aplicação
+probe = ReadinessProbe(engine, reader_engine)
+ready_state.set_function(lambda: 1 if probe._cached and probe._cached[1]["status"] == "ready" else 0)
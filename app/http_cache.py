@@ -0,0 +1,200 @@
+"""
+Suporte a GET condicional (ETag / Last-Modified)
+
+Recursos individuais usam um ETag forte derivado de id + updated_at.
+Listagens usam um ETag fraco derivado de um contador de versão por tabela,
+incrementado a cada commit que altera a tabela, de modo que a verificação
+de If-None-Match não precisa consultar o banco.
+
+Com CACHE_BUS=sqlite a versão é a da tabela cache_versions, incrementada
+na própria transação da escrita (before_commit) e recebida pelos demais
+workers via polling; todos os workers geram o mesmo ETag. No modo local o
+contador vive em memória e o ETag inclui o identificador do processo.
+"""
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.invalidation import bus
+
+# Identificador desta inicialização: sem barramento, as versões de tabela
+# vivem em memória e recomeçam a cada processo, então entram no ETag
+_BOOT_ID = os.urandom(4).hex()
+_BOOT_TIME = datetime.now(timezone.utc)
+
+_lock = threading.Lock()
+_table_versions: Dict[str, int] = {}
+_table_modified: Dict[str, datetime] = {}
+
+# Chave usada em Session.info para acumular tabelas alteradas na transação
+_TOUCHED_KEY = "http_cache_touched_tables"
+# Versões compartilhadas gravadas no before_commit, aplicadas após o commit
+_VERSIONS_KEY = "http_cache_published_versions"
+
+CACHE_CONTROL = "no-cache"
+
+# Canal de invalidação por tabela: "table:<nome>"
+CHANNEL_PREFIX = "table:"
+
+
+def get_table_version(table: str) -> int:
+    """Obter versão atual da tabela"""
+    version = _table_versions.get(table, 0)
+    if bus.enabled:
+        # Versões já existentes no banco ao iniciar o worker
+        return max(version, bus.version(CHANNEL_PREFIX + table))
+    return version
+
+
+def get_table_modified(table: str) -> datetime:
+    """Obter instante da última alteração conhecida da tabela"""
+    return _table_modified.get(table, _BOOT_TIME)
+
+
+def bump_table_version(table: str, version: Optional[int] = None) -> int:
+    """Incrementar versão da tabela (ou avançar até `version`, a compartilhada)"""
+    with _lock:
+        current = _table_versions.get(table, 0)
+        version = current + 1 if version is None else max(current, version)
+        _table_versions[table] = version
+        _table_modified[table] = datetime.now(timezone.utc)
+    return version
+
+
+def touch_tables(db: Session, *tables: str) -> None:
+    """
+    Marcar tabelas como alteradas na transação atual
+
+    Necessário para escritas feitas com statements Core (update/insert/delete),
+    que não passam pelo flush do ORM.
+    """
+    db.info.setdefault(_TOUCHED_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_touched_tables(session, flush_context):
+    """Registrar tabelas alteradas pelo flush"""
+    touched = session.info.setdefault(_TOUCHED_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            touched.add(table)
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_touched_tables(session):
+    """Incrementar as versões compartilhadas na transação que será confirmada"""
+    if not bus.enabled or session.in_nested_transaction():
+        return
+    # O flush final do commit ocorre depois deste evento: antecipá-lo
+    session.flush()
+    tables = session.info.get(_TOUCHED_KEY)
+    if tables:
+        session.info[_VERSIONS_KEY] = bus.publish_in(
+            session.connection(), *(CHANNEL_PREFIX + table for table in sorted(tables))
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_touched_tables(session):
+    """Aplicar as novas versões após o commit"""
+    # Também disparado ao liberar um SAVEPOINT: só a transação raiz conta
+    if session.in_nested_transaction():
+        return
+    tables = session.info.pop(_TOUCHED_KEY, ())
+    versions = session.info.pop(_VERSIONS_KEY, {})
+    for table in tables:
+        bump_table_version(table, versions.get(CHANNEL_PREFIX + table))
+    bus.confirm(versions)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_touched_tables(session):
+    """Descartar alterações pendentes após rollback"""
+    # Rollback de SAVEPOINT: as alterações da transação raiz continuam valendo
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_TOUCHED_KEY, None)
+    session.info.pop(_VERSIONS_KEY, None)
+
+
+def _on_remote_change(channel: str) -> None:
+    """Tabela alterada por outro processo"""
+    bump_table_version(channel[len(CHANNEL_PREFIX):], bus.version(channel))
+
+
+bus.subscribe(CHANNEL_PREFIX, _on_remote_change)
+
+
+def _digest(*parts) -> str:
+    raw = "|".join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite devolve datetimes sem fuso; os valores são gravados em UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def resource_etag(table: str, resource_id: int, version: datetime) -> str:
+    """ETag forte para um recurso individual"""
+    return f'"{_digest(table, resource_id, _as_utc(version).isoformat())}"'
+
+
+def list_etag(table: str, params: Iterable) -> str:
+    """ETag fraco para uma listagem, derivado da versão da tabela"""
+    scope = "shared" if bus.enabled else _BOOT_ID
+    return f'W/"{_digest(scope, table, get_table_version(table), *params)}"'
+
+
+def _strip_weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Avaliar If-None-Match / If-Modified-Since
+
+    If-None-Match tem precedência e usa comparação fraca (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = _strip_weak(etag)
+        return any(_strip_weak(tag.strip()) == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    """Adicionar ETag/Last-Modified à resposta"""
+    response.headers.update(_validator_headers(etag, last_modified))
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Resposta 304 sem corpo"""
+    return Response(status_code=304, headers=_validator_headers(etag, last_modified))
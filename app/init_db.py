@@ -2,7 +2,7 @@
 Script para inicializar o banco de dados
 """
 from app.database import engine, Base
-from app.models import User, Product, Sale
+from app.models import User, Product, Sale, Change, SaleSketch, SalePartition, CacheVersion
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +20,10 @@ def create_tables():
         print("   - users")
         print("   - products") 
         print("   - sales")
+        print("   - changes")
+        print("   - sales_sketches")
+        print("   - sales_partitions")
+        print("   - cache_versions")
     except Exception as e:
         logger.error(f"Erro ao criar tabelas: {e}")
         print(f"❌ Erro ao inicializar banco: {e}")
@@ -0,0 +1,245 @@
+"""
+Barramento de invalidação dos caches em memória entre processos
+
+Com `uvicorn main:app --workers N` cada worker tem seus próprios caches
+(versões de tabela do cache HTTP, snapshot analítico, partições abertas).
+Uma invalidação local também é publicada no backend e os demais processos
+a recebem por polling em até CACHE_BUS_POLL_SECONDS.
+
+Backends (CACHE_BUS):
+    local   processo único; não publica nada (padrão)
+    sqlite  tabela cache_versions no próprio banco, uma versão por canal;
+            o polling só consulta a tabela quando PRAGMA data_version indica
+            commit de outra conexão
+"""
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from app.metrics import registry
+from app.models.cache_version import CacheVersion
+
+logger = logging.getLogger(__name__)
+
+CACHE_BUS = os.getenv("CACHE_BUS", "local").lower()
+# Atraso máximo (segundos) até outro worker descartar uma entrada invalidada
+POLL_SECONDS = float(os.getenv("CACHE_BUS_POLL_SECONDS", "0.5"))
+
+invalidations = registry.counter(
+    "cache_bus_invalidations_total", "Invalidações aplicadas por origem (local ou remote)"
+)
+errors = registry.counter("cache_bus_errors_total", "Falhas ao publicar ou consultar o barramento")
+
+_SELECT_VERSIONS = select(CacheVersion.name, CacheVersion.version)
+
+
+class LocalBackend:
+    """
+    Backend de processo único: não há outros processos a avisar
+    """
+
+    def publish(self, channels: List[str]) -> Dict[str, int]:
+        return {}
+
+    def publish_in(self, conn, channels: List[str]) -> Dict[str, int]:
+        return {}
+
+    def poll(self) -> Optional[Dict[str, int]]:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteVersionsBackend:
+    """
+    Versões por canal na tabela cache_versions
+
+    A publicação incrementa a versão em uma transação curta na engine da
+    aplicação, ou na transação do chamador (`publish_in`). O polling usa uma conexão própria e persistente, necessária
+    para que PRAGMA data_version detecte commits de outras conexões.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        url = make_url(engine.url)
+        self._is_sqlite = url.get_backend_name() == "sqlite"
+        self._poll_engine = create_engine(
+            url, poolclass=StaticPool, connect_args={"check_same_thread": False}
+        ) if self._is_sqlite else engine
+        self._data_version = None
+
+    def publish(self, channels: List[str]) -> Dict[str, int]:
+        """Incrementar a versão dos canais, retornando as novas versões"""
+        with self.engine.begin() as conn:
+            return self.publish_in(conn, channels)
+
+    def publish_in(self, conn, channels: List[str]) -> Dict[str, int]:
+        """Incrementar a versão dos canais na transação de `conn` (sem commit)"""
+        versions = {}
+        for channel in channels:
+            statement = insert(CacheVersion).values(name=channel, version=1)
+            statement = statement.on_conflict_do_update(
+                index_elements=[CacheVersion.name],
+                set_={"version": CacheVersion.version + 1, "updated_at": func.now()},
+            ).returning(CacheVersion.version)
+            versions[channel] = conn.execute(statement).scalar_one()
+        return versions
+
+    def poll(self) -> Optional[Dict[str, int]]:
+        """Versões atuais de todos os canais, ou None se nada mudou desde a última consulta"""
+        with self._poll_engine.connect() as conn:
+            if self._is_sqlite:
+                data_version = conn.exec_driver_sql("PRAGMA data_version").scalar()
+                if data_version == self._data_version:
+                    return None
+                self._data_version = data_version
+            return dict(conn.execute(_SELECT_VERSIONS).all())
+
+    def close(self) -> None:
+        if self._poll_engine is not self.engine:
+            self._poll_engine.dispose()
+
+
+class InvalidationBus:
+    """
+    Assinaturas por prefixo de canal e polling em uma thread daemon
+
+    Os callbacks recebem o nome do canal e devem ser rápidos (descartar
+    entradas, marcar como obsoleto); rodam na thread de polling para
+    invalidações remotas.
+    """
+
+    def __init__(self, backend, poll_interval: float = POLL_SECONDS):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._subscribers: List[tuple] = []
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return not isinstance(self.backend, LocalBackend)
+
+    def version(self, channel: str) -> int:
+        """Última versão compartilhada conhecida do canal (0 se nunca publicada)"""
+        return self._seen.get(channel, 0)
+
+    def subscribe(self, prefix: str, callback: Callable[[str], None]) -> None:
+        """Registrar callback para canais que começam com `prefix`"""
+        self._subscribers.append((prefix, callback))
+
+    def _dispatch(self, channel: str, source: str) -> None:
+        invalidations.inc(source=source)
+        for prefix, callback in self._subscribers:
+            if channel.startswith(prefix):
+                try:
+                    callback(channel)
+                except Exception:
+                    logger.exception("Erro ao invalidar cache do canal %s", channel)
+
+    def publish(self, *channels: str) -> None:
+        """
+        Avisar os outros processos (os caches locais já foram atualizados)
+
+        Falhas são registradas e não propagadas: a escrita que originou a
+        invalidação já foi confirmada.
+        """
+        if not channels or not self.enabled:
+            return
+        try:
+            versions = self.backend.publish(list(channels))
+        except Exception:
+            errors.inc(operation="publish")
+            logger.exception("Falha ao publicar invalidação de %s", ", ".join(channels))
+            return
+        self.confirm(versions)
+
+    def publish_in(self, conn, *channels: str) -> Dict[str, int]:
+        """
+        Incrementar as versões dos canais na transação de `conn`
+
+        A publicação é confirmada junto com a escrita; após o commit, chamar
+        `confirm` com as versões retornadas. Erros são propagados.
+        """
+        if not channels or not self.enabled:
+            return {}
+        return self.backend.publish_in(conn, list(channels))
+
+    def confirm(self, versions: Dict[str, int]) -> None:
+        """Registrar versões publicadas por este processo (não voltam pelo polling)"""
+        with self._lock:
+            for channel, version in versions.items():
+                # Só avança se não houve versão de outro processo no meio
+                if self._seen.get(channel, 0) == version - 1:
+                    self._seen[channel] = version
+
+    def invalidate(self, *channels: str) -> None:
+        """Invalidar os caches locais dos canais e publicar para os demais processos"""
+        for channel in channels:
+            self._dispatch(channel, "local")
+        self.publish(*channels)
+
+    def poll(self) -> List[str]:
+        """Aplicar invalidações publicadas por outros processos"""
+        versions = self.backend.poll()
+        if not versions:
+            return []
+        with self._lock:
+            changed = [channel for channel, version in versions.items() if version > self._seen.get(channel, 0)]
+            for channel in changed:
+                self._seen[channel] = versions[channel]
+        for channel in changed:
+            self._dispatch(channel, "remote")
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception:
+                errors.inc(operation="poll")
+                logger.exception("Falha ao consultar barramento de invalidação")
+
+    def start(self) -> None:
+        """Iniciar o polling; versões já existentes servem de ponto de partida"""
+        if not self.enabled or self._thread is not None:
+            return
+        with self._lock:
+            self._seen.update(self.backend.poll() or {})
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation-bus", daemon=True)
+        self._thread.start()
+        logger.info("Barramento de invalidação iniciado (polling a cada %.2fs)", self.poll_interval)
+
+    def stop(self) -> None:
+        """Parar o polling"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.backend.close()
+
+
+def create_backend(name: str, engine=None):
+    """Criar backend pelo nome configurado em CACHE_BUS"""
+    if name == "local":
+        return LocalBackend()
+    if name == "sqlite":
+        if engine is None:
+            from app.database import engine
+        return SqliteVersionsBackend(engine)
+    raise ValueError(f"Backend de invalidação desconhecido: {name}")
+
+
+# Barramento da aplicação
+bus = InvalidationBus(create_backend(CACHE_BUS))
@@ -0,0 +1,326 @@
+"""
+Manutenção periódica do banco SQLite
+
+Uma thread iniciada no lifespan verifica a cada DB_MAINTENANCE_TICK_SECONDS
+quais tarefas estão vencidas:
+
+    optimize    PRAGMA optimize (com analysis_limit), a cada hora
+    analyze     ANALYZE completo, diário; imediato se não há estatísticas
+    vacuum      PRAGMA incremental_vacuum(N) quando há páginas livres
+                (requer auto_vacuum=INCREMENTAL, ativado por migration)
+    checkpoint  PRAGMA wal_checkpoint(TRUNCATE) em modo WAL
+    sketches    reconstrói buckets de sketches marcados como sujos, a cada minuto
+
+As tarefas rodam em janelas de pouco tráfego: checkouts do pool de escrita
+desde a verificação anterior abaixo de DB_MAINTENANCE_IDLE_RATE por
+segundo. Uma tarefa adiada por mais de DB_MAINTENANCE_MAX_DEFER intervalos
+roda mesmo com tráfego; o checkpoint, nesse caso, é PASSIVE (não espera
+leitores nem escritores).
+
+Com vários workers um lock de arquivo (`<banco>.maintenance.lock`) garante
+que só um processo faz manutenção por vez.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.db_pool import checkout_wait
+from app.metrics import registry
+from app.services import sketch_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o lock do processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DB_MAINTENANCE_ENABLED = os.getenv("DB_MAINTENANCE_ENABLED", "true").lower() == "true"
+# Intervalo entre verificações (segundos)
+DB_MAINTENANCE_TICK_SECONDS = float(os.getenv("DB_MAINTENANCE_TICK_SECONDS", "60"))
+# Checkouts por segundo abaixo dos quais o tráfego é considerado baixo
+DB_MAINTENANCE_IDLE_RATE = float(os.getenv("DB_MAINTENANCE_IDLE_RATE", "2"))
+# Intervalos de atraso tolerados antes de rodar mesmo com tráfego
+DB_MAINTENANCE_MAX_DEFER = float(os.getenv("DB_MAINTENANCE_MAX_DEFER", "3"))
+# Páginas liberadas por execução do incremental_vacuum
+DB_VACUUM_PAGES = int(os.getenv("DB_VACUUM_PAGES", "2000"))
+# Linhas examinadas por índice no ANALYZE feito pelo PRAGMA optimize
+DB_ANALYSIS_LIMIT = int(os.getenv("DB_ANALYSIS_LIMIT", "1000"))
+
+# Intervalo (segundos) de cada tarefa
+TASK_INTERVALS: Dict[str, float] = {
+    "optimize": float(os.getenv("DB_OPTIMIZE_SECONDS", "3600")),
+    "analyze": float(os.getenv("DB_ANALYZE_SECONDS", "86400")),
+    "vacuum": float(os.getenv("DB_VACUUM_SECONDS", "600")),
+    "checkpoint": float(os.getenv("DB_CHECKPOINT_SECONDS", "300")),
+    "sketches": float(os.getenv("DB_SKETCH_REPAIR_SECONDS", "60")),
+}
+
+runs = registry.counter("db_maintenance_runs_total", "Execuções de manutenção por tarefa e resultado")
+duration = registry.histogram(
+    "db_maintenance_duration_seconds", "Duração das tarefas de manutenção",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+pages_freed = registry.counter("db_maintenance_pages_freed_total", "Páginas devolvidas ao sistema pelo incremental_vacuum")
+deferred = registry.counter("db_maintenance_deferred_total", "Tarefas vencidas adiadas por tráfego")
+last_success = registry.gauge("db_maintenance_last_success_timestamp", "Último sucesso (epoch) por tarefa")
+
+
+def _pragma(conn, statement: str) -> list:
+    result = conn.exec_driver_sql(statement)
+    return result.fetchall() if result.returns_rows else []
+
+
+def run_optimize(conn, idle: bool) -> dict:
+    _pragma(conn, f"PRAGMA analysis_limit={DB_ANALYSIS_LIMIT}")
+    _pragma(conn, "PRAGMA optimize")
+    return {}
+
+
+def run_analyze(conn, idle: bool) -> dict:
+    conn.exec_driver_sql("ANALYZE")
+    conn.commit()
+    return {"tables": conn.exec_driver_sql("SELECT count(DISTINCT tbl) FROM sqlite_stat1").scalar()}
+
+
+def run_vacuum(conn, idle: bool) -> dict:
+    mode = _pragma(conn, "PRAGMA auto_vacuum")[0][0]
+    before = _pragma(conn, "PRAGMA freelist_count")[0][0]
+    if mode != 2:
+        return {"skipped": "auto_vacuum não é INCREMENTAL", "free_pages": before}
+    if before:
+        # O pysqlite executa um único passo de comandos sem colunas (uma
+        # página por passo); executescript roda o PRAGMA até o fim
+        conn.commit()
+        conn.connection.dbapi_connection.executescript(f"PRAGMA incremental_vacuum({DB_VACUUM_PAGES})")
+    after = _pragma(conn, "PRAGMA freelist_count")[0][0]
+    pages_freed.inc(before - after)
+    return {"pages_freed": before - after, "free_pages": after}
+
+
+def run_checkpoint(conn, idle: bool) -> dict:
+    if _pragma(conn, "PRAGMA journal_mode")[0][0].lower() != "wal":
+        return {"skipped": "banco não está em WAL"}
+    mode = "TRUNCATE" if idle else "PASSIVE"
+    busy, log_frames, checkpointed = _pragma(conn, f"PRAGMA wal_checkpoint({mode})")[0]
+    return {"mode": mode, "busy": bool(busy), "wal_frames": log_frames, "checkpointed": checkpointed}
+
+
+# Tarefas leves que rodam mesmo com tráfego (checkpoint em modo PASSIVE)
+BUSY_TASKS = ("checkpoint", "sketches")
+
+
+def run_sketch_repair(conn, idle: bool) -> dict:
+    if not conn.dialect.has_table(conn, "sales_sketches"):
+        return {"skipped": "tabela sales_sketches inexistente"}
+    with Session(bind=conn) as db:
+        return {"rebuilt": sketch_service.repair_dirty(db)}
+
+
+TASKS: Dict[str, Callable] = {
+    "optimize": run_optimize,
+    "analyze": run_analyze,
+    "vacuum": run_vacuum,
+    "checkpoint": run_checkpoint,
+    "sketches": run_sketch_repair,
+}
+
+
+def _lock_path(engine) -> Optional[str]:
+    url = make_url(str(engine.url))
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return os.path.abspath(url.database) + ".maintenance.lock"
+
+
+class MaintenanceScheduler:
+    """
+    Agenda de tarefas de manutenção com janelas de pouco tráfego
+    """
+
+    def __init__(
+        self,
+        engine,
+        intervals: Optional[Dict[str, float]] = None,
+        tick_seconds: float = DB_MAINTENANCE_TICK_SECONDS,
+        idle_rate: float = DB_MAINTENANCE_IDLE_RATE,
+        max_defer: float = DB_MAINTENANCE_MAX_DEFER,
+        activity: Optional[Callable[[], float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        enabled: bool = DB_MAINTENANCE_ENABLED,
+    ):
+        self.engine = engine
+        self.intervals = dict(intervals or TASK_INTERVALS)
+        self.tick_seconds = tick_seconds
+        self.idle_rate = idle_rate
+        self.max_defer = max_defer
+        self.activity = activity or (lambda: checkout_wait.count(engine="writer"))
+        self.clock = clock
+        self.enabled = enabled
+        self.last_run: Dict[str, float] = {}
+        self.last_result: Dict[str, dict] = {}
+        self._last_tick: Optional[tuple] = None  # (instante, atividade acumulada)
+        self._lock = threading.Lock()
+        self._lock_path = _lock_path(engine)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[bool]:
+        """Lock do processo e, com banco em arquivo, entre processos"""
+        if not self._lock.acquire(blocking=False):
+            yield False
+            return
+        handle = None
+        try:
+            if self._lock_path and fcntl is not None:
+                handle = open(self._lock_path, "a")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            yield True
+        finally:
+            if handle is not None:
+                handle.close()
+            self._lock.release()
+
+    def _has_statistics(self, conn) -> bool:
+        return bool(conn.exec_driver_sql(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).scalar())
+
+    def is_idle(self, now: float) -> bool:
+        """Tráfego desde a verificação anterior abaixo do limite"""
+        activity = self.activity()
+        previous, self._last_tick = self._last_tick, (now, activity)
+        if previous is None:
+            return False
+        elapsed = max(now - previous[0], 1e-9)
+        return (activity - previous[1]) / elapsed <= self.idle_rate
+
+    def due(self, now: float) -> List[str]:
+        """Tarefas vencidas"""
+        return [
+            name for name, interval in self.intervals.items()
+            if interval > 0 and now - self.last_run.get(name, -interval) >= interval
+        ]
+
+    def run(self, names: List[str], idle: bool = True) -> Dict[str, dict]:
+        """
+        Executar tarefas agora (também usado pelo disparo manual)
+
+        Levanta RuntimeError se outra manutenção estiver em andamento.
+        """
+        unknown = [name for name in names if name not in TASKS]
+        if unknown:
+            raise ValueError(f"Tarefa de manutenção desconhecida: {', '.join(unknown)}")
+        with self._exclusive() as acquired:
+            if not acquired:
+                raise RuntimeError("Manutenção já em andamento")
+            results = {}
+            with self.engine.connect() as conn:
+                for name in names:
+                    results[name] = self._run_task(conn, name, idle)
+            return results
+
+    def _run_task(self, conn, name: str, idle: bool) -> dict:
+        start = time.perf_counter()
+        try:
+            result = TASKS[name](conn, idle)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            runs.inc(task=name, result="error")
+            logger.exception("Manutenção '%s' falhou", name)
+            result = {"error": str(e)}
+        else:
+            runs.inc(task=name, result="ok")
+            result["finished_at"] = time.time()
+        elapsed = time.perf_counter() - start
+        duration.observe(elapsed, task=name)
+        result["seconds"] = round(elapsed, 3)
+        self.last_run[name] = self.clock()
+        self.last_result[name] = result
+        logger.info("Manutenção '%s' em %.3fs: %s", name, elapsed, result)
+        return result
+
+    def tick(self) -> Dict[str, dict]:
+        """Uma verificação da agenda: rodar as tarefas vencidas permitidas"""
+        now = self.clock()
+        idle = self.is_idle(now)
+        if "analyze" in self.intervals and "analyze" not in self.last_run:
+            with self.engine.connect() as conn:
+                has_statistics = self._has_statistics(conn)
+            # Planejador sem estatísticas: não esperar o primeiro intervalo
+            self.last_run["analyze"] = now if has_statistics else now - self.intervals["analyze"]
+        names = []
+        for name in self.due(now):
+            overdue = now - self.last_run.get(name, now - self.intervals[name]) >= self.intervals[name] * self.max_defer
+            if idle or overdue or name in BUSY_TASKS:
+                names.append(name)
+            else:
+                deferred.inc(task=name)
+        if not names:
+            return {}
+        try:
+            return self.run(names, idle=idle)
+        except RuntimeError:
+            return {}
+
+    def status(self) -> dict:
+        """Intervalos, última execução e resultado de cada tarefa"""
+        now = self.clock()
+        return {
+            name: {
+                "interval_seconds": interval,
+                "seconds_since_run": round(now - self.last_run[name], 1) if name in self.last_run else None,
+                "last_result": self.last_result.get(name),
+            }
+            for name, interval in self.intervals.items()
+        }
+
+    def _run_loop(self) -> None:
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Falha na agenda de manutenção")
+
+    def start(self) -> None:
+        """Iniciar a thread de manutenção; as primeiras execuções contam a partir de agora"""
+        if not self.enabled or self._thread is not None:
+            return
+        now = self.clock()
+        for name in self.intervals:
+            if name != "analyze":  # avaliado no primeiro tick (sem estatísticas: roda)
+                self.last_run.setdefault(name, now)
+        self.is_idle(now)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="db-maintenance", daemon=True)
+        self._thread.start()
+        logger.info("Manutenção do banco iniciada (verificação a cada %.0fs)", self.tick_seconds)
+
+    def stop(self) -> None:
+        """Parar a thread de manutenção"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+
+# Manutenção da engine de escrita da aplicação
+scheduler = MaintenanceScheduler(engine)
+for _name in scheduler.intervals:
+    last_success.set_function(
+        lambda name=_name: scheduler.last_result.get(name, {}).get("finished_at", 0), task=_name
+    )
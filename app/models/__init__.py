@@ -9,6 +9,11 @@ from ..database import Base
 from .user import User
 from .product import Product
 from .sale import Sale
+from .change import Change
+from .sale_sketch import SaleSketch
+from .sale_partition import SalePartition
+from .cache_version import CacheVersion
+from .product_price import ProductPrice
 
 # Exportar para facilitar importação
-__all__ = ["Base", "User", "Product", "Sale"]
+__all__ = ["Base", "User", "Product", "Sale", "Change", "SaleSketch", "SalePartition", "CacheVersion", "ProductPrice"]
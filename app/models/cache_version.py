@@ -0,0 +1,23 @@
+"""
+Modelo de dados para versões de cache compartilhadas entre processos
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class CacheVersion(Base):
+    """
+    Versão monotônica por canal de invalidação
+
+    Cada processo guarda a última versão vista; um valor maior indica que
+    outro processo invalidou o cache do canal.
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<CacheVersion(name='{self.name}', version={self.version})>"
@@ -0,0 +1,54 @@
+"""
+Modelo de dados para o log de alterações (change feed)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Index, event, insert
+from sqlalchemy.orm import object_session
+from sqlalchemy.sql import func
+from app.database import Base
+from .product import Product
+from .user import User
+
+
+class Change(Base):
+    """
+    Registro de alteração em produtos e usuários
+
+    `seq` é monotônico (AUTOINCREMENT impede reuso após deleções) e serve
+    de marca d'água para sincronização incremental.
+    """
+    __tablename__ = "changes"
+    __table_args__ = (
+        Index("ix_changes_entity_seq", "entity", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # created, updated, deleted
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Change(seq={self.seq}, entity='{self.entity}', id={self.entity_id}, op='{self.operation}')>"
+
+
+# Entidades acompanhadas pelo change feed
+TRACKED_ENTITIES = {"product": Product, "user": User}
+
+
+def _record(operation: str, entity: str):
+    def listener(mapper, connection, target):
+        # after_update também é chamado para objetos "dirty" sem alteração real
+        if operation == "updated" and not object_session(target).is_modified(target, include_collections=False):
+            return
+        connection.execute(
+            insert(Change.__table__).values(entity=entity, entity_id=target.id, operation=operation)
+        )
+    return listener
+
+
+# Gravar alterações na mesma transação da escrita
+for _entity, _model in TRACKED_ENTITIES.items():
+    event.listen(_model, "after_insert", _record("created", _entity))
+    event.listen(_model, "after_update", _record("updated", _entity))
+    event.listen(_model, "after_delete", _record("deleted", _entity))
@@ -3,6 +3,7 @@ Modelo de dados para produtos
 """
 from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from app.database import Base
 
 
@@ -13,13 +14,15 @@ class Product(Base):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String(64), unique=True, index=True)  # Código do ERP (opcional)
     name = Column(String(200), nullable=False)
     description = Column(Text)
     price = Column(Float, nullable=False)
     stock_quantity = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Precisão de microssegundos: updated_at compõe o ETag do recurso
+    updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc))
 
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', price={self.price}, stock={self.stock_quantity})>"
@@ -0,0 +1,27 @@
+"""
+Modelo de dados para o histórico de preços dos produtos
+"""
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from app.database import Base
+
+
+class ProductPrice(Base):
+    """
+    Preço de um produto num intervalo de validade [valid_from, valid_to)
+
+    valid_to = None marca o preço vigente. Consultas "preço em X" usam o
+    índice (product_id, valid_from).
+    """
+    __tablename__ = "product_prices"
+    __table_args__ = (
+        Index("ix_product_prices_product_valid_from", "product_id", "valid_from"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    price = Column(Float, nullable=False)
+    valid_from = Column(DateTime(timezone=True), nullable=False)
+    valid_to = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<ProductPrice(product_id={self.product_id}, price={self.price}, valid_from={self.valid_from})>"
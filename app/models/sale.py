@@ -1,7 +1,7 @@
 """
 Modelo de dados para vendas
 """
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -12,6 +12,13 @@ class Sale(Base):
     Modelo para vendas
     """
     __tablename__ = "sales"
+    __table_args__ = (
+        # Índices de cobertura dos agrupamentos (/sales/breakdown): chave,
+        # data e as colunas somadas, sem leitura da tabela
+        Index("ix_sales_product_date", "product_id", "sale_date", "quantity", "total_price"),
+        Index("ix_sales_user_date", "user_id", "sale_date", "quantity", "total_price"),
+        Index("ix_sales_date_totals", "sale_date", "product_id", "user_id", "quantity", "total_price"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
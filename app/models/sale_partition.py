@@ -0,0 +1,28 @@
+"""
+Modelo de dados para partições mensais arquivadas de vendas
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class SalePartition(Base):
+    """
+    Manifesto das partições frias: um arquivo SQLite comprimido por mês
+
+    min_id/max_id permitem localizar uma venda arquivada pelo id sem abrir
+    todas as partições.
+    """
+    __tablename__ = "sales_partitions"
+
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    path = Column(String(255), nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    compressed_size = Column(Integer, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<SalePartition(month='{self.month}', rows={self.row_count})>"
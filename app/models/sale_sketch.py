@@ -0,0 +1,28 @@
+"""
+Modelo de dados para sketches de vendas (estatísticas aproximadas)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Boolean, false
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class SaleSketch(Base):
+    """
+    Sketches mescláveis por dia e produto
+
+    product_id = 0 guarda o agregado de todos os produtos do dia.
+    dirty = True marca um bucket cuja atualização falhou: a manutenção o
+    reconstrói a partir das vendas.
+    """
+    __tablename__ = "sales_sketches"
+
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    product_id = Column(Integer, primary_key=True)
+    sale_count = Column(Integer, nullable=False, default=0)
+    buyers_hll = Column(LargeBinary, nullable=False)
+    value_digest = Column(LargeBinary, nullable=False)
+    dirty = Column(Boolean, nullable=False, default=False, server_default=false())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<SaleSketch(day='{self.day}', product_id={self.product_id}, sales={self.sale_count})>"
@@ -3,6 +3,7 @@ Modelo de dados para usuários
 """
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from app.database import Base
 
 
@@ -17,7 +18,8 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Precisão de microssegundos: updated_at compõe o ETag do recurso
+    updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc))
 
     def __repr__(self):
         return f"<User(id={self.id}, name='{self.name}', email='{self.email}')>"
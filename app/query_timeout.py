@@ -0,0 +1,128 @@
+"""
+Prazos por rota para statements SQLite e cancelamento na desconexão
+
+Toda conexão SQLite recebe um progress handler (sqlite3
+`set_progress_handler`) chamado a cada QUERY_PROGRESS_OPS instruções da VM.
+Sem prazo ativo o handler só lê uma ContextVar; com prazo, aborta o
+statement (OperationalError "interrupted") quando o tempo acaba ou o
+cliente desconecta.
+
+`run_with_deadline` executa a consulta no threadpool para que o event loop
+continue livre para perceber a desconexão do cliente.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Prazo padrão (segundos) das rotas analíticas
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "10"))
+# Instruções da VM entre verificações do prazo
+QUERY_PROGRESS_OPS = int(os.getenv("QUERY_PROGRESS_OPS", "10000"))
+
+aborted = registry.counter(
+    "db_queries_aborted_total", "Consultas interrompidas por rota e motivo (timeout, disconnect)"
+)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("query_deadline", default=None)
+
+
+def route_timeout(name: str) -> float:
+    """Prazo da rota: QUERY_TIMEOUT_<NOME> ou o padrão"""
+    return float(os.getenv(f"QUERY_TIMEOUT_{name.upper()}", QUERY_TIMEOUT_SECONDS))
+
+
+class QueryAborted(Exception):
+    """Consulta interrompida por prazo esgotado ou desconexão do cliente"""
+
+    def __init__(self, route: str, reason: str, timeout: float):
+        super().__init__(f"Consulta de {route} interrompida ({reason})")
+        self.route = route
+        self.reason = reason
+        self.timeout = timeout
+
+
+class QueryDeadline:
+    """
+    Prazo de uma requisição, consultado pelo progress handler
+    """
+
+    def __init__(self, timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.timeout = timeout
+        self.clock = clock
+        self.expires_at = clock() + timeout
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Cancelar a partir de outra thread (ex.: desconexão)"""
+        self._cancelled.set()
+
+    def should_abort(self) -> bool:
+        if self._cancelled.is_set():
+            self.reason = "disconnect"
+        elif self.clock() >= self.expires_at:
+            self.reason = "timeout"
+        return self.reason is not None
+
+
+def _progress_handler() -> int:
+    deadline = _current.get()
+    return 1 if deadline is not None and deadline.should_abort() else 0
+
+
+@event.listens_for(Engine, "connect")
+def _install_progress_handler(dbapi_connection, connection_record):
+    """Instalar o handler em toda conexão SQLite nova (inclui partições)"""
+    if hasattr(dbapi_connection, "set_progress_handler"):
+        dbapi_connection.set_progress_handler(_progress_handler, QUERY_PROGRESS_OPS)
+
+
+def call_with_deadline(deadline: QueryDeadline, route: str, func, *args, **kwargs):
+    """Executar `func` (síncrona) com o prazo ativo na thread atual"""
+    token = _current.set(deadline)
+    try:
+        return func(*args, **kwargs)
+    except OperationalError:
+        if deadline.reason is None:
+            raise
+        aborted.inc(route=route, reason=deadline.reason)
+        logger.warning("Consulta de %s interrompida (%s) após %.2fs", route, deadline.reason, deadline.timeout)
+        raise QueryAborted(route, deadline.reason, deadline.timeout)
+    finally:
+        _current.reset(token)
+
+
+async def _watch_disconnect(request: Request, deadline: QueryDeadline) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            deadline.cancel()
+            return
+
+
+async def run_with_deadline(request: Request, route: str, timeout: float, func, *args, **kwargs):
+    """
+    Executar consulta no threadpool com prazo e cancelamento na desconexão
+
+    Levanta QueryAborted se o statement for interrompido.
+    """
+    deadline = QueryDeadline(timeout)
+    watcher = asyncio.ensure_future(_watch_disconnect(request, deadline))
+    try:
+        return await run_in_threadpool(call_with_deadline, deadline, route, func, *args, **kwargs)
+    finally:
+        watcher.cancel()
@@ -0,0 +1,281 @@
+"""
+Limitação de taxa e descarte de carga por classe de prioridade
+
+Cada requisição é classificada (vendas > escritas > leituras > analíticas)
+por um dicionário (método, caminho), em O(1). A admissão passa por três
+etapas, todas em memória e por processo:
+
+1. Token bucket por cliente: o custo depende da classe (consultas
+   analíticas gastam mais fichas). Sem fichas: 429 com Retry-After.
+2. Fatia do limite global de requisições em andamento: classes de menor
+   prioridade só entram enquanto há folga reservada às de maior (ex.:
+   analíticas até 50% de RATE_LIMIT_MAX_INFLIGHT). Acima disso: 503.
+3. Concorrência por classe: acima do limite a requisição espera na fila
+   até o orçamento de tempo da classe; esgotado, ou fila cheia, 503 com
+   Retry-After.
+
+Rotas de longa duração (SSE) e de operação (/health, /metrics) não passam
+pelo limitador. O cliente é o endereço da conexão ou, atrás de proxy, o
+primeiro IP do cabeçalho RATE_LIMIT_CLIENT_HEADER.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.metrics import registry
+
+# Desativado por padrão: atrás de proxy, sem RATE_LIMIT_CLIENT_HEADER, todos
+# os clientes compartilhariam o bucket do endereço do proxy
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+# Fichas por segundo e capacidade do bucket de cada cliente
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "100"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "200"))
+# Requisições em andamento no processo (todas as classes)
+RATE_LIMIT_MAX_INFLIGHT = int(os.getenv("RATE_LIMIT_MAX_INFLIGHT", "64"))
+# Cabeçalho com o IP do cliente atrás de proxy (ex.: X-Forwarded-For)
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER", "").lower()
+# Clientes acompanhados; os menos recentes são descartados
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+API_PREFIX = "/api/v1"
+
+rejected = registry.counter(
+    "rate_limit_rejected_total", "Requisições recusadas por classe e motivo (tokens, overload, queue)"
+)
+queue_wait = registry.histogram(
+    "rate_limit_queue_wait_seconds", "Tempo de espera por vaga de concorrência da classe",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0),
+)
+in_flight = registry.gauge("rate_limit_in_flight", "Requisições em andamento por classe")
+queued = registry.gauge("rate_limit_queued", "Requisições aguardando vaga por classe")
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    """Política de admissão de uma classe"""
+    name: str
+    concurrency: int       # requisições simultâneas da classe
+    queue_timeout: float   # orçamento de espera na fila (segundos)
+    max_queue: int         # requisições aguardando; acima disso, descarte imediato
+    share: float           # fração de RATE_LIMIT_MAX_INFLIGHT que a classe pode ocupar
+    cost: float            # fichas consumidas por requisição
+
+
+# Da maior para a menor prioridade
+PRIORITY_CLASSES: Dict[str, PriorityClass] = {
+    "sales_write": PriorityClass("sales_write", concurrency=32, queue_timeout=2.0, max_queue=256, share=1.0, cost=1),
+    "write": PriorityClass("write", concurrency=16, queue_timeout=1.0, max_queue=64, share=0.9, cost=1),
+    "read": PriorityClass("read", concurrency=32, queue_timeout=0.5, max_queue=128, share=0.8, cost=1),
+    "analytics": PriorityClass(
+        "analytics",
+        concurrency=int(os.getenv("RATE_LIMIT_ANALYTICS_CONCURRENCY", "4")),
+        queue_timeout=float(os.getenv("RATE_LIMIT_ANALYTICS_QUEUE_SECONDS", "0.1")),
+        max_queue=8, share=0.5, cost=5,
+    ),
+}
+
+# Rotas com classe explícita (caminho sem barra final)
+ROUTE_CLASSES: Dict[Tuple[str, str], Optional[str]] = {
+    ("POST", f"{API_PREFIX}/sales"): "sales_write",
+    ("POST", f"{API_PREFIX}/sales/cancel-bulk"): "sales_write",
+    ("GET", f"{API_PREFIX}/sales/summary"): "analytics",
+    ("GET", f"{API_PREFIX}/sales/date-range"): "analytics",
+    ("GET", f"{API_PREFIX}/sales/total-value"): "analytics",
+    ("GET", f"{API_PREFIX}/sales/stats/approx"): "analytics",
+    ("GET", f"{API_PREFIX}/sales/breakdown"): "analytics",
+    # Isentas: conexões longas e rotas de operação
+    ("GET", f"{API_PREFIX}/sales/stream"): None,
+    ("GET", "/health"): None,
+    ("GET", "/health/live"): None,
+    ("GET", "/health/ready"): None,
+    ("GET", "/health/startup"): None,
+    ("GET", "/metrics"): None,
+}
+
+# Rotas com parâmetro no caminho: prefixo por método (lista curta e fixa)
+PREFIX_CLASSES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "DELETE": ((f"{API_PREFIX}/sales/", "sales_write"),),
+}
+
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Classe de prioridade da requisição (None: isenta)"""
+    if len(path) > 1 and path.endswith("/"):
+        path = path[:-1]
+    key = (method, path)
+    if key in ROUTE_CLASSES:
+        return ROUTE_CLASSES[key]
+    for prefix, name in PREFIX_CLASSES.get(method, ()):
+        if path.startswith(prefix):
+            return name
+    return "read" if method in READ_METHODS else "write"
+
+
+class TokenBuckets:
+    """
+    Token buckets por cliente com reposição preguiçosa
+
+    Cada bucket guarda [fichas, último instante]; a reposição é calculada
+    no acesso. O OrderedDict limita a memória descartando o cliente menos
+    recente (acesso e descarte em O(1)).
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = RATE_LIMIT_MAX_CLIENTS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, client: str, cost: float = 1.0) -> float:
+        """Consumir fichas; retorna 0 se permitido ou os segundos até haver fichas"""
+        now = self.clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / self.rate if self.rate > 0 else math.inf
+
+
+class ConcurrencyLimiter:
+    """
+    Vagas simultâneas de uma classe com fila limitada por tempo
+    """
+
+    def __init__(self, policy: PriorityClass):
+        self.policy = policy
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(policy.concurrency)
+        self._loop = None
+
+    async def acquire(self) -> bool:
+        """Obter vaga dentro do orçamento de espera da classe"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop and not self.active and not self.waiting:
+            # Semáforos ficam presos ao primeiro loop em que esperam
+            self._semaphore = asyncio.Semaphore(self.policy.concurrency)
+            self._loop = loop
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.active += 1
+            return True
+        if self.waiting >= self.policy.max_queue or self.policy.queue_timeout <= 0:
+            return False
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.policy.queue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+            queue_wait.observe(time.perf_counter() - start, priority=self.policy.name)
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI de limitação de taxa e descarte de carga
+    """
+
+    def __init__(
+        self,
+        app,
+        rate: float = RATE_LIMIT_RATE,
+        burst: float = RATE_LIMIT_BURST,
+        max_inflight: int = RATE_LIMIT_MAX_INFLIGHT,
+        classes: Optional[Iterable[PriorityClass]] = None,
+        client_header: str = RATE_LIMIT_CLIENT_HEADER,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.app = app
+        self.buckets = TokenBuckets(rate, burst, clock=clock)
+        self.max_inflight = max_inflight
+        self.classes = {policy.name: policy for policy in (classes or PRIORITY_CLASSES.values())}
+        self.limiters = {name: ConcurrencyLimiter(policy) for name, policy in self.classes.items()}
+        self.client_header = client_header.encode("latin-1")
+        self.inflight = 0
+        for name, limiter in self.limiters.items():
+            in_flight.set_function(lambda limiter=limiter: limiter.active, priority=name)
+            queued.set_function(lambda limiter=limiter: limiter.waiting, priority=name)
+
+    def _client(self, scope) -> str:
+        if self.client_header:
+            for key, value in scope.get("headers") or ():
+                if key == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope["method"], scope["path"])
+        policy = self.classes.get(name)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.buckets.take(self._client(scope), policy.cost)
+        if wait:
+            rejected.inc(priority=name, reason="tokens")
+            response = JSONResponse(
+                {"detail": "Limite de requisições excedido"}, status_code=429,
+                headers={"Retry-After": _retry_after(wait)},
+            )
+            await response(scope, receive, send)
+            return
+
+        if self.inflight >= self.max_inflight * policy.share:
+            await self._shed(scope, receive, send, name, "overload", 1.0)
+            return
+
+        limiter = self.limiters[name]
+        if not await limiter.acquire():
+            await self._shed(scope, receive, send, name, "queue", policy.queue_timeout)
+            return
+        self.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+            limiter.release()
+
+    async def _shed(self, scope, receive, send, name: str, reason: str, retry_after: float) -> None:
+        rejected.inc(priority=name, reason=reason)
+        response = JSONResponse(
+            {"detail": "Servidor sobrecarregado, tente novamente"}, status_code=503,
+            headers={"Retry-After": _retry_after(retry_after)},
+        )
+        await response(scope, receive, send)
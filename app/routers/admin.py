@@ -0,0 +1,93 @@
+"""
+Rotas administrativas (backups e manutenção do banco)
+
+Exigem o cabeçalho X-Admin-Token igual a ADMIN_TOKEN; sem ADMIN_TOKEN
+definido as rotas ficam desativadas.
+"""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from app import maintenance
+from app.services import backup_service
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Validar o token administrativo"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Rotas administrativas desativadas (defina ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token administrativo inválido")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/backups")
+async def create_backup(
+    compress: bool = Query(backup_service.BACKUP_COMPRESS, description="Comprimir com gzip"),
+    keep: int = Query(backup_service.BACKUP_KEEP, ge=0, description="Backups mantidos (0 mantém todos)"),
+):
+    """
+    Gerar backup online consistente do banco
+    """
+    try:
+        return await run_in_threadpool(backup_service.backup_database, compress=compress, keep=keep)
+    except backup_service.BackupInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/backups")
+async def list_backups():
+    """
+    Listar backups do mais recente ao mais antigo
+    """
+    return backup_service.list_backups()
+
+
+@router.post("/backups/{name}/verify")
+async def verify_backup(name: str):
+    """
+    Restaurar o backup num arquivo temporário e verificar integridade e registros
+    """
+    if name not in {backup["name"] for backup in backup_service.list_backups()}:
+        raise HTTPException(status_code=404, detail="Backup não encontrado")
+    try:
+        return await run_in_threadpool(
+            backup_service.verify_backup, os.path.join(backup_service.BACKUP_DIR, name)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/maintenance")
+async def maintenance_status():
+    """
+    Intervalo, última execução e resultado de cada tarefa de manutenção
+    """
+    return maintenance.scheduler.status()
+
+
+@router.post("/maintenance/{task}")
+async def run_maintenance(task: str):
+    """
+    Executar agora uma tarefa de manutenção (optimize, analyze, vacuum, checkpoint ou all)
+    """
+    names = list(maintenance.TASKS) if task == "all" else [task]
+    try:
+        return await run_in_threadpool(maintenance.scheduler.run, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,29 @@
+"""
+Rotas do change feed (sincronização incremental de produtos e usuários)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.schemas import ChangeFeed
+from app.services import change_service
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("", response_model=ChangeFeed)
+async def get_changes(
+    since: Optional[str] = Query(None, description="Token retornado na sincronização anterior (vazio para desde o início)"),
+    limit: int = Query(500, ge=1, le=5000),
+    entity: Optional[str] = Query(None, pattern="^(product|user)$", description="Filtrar por entidade"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obter produtos e usuários criados, alterados ou removidos após o token
+    """
+    try:
+        since_seq = change_service.parse_token(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return change_service.get_changes(db, since=since_seq, limit=limit, entity=entity)
@@ -1,16 +1,21 @@
 """
 Rotas para gerenciamento de produtos
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from app import http_cache, sparse_fields
 from app.database import get_db
-from app.schemas import Product, ProductCreate, ProductUpdate
-from app.services import product_service
+from app.schemas import Product, ProductCreate, ProductUpdate, ProductBulkUpsert, StockBulkUpdate
+from app.services import price_service, product_service
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Produtos por consulta de preços em lote
+MAX_PRICE_LOOKUP_IDS = 1000
+
 
 @router.post("/", response_model=Product)
 async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
@@ -23,49 +28,159 @@ async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/bulk-upsert")
+async def bulk_upsert_products(request: ProductBulkUpsert, db: Session = Depends(get_db)):
+    """
+    Criar ou atualizar produtos em lote (chave: id ou sku)
+    """
+    try:
+        return product_service.bulk_upsert_products(db, request.items, key=request.key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/stock/bulk")
+async def bulk_update_stock(request: StockBulkUpdate, db: Session = Depends(get_db)):
+    """
+    Aplicar ajustes de estoque em lote (tudo ou nada)
+    """
+    try:
+        result = product_service.bulk_update_stock(db, request.adjustments)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result["applied"]:
+        raise HTTPException(status_code=409, detail=result)
+    return result
+
+
 @router.get("/", response_model=List[Product])
 async def list_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(True),
+    fields: Optional[str] = Query(None, description="Campos retornados, separados por vírgula (ex.: id,name,price)"),
     db: Session = Depends(get_db)
 ):
     """
     Listar produtos com filtros
     """
-    return product_service.get_products(db, skip=skip, limit=limit, active_only=active_only)
+    try:
+        selected = sparse_fields.parse(fields, Product)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = http_cache.list_etag("products", ("list", skip, limit, active_only, selected))
+    last_modified = http_cache.get_table_modified("products")
+    if http_cache.is_not_modified(request, etag, last_modified):
+        return http_cache.not_modified(etag, last_modified)
+    products = product_service.get_products(db, skip=skip, limit=limit, active_only=active_only, fields=selected)
+    if selected:
+        # Resposta montada aqui: os validadores vão direto nela
+        partial = sparse_fields.list_response(Product, selected, products)
+        http_cache.set_validators(partial, etag, last_modified)
+        return partial
+    http_cache.set_validators(response, etag, last_modified)
+    return products
 
 
 @router.get("/search", response_model=List[Product])
 async def search_products(
+    request: Request,
+    response: Response,
     name: str = Query(..., description="Nome do produto para busca"),
     db: Session = Depends(get_db)
 ):
     """
     Buscar produtos por nome
     """
+    etag = http_cache.list_etag("products", ("search", name))
+    last_modified = http_cache.get_table_modified("products")
+    if http_cache.is_not_modified(request, etag, last_modified):
+        return http_cache.not_modified(etag, last_modified)
+    http_cache.set_validators(response, etag, last_modified)
     return product_service.get_products_by_name(db, name)
 
 
 @router.get("/in-stock", response_model=List[Product])
-async def get_products_in_stock(db: Session = Depends(get_db)):
+async def get_products_in_stock(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obter produtos em estoque
     """
+    etag = http_cache.list_etag("products", ("in-stock",))
+    last_modified = http_cache.get_table_modified("products")
+    if http_cache.is_not_modified(request, etag, last_modified):
+        return http_cache.not_modified(etag, last_modified)
+    http_cache.set_validators(response, etag, last_modified)
     return product_service.get_products_in_stock(db)
 
 
+@router.get("/prices")
+async def get_prices_at(
+    ids: str = Query(..., description="Ids dos produtos, separados por vírgula"),
+    at: Optional[datetime] = Query(None, description="Instante (ISO 8601; padrão: agora)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Preço vigente de vários produtos num instante
+    """
+    try:
+        product_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ids inválidos")
+    if not product_ids or len(product_ids) > MAX_PRICE_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"Informe de 1 a {MAX_PRICE_LOOKUP_IDS} ids")
+    at = price_service.utc_instant(at)
+    prices = price_service.get_prices_at(db, product_ids, at)
+    return {
+        "at": at,
+        "prices": [prices[product_id] for product_id in dict.fromkeys(product_ids) if product_id in prices],
+        "missing": [product_id for product_id in dict.fromkeys(product_ids) if product_id not in prices],
+    }
+
+
 @router.get("/{product_id}", response_model=Product)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """
     Obter produto por ID
     """
+    # Consulta leve (somente timestamps) antes de buscar a linha completa
+    version = product_service.get_product_version(db, product_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    etag = http_cache.resource_etag("products", product_id, version)
+    if http_cache.is_not_modified(request, etag, version):
+        return http_cache.not_modified(etag, version)
+
     product = product_service.get_product(db, product_id)
     if product is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    version = product.updated_at or product.created_at
+    http_cache.set_validators(response, http_cache.resource_etag("products", product_id, version), version)
     return product
 
 
+@router.get("/{product_id}/price")
+async def get_price_at(
+    product_id: int,
+    at: Optional[datetime] = Query(None, description="Instante (ISO 8601; padrão: agora)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Preço vigente do produto num instante (histórico de preços)
+    """
+    at = price_service.utc_instant(at)
+    price = price_service.get_price_at(db, product_id, at)
+    if price is None:
+        raise HTTPException(status_code=404, detail="Preço não encontrado para o produto nesse instante")
+    return {"at": at, **price}
+
+
 @router.put("/{product_id}", response_model=Product)
 async def update_product(
     product_id: int, 
@@ -1,17 +1,28 @@
 """
 Rotas para gerenciamento de vendas
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 
-from app.database import get_db
-from app.schemas import Sale, SaleCreate
-from app.services import sales_service
+from app import broadcast, sparse_fields
+from app.database import SessionLocal, get_db
+from app.schemas import Sale, SaleCreate, SaleCancelBulk
+from app.query_timeout import route_timeout, run_with_deadline
+from app.services import sales_service, sketch_service
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
+# Prazos (segundos) das consultas analíticas; QUERY_TIMEOUT_<ROTA> sobrescreve
+DATE_RANGE_TIMEOUT = route_timeout("sales_date_range")
+SUMMARY_TIMEOUT = route_timeout("sales_summary")
+TOTAL_VALUE_TIMEOUT = route_timeout("sales_total_value")
+APPROX_STATS_TIMEOUT = route_timeout("sales_stats_approx")
+BREAKDOWN_TIMEOUT = route_timeout("sales_breakdown")
+
 
 @router.post("/", response_model=Sale)
 async def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
@@ -26,16 +37,39 @@ async def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/cancel-bulk")
+async def cancel_sales_bulk(request: SaleCancelBulk, db: Session = Depends(get_db)):
+    """
+    Cancelar vendas em lote por ids ou filtros (estornar estoque)
+    """
+    if request.start_date and request.end_date and request.start_date > request.end_date:
+        raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
+    try:
+        return sales_service.cancel_sales_bulk(db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/", response_model=List[Sale])
 async def list_sales(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Campos retornados, separados por vírgula (ex.: id,total_price,sale_date)"),
     db: Session = Depends(get_db)
 ):
     """
     Listar todas as vendas
     """
-    return sales_service.get_sales(db, skip=skip, limit=limit)
+    try:
+        selected = sparse_fields.parse(fields, Sale)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    sales = sales_service.get_sales(db, skip=skip, limit=limit, fields=selected)
+    if selected:
+        return sparse_fields.list_response(Sale, selected, sales)
+    return sales
 
 
 @router.get("/user/{user_id}", response_model=List[Sale])
@@ -56,6 +90,7 @@ async def get_sales_by_product(product_id: int, db: Session = Depends(get_db)):
 
 @router.get("/date-range")
 async def get_sales_by_date_range(
+    request: Request,
     start_date: date = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: date = Query(..., description="Data final (YYYY-MM-DD)"),
     db: Session = Depends(get_db)
@@ -66,7 +101,10 @@ async def get_sales_by_date_range(
     if start_date > end_date:
         raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
     
-    sales = sales_service.get_sales_by_date_range(db, start_date, end_date)
+    sales = await run_with_deadline(
+        request, "sales_date_range", DATE_RANGE_TIMEOUT,
+        sales_service.get_sales_by_date_range, db, start_date, end_date
+    )
     return {
         "start_date": start_date,
         "end_date": end_date,
@@ -83,10 +121,74 @@ async def get_sales_today(db: Session = Depends(get_db)):
     return sales_service.get_sales_today(db)
 
 
+@router.get("/stream")
+async def stream_sales(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Retomar após este id de venda"),
+):
+    """
+    Feed ao vivo de vendas e cancelamentos (Server-Sent Events)
+
+    Sem `Depends(get_db)`: a dependência só seria fechada no fim do stream e
+    cada cliente reconectado prenderia uma conexão do pool. A retomada usa
+    uma sessão própria, fechada antes de a resposta começar.
+    """
+    header_id = request.headers.get("last-event-id")
+    if header_id:
+        try:
+            last_event_id = int(header_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido")
+
+    # Assinar antes da retomada para não perder eventos entre as duas etapas
+    hub = broadcast.sales_hub
+    subscriber = hub.subscribe()
+    replay = []
+    replayed_until = last_event_id or 0
+    try:
+        if last_event_id is not None:
+            missed = await run_in_threadpool(_load_missed_sales, last_event_id)
+            if len(missed) > broadcast.REPLAY_LIMIT:
+                # Muitas vendas perdidas: cliente deve recarregar o estado completo
+                replay.append(broadcast.encode_event("reset", "{}"))
+                replayed_until = hub.max_sale_id
+            else:
+                for sale in missed:
+                    replay.append(broadcast.encode_event("sale.created", broadcast.sale_payload(sale), sale.id))
+                    replayed_until = sale.id
+                replay.extend(hub.cancellations_since(last_event_id))
+    except Exception:
+        hub.unsubscribe(subscriber)
+        raise
+
+    return StreamingResponse(
+        broadcast.stream_frames(hub, subscriber, replay, replayed_until, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _load_missed_sales(last_event_id: int):
+    """Vendas após o id, numa sessão de curta duração"""
+    db = SessionLocal()
+    try:
+        return sales_service.get_sales_after(db, last_event_id, limit=broadcast.REPLAY_LIMIT + 1)
+    finally:
+        db.close()
+
+
+def _load_summary(db: Session, start_date: Optional[date], end_date: Optional[date], group_by: Optional[str]):
+    summary = sales_service.get_sales_summary(db, start_date, end_date)
+    groups = sales_service.get_sales_grouped(db, group_by, start_date, end_date) if group_by else None
+    return summary, groups
+
+
 @router.get("/summary")
 async def get_sales_summary(
+    request: Request,
     start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
+    group_by: Optional[str] = Query(None, pattern="^(product|user|day)$", description="Agrupar por product, user ou day"),
     db: Session = Depends(get_db)
 ):
     """
@@ -95,19 +197,25 @@ async def get_sales_summary(
     if start_date and end_date and start_date > end_date:
         raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
     
-    summary = sales_service.get_sales_summary(db, start_date, end_date)
+    summary, groups = await run_with_deadline(
+        request, "sales_summary", SUMMARY_TIMEOUT, _load_summary, db, start_date, end_date, group_by
+    )
     
-    return {
+    result = {
         "period": {
             "start_date": start_date,
             "end_date": end_date
         },
         "summary": summary
     }
+    if group_by:
+        result["groups"] = groups
+    return result
 
 
 @router.get("/total-value")
 async def get_total_sales_value(
+    request: Request,
     start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
     db: Session = Depends(get_db)
@@ -118,7 +226,10 @@ async def get_total_sales_value(
     if start_date and end_date and start_date > end_date:
         raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
     
-    total_value = sales_service.get_total_sales_value(db, start_date, end_date)
+    total_value = await run_with_deadline(
+        request, "sales_total_value", TOTAL_VALUE_TIMEOUT,
+        sales_service.get_total_sales_value, db, start_date, end_date
+    )
     
     return {
         "period": {
@@ -129,6 +240,77 @@ async def get_total_sales_value(
     }
 
 
+@router.get("/stats/approx")
+async def get_approx_stats(
+    request: Request,
+    start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
+    product_id: Optional[int] = Query(None, description="Restringir a um produto"),
+    percentiles: str = Query("50,90,99", description="Percentis do valor do pedido, separados por vírgula"),
+    db: Session = Depends(get_db)
+):
+    """
+    Estatísticas aproximadas: compradores distintos (HyperLogLog) e percentis do valor (t-digest)
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
+    try:
+        requested = [int(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentis inválidos")
+    if not requested or any(p < 0 or p > 100 for p in requested):
+        raise HTTPException(status_code=400, detail="Percentis devem estar entre 0 e 100")
+
+    stats = await run_with_deadline(
+        request, "sales_stats_approx", APPROX_STATS_TIMEOUT,
+        sketch_service.get_approx_stats, db, start_date, end_date, product_id, requested
+    )
+    return {
+        "period": {
+            "start_date": start_date,
+            "end_date": end_date
+        },
+        "product_id": product_id,
+        # Sketches não permitem remoção: vendas canceladas continuam contabilizadas
+        "includes_cancelled": True,
+        **stats
+    }
+
+
+@router.get("/breakdown")
+async def get_sales_breakdown(
+    request: Request,
+    group_by: str = Query("product", pattern="^(product|user|day)$", description="Agrupar por product, user ou day"),
+    start_date: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
+    sort: str = Query("key", pattern="^(key|count|quantity|revenue)$", description="Ordenar por key, count, quantity ou revenue"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Direção da ordenação"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    db: Session = Depends(get_db)
+):
+    """
+    Totais agrupados (vendas, quantidade, receita e preço médio) com nomes, paginados por cursor
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Data inicial deve ser anterior à data final")
+    try:
+        breakdown = await run_with_deadline(
+            request, "sales_breakdown", BREAKDOWN_TIMEOUT,
+            sales_service.get_sales_breakdown, db, group_by, start_date, end_date,
+            sort=sort, descending=order == "desc", limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "period": {
+            "start_date": start_date,
+            "end_date": end_date
+        },
+        **breakdown
+    }
+
+
 @router.get("/{sale_id}", response_model=Sale)
 async def get_sale(sale_id: int, db: Session = Depends(get_db)):
     """
@@ -145,7 +327,10 @@ async def cancel_sale(sale_id: int, db: Session = Depends(get_db)):
     """
     Cancelar venda (estornar estoque)
     """
-    success = sales_service.cancel_sale(db, sale_id)
+    try:
+        success = sales_service.cancel_sale(db, sale_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not success:
         raise HTTPException(status_code=404, detail="Venda não encontrada")
     return {"message": "Venda cancelada com sucesso"}
@@ -1,13 +1,18 @@
 """
 Rotas para gerenciamento de usuários
 """
-from fastapi import APIRouter, Depends, HTTPException
+import codecs
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import AsyncIterator, List, Optional
 
+from app import http_cache
 from app.database import get_db
 from app.models import User as UserModel
 from app.schemas import User, UserCreate, UserUpdate
+from app.services import user_service
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -30,23 +35,97 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Ler o corpo da requisição linha a linha sem carregá-lo inteiro"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+@router.post("/bulk")
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson ou csv (padrão: pelo Content-Type)"),
+    chunk_size: int = Query(user_service.IMPORT_CHUNK_SIZE, ge=1, le=50000),
+    db: Session = Depends(get_db)
+):
+    """
+    Importar usuários em lote a partir de NDJSON ou CSV (corpo em streaming)
+
+    O corpo é lido no event loop; a gravação de cada lote roda no threadpool.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    try:
+        parser = user_service.RecordParser(format)
+        importer = user_service.UserImporter(db, chunk_size=chunk_size)
+        line_number = 0
+        async for line in _iter_lines(request):
+            line_number += 1
+            try:
+                record = parser.parse(line)
+            except ValueError as e:
+                if parser.fmt == "csv" and parser.header is None:
+                    raise
+                importer.invalid(line_number, str(e))
+                continue
+            if record is not None and importer.add(line_number, record):
+                await run_in_threadpool(importer.flush)
+        return await run_in_threadpool(importer.finish)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Corpo da requisição deve estar em UTF-8")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/", response_model=List[User])
-async def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def list_users(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
     """
     Listar todos os usuários
     """
+    etag = http_cache.list_etag("users", ("list", skip, limit))
+    last_modified = http_cache.get_table_modified("users")
+    if http_cache.is_not_modified(request, etag, last_modified):
+        return http_cache.not_modified(etag, last_modified)
+    http_cache.set_validators(response, etag, last_modified)
     users = db.query(UserModel).offset(skip).limit(limit).all()
     return users
 
 
 @router.get("/{user_id}", response_model=User)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obter usuário por ID
     """
+    # Consulta leve (somente timestamps) antes de buscar a linha completa
+    row = db.query(UserModel.updated_at, UserModel.created_at).filter(UserModel.id == user_id).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    version = row.updated_at or row.created_at
+    etag = http_cache.resource_etag("users", user_id, version)
+    if http_cache.is_not_modified(request, etag, version):
+        return http_cache.not_modified(etag, version)
+
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if user is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    version = user.updated_at or user.created_at
+    http_cache.set_validators(response, http_cache.resource_etag("users", user_id, version), version)
     return user
 
 
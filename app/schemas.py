@@ -2,8 +2,8 @@
 Schemas Pydantic para validação de dados
 """
 from pydantic import BaseModel, EmailStr
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Literal, Optional
 
 
 # Schemas para User
@@ -34,6 +34,7 @@ class User(UserBase):
 
 # Schemas para Product
 class ProductBase(BaseModel):
+    sku: Optional[str] = None
     name: str
     description: Optional[str] = None
     price: float
@@ -45,6 +46,7 @@ class ProductCreate(ProductBase):
 
 
 class ProductUpdate(BaseModel):
+    sku: Optional[str] = None
     name: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
@@ -62,6 +64,30 @@ class Product(ProductBase):
         from_attributes = True
 
 
+class ProductUpsertItem(BaseModel):
+    id: Optional[int] = None
+    sku: Optional[str] = None
+    name: str
+    description: Optional[str] = None
+    price: float
+    stock_quantity: int = 0
+    is_active: bool = True
+
+
+class ProductBulkUpsert(BaseModel):
+    key: Literal["id", "sku"] = "sku"  # Coluna usada para identificar o produto existente
+    items: List[ProductUpsertItem]
+
+
+class StockAdjustment(BaseModel):
+    product_id: int
+    quantity_change: int
+
+
+class StockBulkUpdate(BaseModel):
+    adjustments: List[StockAdjustment]
+
+
 # Schemas para Sale
 class SaleBase(BaseModel):
     user_id: int
@@ -78,6 +104,14 @@ class SaleCreate(BaseModel):
     unit_price: Optional[float] = None  # Opcional - usa preço do produto se não fornecido
 
 
+class SaleCancelBulk(BaseModel):
+    ids: Optional[List[int]] = None  # Ids específicos; combinável com os filtros abaixo
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    user_id: Optional[int] = None
+    product_id: Optional[int] = None
+
+
 class Sale(BaseModel):
     id: int
     user_id: int
@@ -90,3 +124,19 @@ class Sale(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Schemas para o change feed
+class ChangeEntry(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    operation: str
+    changed_at: Optional[datetime] = None
+    data: Optional[dict] = None  # Estado atual; None para deleções (tombstones)
+
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeEntry]
+    next_token: str
+    has_more: bool
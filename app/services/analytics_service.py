@@ -0,0 +1,184 @@
+"""
+Motor analítico opcional: snapshot colunar das vendas em arrays NumPy
+
+Mantém em memória as colunas id, user_id, product_id, quantity, valor em
+centavos e dia (dias desde 1970-01-01), ordenadas por dia. A atualização é
+incremental (somente vendas com id maior que o último visto); cancelamentos
+invalidam o snapshot, que é reconstruído na próxima consulta.
+Ativado com SALES_ANALYTICS_ENGINE=numpy quando o NumPy está instalado.
+"""
+import os
+import threading
+from itertools import chain
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.invalidation import bus
+from app.services import partition_service
+
+# Dependência opcional, importada só quando o motor é usado: o import do
+# NumPy pesa na inicialização de cada worker
+np = None
+_numpy_missing = False
+
+ANALYTICS_ENGINE = os.getenv("SALES_ANALYTICS_ENGINE", "sql").lower()
+
+EPOCH = date(1970, 1, 1)
+
+# Colunas do snapshot, na ordem do SELECT abaixo
+COLUMNS = ("id", "user_id", "product_id", "quantity", "cents", "day")
+
+_SELECT_AFTER = text(
+    "SELECT id, user_id, product_id, quantity, "
+    "CAST(ROUND(total_price * 100) AS INTEGER), "
+    "CAST(julianday(COALESCE(sale_date, created_at)) - 2440587.5 AS INTEGER) "
+    "FROM sales WHERE id > :last_id ORDER BY id"
+)
+
+
+def load_numpy():
+    """Importar o NumPy sob demanda (None se não estiver instalado)"""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - depende do ambiente
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+
+def is_enabled() -> bool:
+    """Verificar se o motor NumPy está ativo"""
+    return ANALYTICS_ENGINE == "numpy" and load_numpy() is not None
+
+
+def to_epoch_day(value: date) -> int:
+    """Converter data em dias desde a época"""
+    return (value - EPOCH).days
+
+
+class SalesSnapshot:
+    """
+    Snapshot colunar da tabela de vendas
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = None
+        self.last_id = 0
+        self.stale = True
+
+    def __len__(self) -> int:
+        return 0 if self._columns is None else len(self._columns["id"])
+
+    def invalidate(self) -> None:
+        """Forçar reconstrução completa na próxima atualização"""
+        self.stale = True
+
+    def refresh(self, db: Session) -> int:
+        """
+        Atualizar snapshot, retornando quantas linhas foram anexadas
+        """
+        with self._lock:
+            rows = []
+            if self.stale:
+                self._columns = {name: np.empty(0, dtype=np.int64) for name in COLUMNS}
+                self.last_id = 0
+                self.stale = False
+                # Reconstrução completa inclui os meses arquivados
+                rows = list(partition_service.iter_partition_rows(db, _SELECT_AFTER.bindparams(last_id=0)))
+
+            rows += db.execute(_SELECT_AFTER, {"last_id": self.last_id}).fetchall()
+            if not rows:
+                return 0
+
+            block = np.fromiter(
+                chain.from_iterable(rows), dtype=np.int64, count=len(rows) * len(COLUMNS)
+            ).reshape(len(rows), len(COLUMNS))
+            columns = self._columns
+            last_day = columns["day"][-1] if len(columns["day"]) else None
+            for index, name in enumerate(COLUMNS):
+                columns[name] = np.concatenate((columns[name], block[:, index]))
+
+            # Vendas costumam chegar em ordem de data; reordenar só se necessário
+            new_days = block[:, COLUMNS.index("day")]
+            if (last_day is not None and new_days.min() < last_day) or np.any(np.diff(new_days) < 0):
+                order = np.argsort(columns["day"], kind="stable")
+                for name in COLUMNS:
+                    columns[name] = columns[name][order]
+
+            self.last_id = int(block[:, 0].max())
+            return len(rows)
+
+    def _range(self, start_date: Optional[date], end_date: Optional[date]) -> slice:
+        days = self._columns["day"]
+        lo = 0 if start_date is None else int(np.searchsorted(days, to_epoch_day(start_date), side="left"))
+        hi = len(days) if end_date is None else int(np.searchsorted(days, to_epoch_day(end_date), side="right"))
+        return slice(lo, max(lo, hi))
+
+    def summary(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
+        """Resumo de vendas no período (datas inclusivas)"""
+        with self._lock:
+            window = self._range(start_date, end_date)
+            total_sales = window.stop - window.start
+            total_cents = int(self._columns["cents"][window].sum())
+            total_quantity = int(self._columns["quantity"][window].sum())
+
+        total_value = total_cents / 100
+        return {
+            "total_sales": total_sales,
+            "total_value": total_value,
+            "total_quantity": total_quantity,
+            "average_sale_value": total_value / total_sales if total_sales > 0 else 0.0,
+        }
+
+    def group_totals(self, group_by: str, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[dict]:
+        """
+        Totais por produto, usuário ou dia usando bincount
+        """
+        column = {"product": "product_id", "user": "user_id", "day": "day"}[group_by]
+        with self._lock:
+            window = self._range(start_date, end_date)
+            keys = self._columns[column][window]
+            if len(keys) == 0:
+                return []
+            offset = int(keys.min())
+            index = keys - offset
+            counts = np.bincount(index)
+            quantity = np.bincount(index, weights=self._columns["quantity"][window])
+            cents = np.bincount(index, weights=self._columns["cents"][window])
+
+        present = np.nonzero(counts)[0]
+        groups = []
+        for position in present:
+            key = int(position) + offset
+            groups.append({
+                "key": (EPOCH + timedelta(days=key)).isoformat() if group_by == "day" else key,
+                "total_sales": int(counts[position]),
+                "total_quantity": int(quantity[position]),
+                "total_value": round(cents[position] / 100, 2),
+            })
+        return groups
+
+
+sales_snapshot = SalesSnapshot()
+
+# Canal de invalidação do snapshot (cancelamentos em qualquer worker)
+SNAPSHOT_CHANNEL = "sales_snapshot"
+bus.subscribe(SNAPSHOT_CHANNEL, lambda channel: sales_snapshot.invalidate())
+
+
+def invalidate_snapshot() -> None:
+    """Invalidar o snapshot neste processo e nos demais workers"""
+    bus.invalidate(SNAPSHOT_CHANNEL)
+
+
+def get_snapshot(db: Session) -> SalesSnapshot:
+    """Obter snapshot atualizado"""
+    sales_snapshot.refresh(db)
+    return sales_snapshot
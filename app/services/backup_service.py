@@ -0,0 +1,247 @@
+"""
+Backups online do banco SQLite
+
+Usa a API de backup do SQLite (`sqlite3.Connection.backup`): a cópia é
+consistente mesmo com o servidor gravando e é feita em passos de
+BACKUP_PAGES_PER_STEP páginas, com uma pausa de BACKUP_STEP_SLEEP entre
+eles. Em WAL os passos leem um único snapshot e as escritas das
+requisições não esperam pela cópia; sem WAL o lock de leitura só é mantido
+durante cada passo (ver `_copy`).
+
+O arquivo é gravado com nome temporário e renomeado só depois de
+verificado (integrity_check e contagem de linhas); opcionalmente
+comprimido com gzip. Os backups mais antigos além de BACKUP_KEEP são
+removidos.
+"""
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos backups
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+# Páginas copiadas por passo (páginas de 4 KiB: 256 = 1 MiB)
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+# Pausa entre passos (segundos)
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.01"))
+# Reinícios tolerados (banco sem WAL) antes de copiar o restante num único passo
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+# Backups mantidos; os mais antigos são removidos (0 mantém todos)
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+# Comprimir com gzip por padrão
+BACKUP_COMPRESS = os.getenv("BACKUP_COMPRESS", "false").lower() == "true"
+
+_NAME_PATTERN = re.compile(r"^sales_portal-\d{8}T\d{12}Z\.db(?:\.gz)?$")
+
+# Um backup por processo de cada vez
+_running = threading.Lock()
+
+
+class BackupInProgress(Exception):
+    """Já existe um backup em andamento neste processo"""
+
+
+def database_path(url: Optional[str] = None) -> str:
+    """Caminho do arquivo SQLite da URL (padrão: banco da aplicação)"""
+    url = make_url(url or DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError("Backup disponível apenas para banco SQLite em arquivo")
+    return os.path.abspath(url.database)
+
+
+def inspect_database(path: str) -> dict:
+    """
+    Integridade e tabelas (colunas e registros) de um arquivo SQLite
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        integrity = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        tables = {}
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        for name in names:
+            columns = [
+                {"name": col[1], "type": col[2], "primary_key": bool(col[5])}
+                for col in conn.execute(f'PRAGMA table_info("{name}")')
+            ]
+            count = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+            tables[name] = {"columns": columns, "rows": count}
+        return {"integrity": integrity, "ok": integrity == ["ok"], "tables": tables}
+    finally:
+        conn.close()
+
+
+@contextmanager
+def restored(path: str) -> Iterator[str]:
+    """Caminho de um arquivo SQLite legível do backup (descomprime .gz num temporário)"""
+    if not os.path.exists(path):
+        raise ValueError(f"Backup {os.path.basename(path)} não encontrado")
+    if not path.endswith(".gz"):
+        yield path
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        target = os.path.join(workdir, "restored.db")
+        with gzip.open(path, "rb") as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        yield target
+
+
+def verify_backup(path: str) -> dict:
+    """
+    Verificar um backup restaurando-o: integridade e registros por tabela
+    """
+    with restored(path) as database:
+        result = inspect_database(database)
+    return {
+        "ok": result["ok"],
+        "integrity": result["integrity"],
+        "rows": {name: table["rows"] for name, table in result["tables"].items()},
+    }
+
+
+def list_backups(backup_dir: Optional[str] = None) -> List[dict]:
+    """Backups do diretório, do mais recente ao mais antigo"""
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted((name for name in os.listdir(backup_dir) if _NAME_PATTERN.match(name)), reverse=True)
+    return [
+        {"name": name, "size": os.path.getsize(os.path.join(backup_dir, name)), "compressed": name.endswith(".gz")}
+        for name in names
+    ]
+
+
+def rotate(backup_dir: Optional[str] = None, keep: int = BACKUP_KEEP) -> List[str]:
+    """Remover backups além dos `keep` mais recentes"""
+    backup_dir = backup_dir or BACKUP_DIR
+    if keep <= 0:
+        return []
+    removed = [backup["name"] for backup in list_backups(backup_dir)[keep:]]
+    for name in removed:
+        os.remove(os.path.join(backup_dir, name))
+    return removed
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy(source_path: str, target_path: str, pages: int, step_sleep: float) -> dict:
+    """
+    Copiar com a API de backup em passos, pausando entre eles
+
+    Em WAL a conexão de origem mantém uma transação de leitura durante toda
+    a cópia: os passos leem o mesmo snapshot e as escritas seguem no WAL.
+    Sem WAL o lock é liberado entre passos e escritas recomeçam a cópia;
+    após BACKUP_MAX_RESTARTS o restante é copiado num único passo.
+    """
+    progress = {"steps": 0, "restarts": 0, "pages": 0, "remaining": None}
+
+    def on_step(status, remaining, total):
+        if progress["remaining"] is not None and remaining > progress["remaining"]:
+            progress["restarts"] += 1
+            if progress["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        progress["steps"] += 1
+        progress["pages"] = total
+        progress["remaining"] = remaining
+        if remaining and step_sleep > 0:
+            time.sleep(step_sleep)
+
+    source = sqlite3.connect(source_path, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if wal:
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        try:
+            source.backup(target, pages=pages, progress=on_step)
+        except _TooManyRestarts:
+            logger.warning("Backup reiniciado %d vezes; copiando o restante num único passo", progress["restarts"] - 1)
+            progress["remaining"] = None
+            source.backup(target, pages=-1, progress=on_step)
+        if wal:
+            source.execute("ROLLBACK")
+    finally:
+        target.close()
+        source.close()
+    del progress["remaining"]
+    progress["snapshot"] = "wal" if wal else "locks"
+    return progress
+
+
+def backup_database(
+    source_path: Optional[str] = None,
+    backup_dir: Optional[str] = None,
+    compress: bool = BACKUP_COMPRESS,
+    keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+) -> dict:
+    """
+    Gerar backup consistente, verificar, comprimir (opcional) e rotacionar
+
+    Levanta BackupInProgress se já houver um backup rodando no processo e
+    ValueError se a verificação falhar.
+    """
+    source_path = source_path or database_path()
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.exists(source_path):
+        raise ValueError("Banco de dados não encontrado")
+    if not _running.acquire(blocking=False):
+        raise BackupInProgress("Backup já em andamento")
+    try:
+        os.makedirs(backup_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        name = f"sales_portal-{stamp}.db" + (".gz" if compress else "")
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=backup_dir) as workdir:
+            raw_path = os.path.join(workdir, "backup.db")
+            copy = _copy(source_path, raw_path, pages, step_sleep)
+            copied = time.perf_counter()
+            verification = inspect_database(raw_path)
+            if not verification["ok"]:
+                raise ValueError(f"Backup inválido: {'; '.join(verification['integrity'][:5])}")
+            raw_size = os.path.getsize(raw_path)
+            if compress:
+                packed = raw_path + ".gz"
+                with open(raw_path, "rb") as src, gzip.open(packed, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst)
+                raw_path = packed
+            target = os.path.join(backup_dir, name)
+            os.replace(raw_path, target)
+        removed = rotate(backup_dir, keep)
+    finally:
+        _running.release()
+
+    result = {
+        "name": name,
+        "path": target,
+        "compressed": compress,
+        "raw_size": raw_size,
+        "size": os.path.getsize(target),
+        "copy_seconds": round(copied - start, 3),
+        "total_seconds": round(time.perf_counter() - start, 3),
+        **copy,
+        "rows": {table: info["rows"] for table, info in verification["tables"].items()},
+        "removed": removed,
+    }
+    logger.info("Backup %s gerado em %.2fs (%d passos, %d reinícios)",
+                name, result["total_seconds"], copy["steps"], copy["restarts"])
+    return result
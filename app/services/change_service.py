@@ -0,0 +1,81 @@
+"""
+Serviços para o change feed (sincronização incremental)
+"""
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional
+from app.models import Change as ChangeModel
+from app.models.change import TRACKED_ENTITIES
+from app.schemas import Product, User
+
+# Schema de serialização por entidade
+ENTITY_SCHEMAS = {"product": Product, "user": User}
+
+
+def parse_token(token: Optional[str]) -> int:
+    """
+    Converter token de sincronização em número de sequência
+    """
+    if token is None or token == "":
+        return 0
+    if not token.isdigit():
+        raise ValueError("Token de sincronização inválido")
+    return int(token)
+
+
+def record_changes(db: Session, entity: str, entity_ids: Iterable[int], operation: str) -> None:
+    """
+    Registrar alterações feitas por statements Core (que não disparam eventos do ORM)
+    """
+    rows = [{"entity": entity, "entity_id": entity_id, "operation": operation} for entity_id in entity_ids]
+    if rows:
+        db.execute(insert(ChangeModel), rows)
+
+
+def get_changes(db: Session, since: int = 0, limit: int = 500, entity: Optional[str] = None) -> dict:
+    """
+    Obter alterações após a marca d'água `since`
+
+    Varre o log pelo intervalo de `seq` (chave primária ou índice
+    entity+seq) e carrega o estado atual das entidades com um IN por tipo.
+    """
+    query = db.query(ChangeModel).filter(ChangeModel.seq > since)
+    if entity:
+        query = query.filter(ChangeModel.entity == entity)
+    page = query.order_by(ChangeModel.seq).limit(limit + 1).all()
+
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # Manter apenas a alteração mais recente de cada entidade na página
+    latest = {}
+    for change in page:
+        latest[(change.entity, change.entity_id)] = change
+    changes: List[ChangeModel] = sorted(latest.values(), key=lambda c: c.seq)
+
+    # Carregar estado atual em lote
+    current = {}
+    for name, model in TRACKED_ENTITIES.items():
+        ids = [c.entity_id for c in changes if c.entity == name and c.operation != "deleted"]
+        if ids:
+            for obj in db.query(model).filter(model.id.in_(ids)).all():
+                current[(name, obj.id)] = ENTITY_SCHEMAS[name].model_validate(obj).model_dump(mode="json")
+
+    entries = []
+    for change in changes:
+        data = current.get((change.entity, change.entity_id))
+        operation = change.operation
+        if operation != "deleted" and data is None:
+            # Removida depois desta alteração (tombstone virá em página seguinte)
+            operation = "deleted"
+        entries.append({
+            "seq": change.seq,
+            "entity": change.entity,
+            "entity_id": change.entity_id,
+            "operation": operation,
+            "changed_at": change.changed_at,
+            "data": data,
+        })
+
+    next_seq = page[-1].seq if page else since
+    return {"changes": entries, "next_token": str(next_seq), "has_more": has_more}
@@ -0,0 +1,408 @@
+"""
+Particionamento mensal das vendas: tabela quente + partições frias arquivadas
+
+A tabela `sales` guarda apenas os meses recentes (quentes). O arquivador move
+cada mês fechado para um arquivo SQLite próprio, compactado (VACUUM) e
+comprimido com gzip, registrado no manifesto `sales_partitions`. Para
+consultar, a partição é descomprimida uma vez num diretório de cache e aberta
+somente leitura (mode=ro, immutable=1). Consultas por período abrem apenas as
+partições dos meses do intervalo.
+
+Meses arquivados são somente leitura: vendas arquivadas não são canceladas.
+"""
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import (
+    Column, DateTime, Float, Index, Integer, MetaData, Table, bindparam, create_engine, delete, func, insert, select
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.invalidation import bus
+from app.models import Sale as SaleModel, SalePartition as SalePartitionModel
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos arquivos comprimidos
+ARCHIVE_DIR = os.getenv("SALES_ARCHIVE_DIR", "./archive")
+# Diretório onde as partições são descomprimidas para consulta
+ARCHIVE_CACHE_DIR = os.getenv("SALES_ARCHIVE_CACHE_DIR", os.path.join(ARCHIVE_DIR, ".cache"))
+# Meses mantidos na tabela quente, incluindo o corrente
+HOT_MONTHS = int(os.getenv("SALES_HOT_MONTHS", "3"))
+# Partições mantidas abertas simultaneamente
+OPEN_PARTITIONS = int(os.getenv("SALES_ARCHIVE_OPEN_PARTITIONS", "12"))
+
+_COPY_CHUNK_SIZE = 500
+
+# Esquema das partições: mesmas colunas de `sales`, sem chaves estrangeiras
+partition_metadata = MetaData()
+partition_sales = Table(
+    "sales", partition_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("product_id", Integer, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("unit_price", Float, nullable=False),
+    Column("total_price", Float, nullable=False),
+    Column("sale_date", DateTime(timezone=True)),
+    Column("created_at", DateTime(timezone=True)),
+)
+Index("ix_sales_sale_date", partition_sales.c.sale_date)
+Index("ix_sales_user_id", partition_sales.c.user_id)
+Index("ix_sales_product_id", partition_sales.c.product_id)
+
+# Consultas ao manifesto, executadas em toda leitura de vendas
+_SELECT_PARTITIONS_BETWEEN = select(SalePartitionModel).where(
+    SalePartitionModel.month >= bindparam("first"), SalePartitionModel.month <= bindparam("last")
+).order_by(SalePartitionModel.month)
+_SELECT_PARTITIONS_FOR_ID = select(SalePartitionModel).where(
+    SalePartitionModel.min_id <= bindparam("sale_id"), SalePartitionModel.max_id >= bindparam("sale_id")
+)
+_SELECT_PARTITIONS_BY_ID = select(SalePartitionModel).order_by(SalePartitionModel.min_id)
+
+
+def month_key(value: date) -> str:
+    """Chave YYYY-MM do mês"""
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def month_bounds(month: str):
+    """Primeiro dia do mês e primeiro dia do mês seguinte"""
+    year, number = (int(part) for part in month.split("-"))
+    start = date(year, number, 1)
+    end = date(year + number // 12, number % 12 + 1, 1)
+    return start, end
+
+
+def hot_cutoff(today: Optional[date] = None, hot_months: int = HOT_MONTHS) -> date:
+    """Primeiro dia do mês mais antigo que continua quente"""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (max(hot_months, 1) - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def day_bounds(start_date: Optional[date], end_date: Optional[date]) -> tuple:
+    """
+    Limites [início, fim) em datetime para um período de dias inclusivos
+
+    sale_date é gravado com hora; comparar com o início do dia seguinte
+    inclui as vendas feitas ao longo de end_date.
+    """
+    start = datetime.combine(start_date, time.min) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+    return start, end
+
+
+def date_range_conditions(column, start_date: Optional[date], end_date: Optional[date]) -> list:
+    """Condições de período com dias inclusivos"""
+    start, end = day_bounds(start_date, end_date)
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return conditions
+
+
+class PartitionStore:
+    """
+    Engines somente leitura das partições, com cache LRU
+    """
+
+    def __init__(self, cache_dir: str = ARCHIVE_CACHE_DIR, max_open: int = OPEN_PARTITIONS):
+        self.cache_dir = cache_dir
+        self.max_open = max_open
+        self._engines: "OrderedDict[str, tuple]" = OrderedDict()  # mês -> (versão, engine)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(partition: SalePartitionModel) -> str:
+        stamp = partition.archived_at
+        return f"{int(stamp.timestamp()) if stamp else 0}-{partition.compressed_size}"
+
+    def _extract(self, partition: SalePartitionModel, version: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        target = os.path.join(self.cache_dir, f"sales_{partition.month}.{version}.db")
+        if not os.path.exists(target):
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as dst, gzip.open(partition.path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, target)
+        return target
+
+    def engine_for(self, partition: SalePartitionModel):
+        """Engine somente leitura da partição (descomprime na primeira vez)"""
+        version = self._version(partition)
+        with self._lock:
+            cached = self._engines.get(partition.month)
+            if cached is not None and cached[0] == version:
+                self._engines.move_to_end(partition.month)
+                return cached[1]
+            if cached is not None:
+                self._drop(partition.month)
+            path = os.path.abspath(self._extract(partition, version))
+            engine = create_engine(
+                f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true",
+                connect_args={"check_same_thread": False},
+                poolclass=NullPool,
+            )
+            self._engines[partition.month] = (version, engine)
+            while len(self._engines) > self.max_open:
+                self._drop(next(iter(self._engines)))
+            return engine
+
+    def _drop(self, month: str) -> None:
+        version, engine = self._engines.pop(month)
+        engine.dispose()
+        path = os.path.join(self.cache_dir, f"sales_{month}.{version}.db")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def invalidate(self, month: str) -> None:
+        """Descartar engine e cópia descomprimida do mês"""
+        with self._lock:
+            if month in self._engines:
+                self._drop(month)
+
+    def clear(self) -> None:
+        with self._lock:
+            for month in list(self._engines):
+                self._drop(month)
+
+
+# Instância única do processo
+partition_store = PartitionStore()
+
+# Canal de invalidação por mês: "sales_partition:YYYY-MM" (o arquivamento
+# costuma rodar em outro processo)
+CHANNEL_PREFIX = "sales_partition:"
+bus.subscribe(CHANNEL_PREFIX, lambda channel: partition_store.invalidate(channel[len(CHANNEL_PREFIX):]))
+
+
+def get_partitions(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[SalePartitionModel]:
+    """
+    Partições (ordem cronológica) que podem conter vendas do período
+    """
+    return db.scalars(_SELECT_PARTITIONS_BETWEEN, {
+        "first": month_key(start_date) if start_date else "0000-00",
+        "last": month_key(end_date) if end_date else "9999-99",
+    }).all()
+
+
+def _to_sale(row) -> SaleModel:
+    """Venda arquivada como objeto transitório (fora da sessão)"""
+    return SaleModel(**row._mapping)
+
+
+def iter_partition_rows(db: Session, statement, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Iterator:
+    """Executar o statement em cada partição do período"""
+    for partition in get_partitions(db, start_date, end_date):
+        with partition_store.engine_for(partition).connect() as conn:
+            yield from conn.execute(statement).all()
+
+
+def get_archived_sales(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    user_id: Optional[int] = None,
+    product_id: Optional[int] = None
+) -> List[SaleModel]:
+    """Vendas arquivadas filtradas, das partições relevantes"""
+    statement = select(partition_sales).where(
+        *date_range_conditions(partition_sales.c.sale_date, start_date, end_date)
+    )
+    if user_id is not None:
+        statement = statement.where(partition_sales.c.user_id == user_id)
+    if product_id is not None:
+        statement = statement.where(partition_sales.c.product_id == product_id)
+    statement = statement.order_by(partition_sales.c.id)
+    return [_to_sale(row) for row in iter_partition_rows(db, statement, start_date, end_date)]
+
+
+def get_archived_sale(db: Session, sale_id: int) -> Optional[SaleModel]:
+    """Localizar venda arquivada pelo intervalo de ids do manifesto"""
+    candidates = db.scalars(_SELECT_PARTITIONS_FOR_ID, {"sale_id": sale_id}).all()
+    for partition in candidates:
+        with partition_store.engine_for(partition).connect() as conn:
+            row = conn.execute(select(partition_sales).where(partition_sales.c.id == sale_id)).first()
+        if row is not None:
+            return _to_sale(row)
+    return None
+
+
+def get_archived_page(db: Session, skip: int, limit: int) -> tuple:
+    """
+    Página de vendas arquivadas em ordem de id
+
+    Usa row_count do manifesto para pular partições inteiras. Retorna as
+    vendas e o total arquivado (para deslocar a paginação da tabela quente).
+    """
+    partitions = db.scalars(_SELECT_PARTITIONS_BY_ID).all()
+    total = sum(partition.row_count for partition in partitions)
+    sales = []
+    for partition in partitions:
+        if len(sales) >= limit:
+            break
+        if skip >= partition.row_count:
+            skip -= partition.row_count
+            continue
+        statement = select(partition_sales).order_by(partition_sales.c.id).offset(skip).limit(limit - len(sales))
+        with partition_store.engine_for(partition).connect() as conn:
+            sales.extend(_to_sale(row) for row in conn.execute(statement))
+        skip = 0
+    return sales, total
+
+
+def get_archived_totals(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
+    """Contagem, quantidade e valor das vendas arquivadas no período"""
+    statement = select(
+        func.count(partition_sales.c.id),
+        func.coalesce(func.sum(partition_sales.c.quantity), 0),
+        func.coalesce(func.sum(partition_sales.c.total_price), 0.0),
+    ).where(*date_range_conditions(partition_sales.c.sale_date, start_date, end_date))
+    totals = {"total_sales": 0, "total_quantity": 0, "total_value": 0.0}
+    for count, quantity, value in iter_partition_rows(db, statement, start_date, end_date):
+        totals["total_sales"] += count
+        totals["total_quantity"] += quantity
+        totals["total_value"] += value
+    return totals
+
+
+def get_archived_groups(
+    db: Session,
+    group_by: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Dict[object, list]:
+    """Totais arquivados por chave: {chave: [vendas, quantidade, valor]}"""
+    key = {
+        "product": partition_sales.c.product_id,
+        "user": partition_sales.c.user_id,
+        "day": func.date(partition_sales.c.sale_date),
+    }[group_by]
+    statement = select(
+        key, func.count(partition_sales.c.id), func.sum(partition_sales.c.quantity), func.sum(partition_sales.c.total_price)
+    ).where(*date_range_conditions(partition_sales.c.sale_date, start_date, end_date)).group_by(key)
+    groups = {}
+    for group, count, quantity, value in iter_partition_rows(db, statement, start_date, end_date):
+        entry = groups.setdefault(group, [0, 0, 0.0])
+        entry[0] += count
+        entry[1] += quantity
+        entry[2] += value
+    return groups
+
+
+def _build_partition_file(db: Session, month: str, existing: Optional[SalePartitionModel], workdir: str) -> tuple:
+    """Gerar o arquivo SQLite do mês, mesclando a partição anterior se houver"""
+    start, end = month_bounds(month)
+    path = os.path.join(workdir, f"sales_{month}.db")
+    if existing is not None:
+        with gzip.open(existing.path, "rb") as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+    sales = db.execute(
+        select(SaleModel.__table__).where(*date_range_conditions(SaleModel.sale_date, start, end - timedelta(days=1)))
+    ).mappings().all()
+
+    engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    try:
+        partition_metadata.create_all(engine)
+        with engine.begin() as conn:
+            for offset in range(0, len(sales), _COPY_CHUNK_SIZE):
+                conn.execute(
+                    insert(partition_sales).prefix_with("OR REPLACE"),
+                    [dict(row) for row in sales[offset:offset + _COPY_CHUNK_SIZE]],
+                )
+        with engine.connect() as conn:
+            stats = conn.execute(select(
+                func.count(partition_sales.c.id), func.min(partition_sales.c.id), func.max(partition_sales.c.id)
+            )).one()
+            conn.exec_driver_sql("VACUUM")
+    finally:
+        engine.dispose()
+    return path, [row["id"] for row in sales], stats
+
+
+def archive_month(db: Session, month: str, archive_dir: str = ARCHIVE_DIR) -> dict:
+    """
+    Mover as vendas de um mês para sua partição comprimida
+
+    O arquivo é gravado antes de remover as linhas quentes; se o processo
+    cair no meio, a próxima execução mescla a partição por id sem duplicar.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    existing = db.get(SalePartitionModel, month)
+    with tempfile.TemporaryDirectory(dir=archive_dir) as workdir:
+        raw_path, moved_ids, (row_count, min_id, max_id) = _build_partition_file(db, month, existing, workdir)
+        if not moved_ids:
+            return {"month": month, "archived": 0, "row_count": existing.row_count if existing else 0}
+
+        target = os.path.join(archive_dir, f"sales_{month}.db.gz")
+        tmp_target = target + ".tmp"
+        with open(raw_path, "rb") as src, gzip.open(tmp_target, "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        raw_size = os.path.getsize(raw_path)
+    if os.path.exists(target):
+        os.chmod(target, 0o644)
+    os.replace(tmp_target, target)
+    os.chmod(target, 0o444)
+
+    try:
+        partition = existing or SalePartitionModel(month=month)
+        partition.path = target
+        partition.row_count = row_count
+        partition.min_id = min_id
+        partition.max_id = max_id
+        partition.raw_size = raw_size
+        partition.compressed_size = os.path.getsize(target)
+        partition.archived_at = datetime.now(timezone.utc)
+        db.add(partition)
+        for offset in range(0, len(moved_ids), _COPY_CHUNK_SIZE):
+            db.execute(
+                delete(SaleModel)
+                .where(SaleModel.id.in_(moved_ids[offset:offset + _COPY_CHUNK_SIZE]))
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    bus.invalidate(CHANNEL_PREFIX + month)
+
+    logger.info("Mês %s arquivado: %d vendas movidas (%d bytes -> %d bytes)",
+                month, len(moved_ids), raw_size, partition.compressed_size)
+    return {
+        "month": month,
+        "archived": len(moved_ids),
+        "row_count": row_count,
+        "raw_size": raw_size,
+        "compressed_size": partition.compressed_size,
+    }
+
+
+def archive_closed_months(
+    db: Session,
+    hot_months: int = HOT_MONTHS,
+    today: Optional[date] = None,
+    archive_dir: str = ARCHIVE_DIR
+) -> List[dict]:
+    """
+    Arquivar todos os meses anteriores à janela quente
+    """
+    cutoff = datetime.combine(hot_cutoff(today, hot_months), time.min)
+    month = func.strftime("%Y-%m", SaleModel.sale_date)
+    months = [
+        row[0] for row in
+        db.query(month).filter(SaleModel.sale_date < cutoff).distinct().order_by(month).all()
+        if row[0]
+    ]
+    return [archive_month(db, key, archive_dir) for key in months]
@@ -0,0 +1,103 @@
+"""
+Histórico de preços dos produtos
+
+Cada preço vale no intervalo [valid_from, valid_to). Uma alteração fecha o
+intervalo vigente e abre outro no mesmo instante, na mesma transação da
+alteração do produto. A consulta "preço em X" procura o intervalo que
+contém X pelo índice (product_id, valid_from), para um ou vários produtos
+num único SELECT.
+
+Produtos anteriores à migration têm o preço atual como vigente desde a
+criação; não há histórico antes disso.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import ProductPrice as ProductPriceModel
+
+# Produtos por statement (parâmetros do IN)
+PRICE_CHUNK_SIZE = 500
+
+_SELECT_PRICES_AT = select(
+    ProductPriceModel.product_id,
+    ProductPriceModel.price,
+    ProductPriceModel.valid_from,
+    ProductPriceModel.valid_to,
+).where(
+    ProductPriceModel.product_id.in_(bindparam("product_ids", expanding=True)),
+    ProductPriceModel.valid_from <= bindparam("at"),
+    or_(ProductPriceModel.valid_to.is_(None), ProductPriceModel.valid_to > bindparam("at")),
+).order_by(ProductPriceModel.product_id, ProductPriceModel.valid_from)
+
+_CLOSE_CURRENT = (
+    update(ProductPriceModel)
+    .where(
+        ProductPriceModel.product_id.in_(bindparam("product_ids", expanding=True)),
+        ProductPriceModel.valid_to.is_(None),
+    )
+    .values(valid_to=bindparam("at"))
+    .execution_options(synchronize_session=False)
+)
+
+
+def utc_instant(at: Optional[datetime]) -> datetime:
+    """Instante em UTC (sem fuso = UTC; None = agora)"""
+    if at is None:
+        return datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        return at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc)
+
+
+def record_prices(db: Session, prices: Dict[int, float], at: Optional[datetime] = None) -> None:
+    """
+    Registrar novos preços vigentes a partir de `at` (sem commit)
+
+    Deve ser chamado na transação que altera os produtos.
+    """
+    if not prices:
+        return
+    at = utc_instant(at)
+    product_ids = list(prices)
+    for start in range(0, len(product_ids), PRICE_CHUNK_SIZE):
+        db.execute(_CLOSE_CURRENT, {"product_ids": product_ids[start:start + PRICE_CHUNK_SIZE], "at": at})
+    db.execute(
+        insert(ProductPriceModel),
+        [{"product_id": product_id, "price": price, "valid_from": at} for product_id, price in prices.items()],
+    )
+
+
+def get_prices_at(db: Session, product_ids: Iterable[int], at: Optional[datetime] = None) -> Dict[int, dict]:
+    """
+    Preço vigente em `at` de vários produtos: {product_id: {...}}
+
+    Produtos sem preço registrado no instante ficam de fora.
+    """
+    at = utc_instant(at)
+    product_ids = list(dict.fromkeys(product_ids))
+    prices = {}
+    for start in range(0, len(product_ids), PRICE_CHUNK_SIZE):
+        rows = db.execute(_SELECT_PRICES_AT, {"product_ids": product_ids[start:start + PRICE_CHUNK_SIZE], "at": at})
+        for row in rows:
+            prices[row.product_id] = {
+                "product_id": row.product_id,
+                "price": row.price,
+                "valid_from": row.valid_from,
+                "valid_to": row.valid_to,
+            }
+    return prices
+
+
+def get_price_at(db: Session, product_id: int, at: Optional[datetime] = None) -> Optional[dict]:
+    """
+    Preço vigente em `at` de um produto
+    """
+    return get_prices_at(db, [product_id], at).get(product_id)
+
+
+def delete_history(db: Session, product_id: int) -> None:
+    """Remover o histórico de um produto (sem commit)"""
+    db.query(ProductPriceModel).filter(ProductPriceModel.product_id == product_id).delete(synchronize_session=False)
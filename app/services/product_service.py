@@ -1,18 +1,55 @@
 """
 Serviços para gerenciamento de produtos
 """
+from sqlalchemy import bindparam, case, select, true, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime, timezone
+from app import http_cache, sparse_fields
 from app.models import Product as ProductModel
-from app.schemas import Product, ProductCreate, ProductUpdate
+from app.schemas import (
+    Product, ProductCreate, ProductUpdate, ProductUpsertItem, StockAdjustment
+)
+from app.services import change_service, price_service
+
+# Linhas por statement no upsert em lote (7 parâmetros por linha)
+UPSERT_CHUNK_SIZE = 500
+
+# Colunas atualizadas quando o produto já existe
+_UPSERT_COLUMNS = ("sku", "name", "description", "price", "stock_quantity", "is_active")
+
+# Statements construídos uma única vez: valores entram como parâmetros e a
+# compilação fica no cache da engine
+_SELECT_PRODUCT = select(ProductModel).where(ProductModel.id == bindparam("product_id"))
+_SELECT_PRODUCT_VERSION = select(ProductModel.updated_at, ProductModel.created_at).where(
+    ProductModel.id == bindparam("product_id")
+)
+_SELECT_PRODUCTS = select(ProductModel).offset(bindparam("skip")).limit(bindparam("limit"))
+_SELECT_ACTIVE_PRODUCTS = (
+    select(ProductModel).where(ProductModel.is_active == true())
+    .offset(bindparam("skip")).limit(bindparam("limit"))
+)
+_SELECT_PRODUCTS_BY_NAME = select(ProductModel).where(
+    ProductModel.name.contains(bindparam("name")), ProductModel.is_active == true()
+)
+_SELECT_PRODUCTS_IN_STOCK = select(ProductModel).where(
+    ProductModel.stock_quantity > 0, ProductModel.is_active == true()
+)
 
 
 def create_product(db: Session, product: ProductCreate) -> ProductModel:
     """
     Criar um novo produto
     """
-    db_product = ProductModel(**product.dict())
+    # Mesmo instante em created_at e no início do primeiro preço: o preço
+    # vigente em `created_at` existe
+    now = datetime.now(timezone.utc)
+    db_product = ProductModel(**product.dict(), created_at=now)
     db.add(db_product)
+    db.flush()
+    price_service.record_prices(db, {db_product.id: db_product.price}, now)
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -22,54 +59,61 @@ def get_product(db: Session, product_id: int) -> Optional[ProductModel]:
     """
     Obter produto por ID
     """
-    return db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    return db.scalars(_SELECT_PRODUCT, {"product_id": product_id}).first()
 
 
-def get_products(db: Session, skip: int = 0, limit: int = 100, active_only: bool = True) -> List[ProductModel]:
+def get_product_version(db: Session, product_id: int) -> Optional[datetime]:
     """
-    Listar produtos com filtros
+    Obter apenas o carimbo de versão do produto (updated_at ou created_at)
     """
-    query = db.query(ProductModel)
-    
-    if active_only:
-        query = query.filter(ProductModel.is_active == True)
-    
-    return query.offset(skip).limit(limit).all()
+    row = db.execute(_SELECT_PRODUCT_VERSION, {"product_id": product_id}).first()
+    if row is None:
+        return None
+    return row.updated_at or row.created_at
+
+
+def get_products(
+    db: Session, skip: int = 0, limit: int = 100, active_only: bool = True, fields: Optional[tuple] = None
+) -> List[ProductModel]:
+    """
+    Listar produtos com filtros (apenas as colunas de `fields`, se informado)
+    """
+    statement = _SELECT_ACTIVE_PRODUCTS if active_only else _SELECT_PRODUCTS
+    if fields:
+        statement = statement.options(sparse_fields.load_columns(ProductModel, fields))
+    return db.scalars(statement, {"skip": skip, "limit": limit}).all()
 
 
 def get_products_by_name(db: Session, name: str) -> List[ProductModel]:
     """
     Buscar produtos por nome (busca parcial)
     """
-    return db.query(ProductModel).filter(
-        ProductModel.name.contains(name),
-        ProductModel.is_active == True
-    ).all()
+    return db.scalars(_SELECT_PRODUCTS_BY_NAME, {"name": name}).all()
 
 
 def get_products_in_stock(db: Session) -> List[ProductModel]:
     """
     Obter produtos em estoque
     """
-    return db.query(ProductModel).filter(
-        ProductModel.stock_quantity > 0,
-        ProductModel.is_active == True
-    ).all()
+    return db.scalars(_SELECT_PRODUCTS_IN_STOCK).all()
 
 
 def update_product(db: Session, product_id: int, product_update: ProductUpdate) -> Optional[ProductModel]:
     """
     Atualizar produto
     """
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    db_product = get_product(db, product_id)
     
     if not db_product:
         return None
     
     # Atualizar apenas campos fornecidos
     update_data = product_update.dict(exclude_unset=True)
+    price_changed = update_data.get("price") is not None and update_data["price"] != db_product.price
     for field, value in update_data.items():
         setattr(db_product, field, value)
+    if price_changed:
+        price_service.record_prices(db, {product_id: db_product.price})
     
     db.commit()
     db.refresh(db_product)
@@ -80,7 +124,7 @@ def update_stock(db: Session, product_id: int, quantity_change: int) -> Optional
     """
     Atualizar estoque do produto (pode ser positivo ou negativo)
     """
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    db_product = get_product(db, product_id)
     
     if not db_product:
         return None
@@ -101,7 +145,7 @@ def delete_product(db: Session, product_id: int) -> bool:
     """
     Deletar produto (soft delete - marcar como inativo)
     """
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    db_product = get_product(db, product_id)
     
     if not db_product:
         return False
@@ -115,11 +159,170 @@ def hard_delete_product(db: Session, product_id: int) -> bool:
     """
     Deletar produto permanentemente
     """
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    db_product = get_product(db, product_id)
     
     if not db_product:
         return False
     
+    price_service.delete_history(db, product_id)
     db.delete(db_product)
     db.commit()
     return True
+
+
+def _upsert_statement(rows: List[dict], key: str):
+    # Todas as linhas têm as mesmas colunas; só as enviadas são atualizadas
+    stmt = insert(ProductModel).values(rows)
+    update_columns = {name: stmt.excluded[name] for name in _UPSERT_COLUMNS if name in rows[0] and name != key}
+    update_columns["updated_at"] = datetime.now(timezone.utc)
+    return stmt.on_conflict_do_update(index_elements=[key], set_=update_columns).returning(
+        getattr(ProductModel, key), ProductModel.id
+    )
+
+
+def _apply_upsert_chunk(db: Session, chunk: List[tuple], key: str, results: list) -> None:
+    """Executar o upsert de um lote e registrar resultados e alterações"""
+    key_column = getattr(ProductModel, key)
+    keys = [row[key] for _, row in chunk]
+    # Preço anterior de cada chave existente: só preços alterados entram no histórico
+    existing = dict(db.execute(select(key_column, ProductModel.price).where(key_column.in_(keys))).all())
+    # created_at dos produtos novos = início do primeiro preço (não é atualizado no conflito)
+    now = datetime.now(timezone.utc)
+    # RETURNING não garante a ordem das linhas: mapear pela chave
+    id_by_key = dict(db.execute(_upsert_statement([{**row, "created_at": now} for _, row in chunk], key)).all())
+
+    created, updated = [], []
+    prices = {}
+    for position, row in chunk:
+        status = "updated" if row[key] in existing else "created"
+        product_id = id_by_key[row[key]]
+        (updated if status == "updated" else created).append(product_id)
+        if status == "created" or existing[row[key]] != row["price"]:
+            prices[product_id] = row["price"]
+        results[position] = {"index": position, "status": status, "id": product_id}
+
+    price_service.record_prices(db, prices, now)
+    change_service.record_changes(db, "product", created, "created")
+    change_service.record_changes(db, "product", updated, "updated")
+    http_cache.touch_tables(db, "products")
+
+
+def bulk_upsert_products(
+    db: Session,
+    items: List[ProductUpsertItem],
+    key: str = "sku",
+    chunk_size: int = UPSERT_CHUNK_SIZE
+) -> dict:
+    """
+    Criar ou atualizar produtos em lote com INSERT ... ON CONFLICT DO UPDATE
+
+    Cada lote de `chunk_size` linhas é um único statement e um commit. Se o
+    lote falhar, suas linhas são reaplicadas uma a uma para isolar os erros.
+    Produtos existentes recebem apenas os campos enviados; as linhas são
+    agrupadas pelo conjunto de campos para cada lote ter um só statement.
+    """
+    results = [None] * len(items)
+    pending = {}  # colunas -> [(posição, linha)]
+    seen = {}
+    for position, item in enumerate(items):
+        row = item.model_dump(exclude_unset=True)
+        key_value = row.get(key)
+        if key_value is None:
+            results[position] = {"index": position, "status": "error", "detail": f"Campo '{key}' obrigatório"}
+            continue
+        if key_value in seen:
+            results[position] = {"index": position, "status": "error", "detail": f"'{key}' duplicado no lote (linha {seen[key_value]})"}
+            continue
+        seen[key_value] = position
+        if key == "sku":
+            row.pop("id", None)
+        pending.setdefault(frozenset(row), []).append((position, row))
+
+    chunks = [
+        rows[start:start + chunk_size]
+        for rows in pending.values()
+        for start in range(0, len(rows), chunk_size)
+    ]
+    for chunk in chunks:
+        try:
+            _apply_upsert_chunk(db, chunk, key, results)
+            db.commit()
+            continue
+        except SQLAlchemyError:
+            db.rollback()
+
+        for position, row in chunk:
+            try:
+                _apply_upsert_chunk(db, [(position, row)], key, results)
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                detail = str(e.orig) if getattr(e, "orig", None) is not None else str(e)
+                results[position] = {"index": position, "status": "error", "detail": detail}
+
+    return {
+        "created": sum(1 for r in results if r["status"] == "created"),
+        "updated": sum(1 for r in results if r["status"] == "updated"),
+        "errors": sum(1 for r in results if r["status"] == "error"),
+        "results": results,
+    }
+
+
+def bulk_update_stock(db: Session, adjustments: List[StockAdjustment]) -> dict:
+    """
+    Aplicar ajustes de estoque atomicamente
+
+    UPDATE ... CASE em lotes, numa única transação, aplica os ajustes e a
+    condição de estoque não negativo é verificada no próprio SQL. Se algum produto não existir ou
+    ficaria com estoque negativo, nada é aplicado.
+    """
+    deltas = {}
+    for adjustment in adjustments:
+        deltas[adjustment.product_id] = deltas.get(adjustment.product_id, 0) + adjustment.quantity_change
+    if not deltas:
+        return {"applied": True, "results": []}
+
+    product_ids = list(deltas)
+    try:
+        new_stock = {}
+        # Um CASE por lote evita expressões gigantes; a transação continua única
+        for start in range(0, len(product_ids), UPSERT_CHUNK_SIZE):
+            chunk = {product_id: deltas[product_id] for product_id in product_ids[start:start + UPSERT_CHUNK_SIZE]}
+            delta = case(chunk, value=ProductModel.id, else_=0)
+            statement = (
+                update(ProductModel)
+                .where(ProductModel.id.in_(list(chunk)), ProductModel.stock_quantity + delta >= 0)
+                .values(stock_quantity=ProductModel.stock_quantity + delta)
+                .returning(ProductModel.id, ProductModel.stock_quantity)
+                .execution_options(synchronize_session=False)
+            )
+            new_stock.update(db.execute(statement).all())
+        if len(new_stock) == len(deltas):
+            change_service.record_changes(db, "product", product_ids, "updated")
+            http_cache.touch_tables(db, "products")
+            db.commit()
+            return {
+                "applied": True,
+                "results": [
+                    {"product_id": product_id, "status": "ok", "new_stock": new_stock[product_id]}
+                    for product_id in deltas
+                ],
+            }
+        db.rollback()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Identificar linhas rejeitadas
+    current = dict(db.execute(
+        select(ProductModel.id, ProductModel.stock_quantity).where(ProductModel.id.in_(product_ids))
+    ).all())
+    results = []
+    for product_id, change in deltas.items():
+        if product_id not in current:
+            results.append({"product_id": product_id, "status": "not_found"})
+        elif current[product_id] + change < 0:
+            results.append({"product_id": product_id, "status": "insufficient_stock", "current_stock": current[product_id]})
+        else:
+            results.append({"product_id": product_id, "status": "not_applied"})
+    return {"applied": False, "results": results}
@@ -1,102 +1,205 @@
 """
 Serviços para gerenciamento de vendas
 """
+import base64
+import binascii
+import json
+import logging
+from sqlalchemy import asc, bindparam, case, delete, desc, func, insert, null, select, true, tuple_, update
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import date
 from app.models import Sale as SaleModel, Product as ProductModel, User as UserModel
-from app.schemas import Sale, SaleCreate
+from app.schemas import Sale, SaleCreate, SaleCancelBulk
 from app.services.product_service import update_stock
+from app.broadcast import sales_hub, sale_payload
+from app import http_cache, sparse_fields
+from app.database import use_reader
+from app.services import analytics_service, change_service, partition_service, sketch_service
+
+logger = logging.getLogger(__name__)
+
+# Limite de parâmetros por statement em operações em lote
+BULK_CHUNK_SIZE = 500
+
+
+# Statements construídos uma única vez: valores entram como parâmetros e a
+# compilação fica no cache da engine
+_SELECT_USER_ID = select(UserModel.id).where(UserModel.id == bindparam("user_id"))
+_SELECT_ACTIVE_PRODUCT = select(ProductModel).where(
+    ProductModel.id == bindparam("product_id"), ProductModel.is_active == true()
+)
+# Baixa de estoque condicional: o WHERE garante produto ativo e estoque
+# suficiente, e o RETURNING devolve o preço sem um SELECT prévio
+_DECREMENT_STOCK = (
+    update(ProductModel)
+    .where(
+        ProductModel.id == bindparam("product_id"),
+        ProductModel.is_active == true(),
+        ProductModel.stock_quantity >= bindparam("quantity"),
+    )
+    .values(stock_quantity=ProductModel.stock_quantity - bindparam("quantity"))
+    .returning(ProductModel.price)
+)
+# INSERT com RETURNING da entidade: id, sale_date e created_at voltam no próprio INSERT
+_INSERT_SALE = insert(SaleModel).returning(SaleModel)
+_SELECT_SALE = select(SaleModel).where(SaleModel.id == bindparam("sale_id"))
+_SELECT_SALES = select(SaleModel).offset(bindparam("skip")).limit(bindparam("limit"))
+_SELECT_SALES_AFTER = (
+    select(SaleModel).where(SaleModel.id > bindparam("sale_id")).order_by(SaleModel.id).limit(bindparam("limit"))
+)
+_SELECT_SALES_BY_USER = select(SaleModel).where(SaleModel.user_id == bindparam("user_id"))
+_SELECT_SALES_BY_PRODUCT = select(SaleModel).where(SaleModel.product_id == bindparam("product_id"))
+_SELECT_SALES_BETWEEN = select(SaleModel).where(
+    SaleModel.sale_date >= bindparam("start"), SaleModel.sale_date < bindparam("end")
+)
+
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 def create_sale(db: Session, sale: SaleCreate) -> SaleModel:
     """
     Criar uma nova venda
+
+    Baixa de estoque e inserção da venda em uma única transação, sem
+    SELECTs de releitura: o UPDATE e o INSERT usam RETURNING e a sessão da
+    aplicação não expira objetos no commit.
     """
     # Verificar se usuário existe
-    user = db.query(UserModel).filter(UserModel.id == sale.user_id).first()
-    if not user:
+    if db.execute(_SELECT_USER_ID, {"user_id": sale.user_id}).first() is None:
         raise ValueError("Usuário não encontrado")
-    
-    # Verificar se produto existe e está ativo
-    product = db.query(ProductModel).filter(
-        ProductModel.id == sale.product_id,
-        ProductModel.is_active == True
-    ).first()
-    if not product:
-        raise ValueError("Produto não encontrado ou inativo")
-    
-    # Verificar estoque
-    if product.stock_quantity < sale.quantity:
+
+    # Baixar estoque (produto ativo e com estoque suficiente)
+    row = db.execute(_DECREMENT_STOCK, {"product_id": sale.product_id, "quantity": sale.quantity}).first()
+    if row is None:
+        # Nada foi alterado: consultar apenas para detalhar o erro
+        db.rollback()
+        product = db.scalars(_SELECT_ACTIVE_PRODUCT, {"product_id": sale.product_id}).first()
+        if not product:
+            raise ValueError("Produto não encontrado ou inativo")
         raise ValueError(f"Estoque insuficiente. Disponível: {product.stock_quantity}")
-    
+
     # Calcular preços
-    unit_price = sale.unit_price if sale.unit_price else product.price
+    unit_price = sale.unit_price if sale.unit_price else row.price
     total_price = unit_price * sale.quantity
-    
+
     # Criar venda
-    db_sale = SaleModel(
-        user_id=sale.user_id,
-        product_id=sale.product_id,
-        quantity=sale.quantity,
-        unit_price=unit_price,
-        total_price=total_price
-    )
-    
-    db.add(db_sale)
-    db.commit()
-    db.refresh(db_sale)
-    
-    # Atualizar estoque
+    db_sale = db.scalars(_INSERT_SALE, [{
+        "user_id": sale.user_id,
+        "product_id": sale.product_id,
+        "quantity": sale.quantity,
+        "unit_price": unit_price,
+        "total_price": total_price,
+    }]).one()
+    change_service.record_changes(db, "product", [sale.product_id], "updated")
+    http_cache.touch_tables(db, "products", "sales")
+
+    # Estatísticas aproximadas na mesma transação (serializadas pelo lock de
+    # escrita). São auxiliares: se falharem, o SAVEPOINT é desfeito, a venda
+    # segue e os buckets ficam marcados para a manutenção reconstruir
     try:
-        update_stock(db, sale.product_id, -sale.quantity)
-    except ValueError as e:
-        # Rollback da venda se não conseguir atualizar estoque
-        db.delete(db_sale)
-        db.commit()
-        raise e
-    
+        with db.begin_nested():
+            sketch_service.record_sale(db, db_sale)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar sketches da venda {db_sale.id}: {e}")
+        sketch_service.mark_dirty(db, db_sale)
+    db.commit()
+
+    sales_hub.publish_sale_created(db_sale.id, sale_payload(db_sale))
     return db_sale
 
 
+@use_reader
 def get_sale(db: Session, sale_id: int) -> Optional[SaleModel]:
     """
-    Obter venda por ID
+    Obter venda por ID (tabela quente ou partição arquivada)
+    """
+    sale = db.scalars(_SELECT_SALE, {"sale_id": sale_id}).first()
+    if sale is None:
+        sale = partition_service.get_archived_sale(db, sale_id)
+    return sale
+
+
+@use_reader
+def get_sales(db: Session, skip: int = 0, limit: int = 100, fields: Optional[tuple] = None) -> List[SaleModel]:
+    """
+    Listar todas as vendas (arquivadas primeiro, em ordem de id)
+
+    Com `fields`, a tabela quente carrega apenas essas colunas.
     """
-    return db.query(SaleModel).filter(SaleModel.id == sale_id).first()
+    archived, archived_total = partition_service.get_archived_page(db, skip, limit)
+    remaining = limit - len(archived)
+    if remaining <= 0:
+        return archived
+    statement = _SELECT_SALES
+    if fields:
+        statement = statement.options(sparse_fields.load_columns(SaleModel, fields))
+    return archived + list(db.scalars(statement, {"skip": max(0, skip - archived_total), "limit": remaining}))
 
 
-def get_sales(db: Session, skip: int = 0, limit: int = 100) -> List[SaleModel]:
+@use_reader
+def get_sales_after(db: Session, sale_id: int, limit: int = 1000) -> List[SaleModel]:
     """
-    Listar todas as vendas
+    Obter vendas com id maior que o informado (retomada do feed)
     """
-    return db.query(SaleModel).offset(skip).limit(limit).all()
+    return db.scalars(_SELECT_SALES_AFTER, {"sale_id": sale_id, "limit": limit}).all()
 
 
+@use_reader
 def get_sales_by_user(db: Session, user_id: int) -> List[SaleModel]:
     """
     Obter vendas de um usuário específico
     """
-    return db.query(SaleModel).filter(SaleModel.user_id == user_id).all()
+    archived = partition_service.get_archived_sales(db, user_id=user_id)
+    return archived + list(db.scalars(_SELECT_SALES_BY_USER, {"user_id": user_id}))
 
 
+@use_reader
 def get_sales_by_product(db: Session, product_id: int) -> List[SaleModel]:
     """
     Obter vendas de um produto específico
     """
-    return db.query(SaleModel).filter(SaleModel.product_id == product_id).all()
+    archived = partition_service.get_archived_sales(db, product_id=product_id)
+    return archived + list(db.scalars(_SELECT_SALES_BY_PRODUCT, {"product_id": product_id}))
+
+
+def _filter_date_range(query, start_date: Optional[date], end_date: Optional[date]):
+    """
+    Aplicar filtro de período com dias inclusivos
+    """
+    return query.filter(*partition_service.date_range_conditions(SaleModel.sale_date, start_date, end_date))
+
+
+def _sales_totals(db: Session, start_date: Optional[date], end_date: Optional[date]) -> dict:
+    """Contagem, quantidade e valor no período (tabela quente + partições do período)"""
+    query = db.query(
+        func.count(SaleModel.id),
+        func.coalesce(func.sum(SaleModel.quantity), 0),
+        func.coalesce(func.sum(SaleModel.total_price), 0.0),
+    )
+    count, quantity, value = _filter_date_range(query, start_date, end_date).one()
+    archived = partition_service.get_archived_totals(db, start_date, end_date)
+    return {
+        "total_sales": count + archived["total_sales"],
+        "total_quantity": quantity + archived["total_quantity"],
+        "total_value": archived["total_value"] + value,
+    }
 
 
+@use_reader
 def get_sales_by_date_range(db: Session, start_date: date, end_date: date) -> List[SaleModel]:
     """
     Obter vendas em um período específico
     """
-    return db.query(SaleModel).filter(
-        SaleModel.sale_date >= start_date,
-        SaleModel.sale_date <= end_date
-    ).all()
+    archived = partition_service.get_archived_sales(db, start_date, end_date)
+    start, end = partition_service.day_bounds(start_date, end_date)
+    return archived + list(db.scalars(_SELECT_SALES_BETWEEN, {"start": start, "end": end}))
 
 
+@use_reader
 def get_sales_today(db: Session) -> List[SaleModel]:
     """
     Obter vendas do dia atual
@@ -105,45 +208,29 @@ def get_sales_today(db: Session) -> List[SaleModel]:
     return get_sales_by_date_range(db, today, today)
 
 
+@use_reader
 def get_total_sales_value(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> float:
     """
     Calcular valor total de vendas em um período
     """
-    query = db.query(SaleModel)
-    
-    if start_date:
-        query = query.filter(SaleModel.sale_date >= start_date)
-    if end_date:
-        query = query.filter(SaleModel.sale_date <= end_date)
-    
-    sales = query.all()
-    return sum(sale.total_price for sale in sales)
+    if analytics_service.is_enabled():
+        return analytics_service.get_snapshot(db).summary(start_date, end_date)["total_value"]
+
+    return _sales_totals(db, start_date, end_date)["total_value"]
 
 
+@use_reader
 def get_sales_summary(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
     """
     Obter resumo de vendas
     """
-    query = db.query(SaleModel)
-    
-    if start_date:
-        query = query.filter(SaleModel.sale_date >= start_date)
-    if end_date:
-        query = query.filter(SaleModel.sale_date <= end_date)
-    
-    sales = query.all()
-    
-    if not sales:
-        return {
-            "total_sales": 0,
-            "total_value": 0.0,
-            "total_quantity": 0,
-            "average_sale_value": 0.0
-        }
-    
-    total_sales = len(sales)
-    total_value = sum(sale.total_price for sale in sales)
-    total_quantity = sum(sale.quantity for sale in sales)
+    if analytics_service.is_enabled():
+        return analytics_service.get_snapshot(db).summary(start_date, end_date)
+
+    totals = _sales_totals(db, start_date, end_date)
+    total_sales = totals["total_sales"]
+    total_value = totals["total_value"]
+    total_quantity = totals["total_quantity"]
     average_sale_value = total_value / total_sales if total_sales > 0 else 0.0
     
     return {
@@ -154,13 +241,200 @@ def get_sales_summary(db: Session, start_date: Optional[date] = None, end_date:
     }
 
 
+@use_reader
+def get_sales_grouped(
+    db: Session,
+    group_by: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> List[dict]:
+    """
+    Obter totais agrupados por produto, usuário ou dia
+    """
+    if analytics_service.is_enabled():
+        return analytics_service.get_snapshot(db).group_totals(group_by, start_date, end_date)
+
+    key = {
+        "product": SaleModel.product_id,
+        "user": SaleModel.user_id,
+        "day": func.date(SaleModel.sale_date),
+    }[group_by]
+    query = db.query(
+        key.label("key"),
+        func.count(SaleModel.id),
+        func.sum(SaleModel.quantity),
+        func.sum(SaleModel.total_price),
+    )
+    rows = _filter_date_range(query, start_date, end_date).group_by(key).all()
+    groups = partition_service.get_archived_groups(db, group_by, start_date, end_date)
+    for group, count, quantity, value in rows:
+        entry = groups.setdefault(group, [0, 0, 0.0])
+        entry[0] += count
+        entry[1] += quantity
+        entry[2] += value
+    return [
+        {
+            "key": group,
+            "total_sales": count,
+            "total_quantity": quantity,
+            "total_value": round(value, 2),
+        }
+        for group, (count, quantity, value) in sorted(groups.items())
+    ]
+
+
+def _encode_cursor(position: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(position, list) or len(position) != 2:
+        raise ValueError("Cursor inválido")
+    return position
+
+
+def _breakdown_entry(key, name, count: int, quantity: int, value: float) -> dict:
+    return {
+        "key": key,
+        "name": name,
+        "total_sales": count,
+        "total_quantity": quantity,
+        "total_value": round(value, 2),
+        "average_unit_price": round(value / quantity, 2) if quantity else 0.0,
+    }
+
+
+@use_reader
+def get_sales_breakdown(
+    db: Session,
+    group_by: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sort: str = "key",
+    descending: bool = False,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> dict:
+    """
+    Totais por produto, usuário ou dia com nome e preço médio, paginados por keyset
+
+    A página é um único SELECT: agrupa pelos índices de cobertura
+    (ix_sales_product_date, ix_sales_user_date, ix_sales_date_totals),
+    aplica o cursor antes da ordenação (WHERE na chave ou HAVING no
+    agregado), limita e só então junta os nomes das linhas da página. Se o
+    período inclui partições arquivadas, os grupos são somados em memória e
+    a página é recortada da mesma forma.
+
+    O cursor é opaco: posição (valor ordenado, chave) do último grupo.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    key, model = {
+        "product": (SaleModel.product_id, ProductModel),
+        "user": (SaleModel.user_id, UserModel),
+        "day": (func.date(SaleModel.sale_date), None),
+    }[group_by]
+    if partition_service.get_partitions(db, start_date, end_date):
+        return _merged_breakdown(db, key, model, group_by, start_date, end_date, sort, descending, limit, after)
+
+    aggregates = {
+        "key": key,
+        "count": func.count(SaleModel.id),
+        "quantity": func.sum(SaleModel.quantity),
+        "revenue": func.sum(SaleModel.total_price),
+    }
+    statement = select(
+        key.label("key"),
+        aggregates["count"].label("total_sales"),
+        aggregates["quantity"].label("total_quantity"),
+        aggregates["revenue"].label("total_value"),
+    ).where(*partition_service.date_range_conditions(SaleModel.sale_date, start_date, end_date)).group_by(key)
+
+    direction = desc if descending else asc
+    if sort == "key":
+        if after is not None:
+            statement = statement.where(key < after[1] if descending else key > after[1])
+        statement = statement.order_by(direction(key))
+    else:
+        position = tuple_(aggregates[sort], key)
+        if after is not None:
+            statement = statement.having(position < tuple_(*after) if descending else position > tuple_(*after))
+        statement = statement.order_by(direction(aggregates[sort]), direction(key))
+    grouped = statement.limit(limit + 1).subquery()
+
+    columns = {"key": grouped.c.key, "count": grouped.c.total_sales,
+               "quantity": grouped.c.total_quantity, "revenue": grouped.c.total_value}
+    page = select(grouped, (model.name if model is not None else null()).label("name")).select_from(grouped)
+    if model is not None:
+        page = page.outerjoin(model, model.id == grouped.c.key)
+    page = page.order_by(direction(columns[sort]), direction(grouped.c.key))
+    rows = [
+        (row.key, row.name, row.total_sales, row.total_quantity, row.total_value)
+        for row in db.execute(page)
+    ]
+    return _breakdown_page(group_by, sort, descending, limit, rows)
+
+
+def _merged_breakdown(db, key, model, group_by, start_date, end_date, sort, descending, limit, after) -> dict:
+    """Breakdown com partições arquivadas: grupos somados e página recortada em memória"""
+    query = select(key, func.count(SaleModel.id), func.sum(SaleModel.quantity), func.sum(SaleModel.total_price))
+    query = query.where(*partition_service.date_range_conditions(SaleModel.sale_date, start_date, end_date))
+    groups = partition_service.get_archived_groups(db, group_by, start_date, end_date)
+    for group, count, quantity, value in db.execute(query.group_by(key)):
+        entry = groups.setdefault(group, [0, 0, 0.0])
+        entry[0] += count
+        entry[1] += quantity
+        entry[2] += value
+
+    index = {"key": None, "count": 0, "quantity": 1, "revenue": 2}[sort]
+    positions = sorted(
+        ((group if index is None else totals[index], group), group) for group, totals in groups.items()
+    )
+    if descending:
+        positions.reverse()
+    if after is not None:
+        bound = tuple(after)
+        positions = [item for item in positions if (item[0] < bound if descending else item[0] > bound)]
+    keys = [group for _, group in positions[:limit + 1]]
+
+    names = {}
+    if model is not None:
+        for chunk in _chunks(keys):
+            names.update(db.execute(select(model.id, model.name).where(model.id.in_(chunk))).all())
+    rows = [(group, names.get(group), *groups[group]) for group in keys]
+    return _breakdown_page(group_by, sort, descending, limit, rows)
+
+
+def _breakdown_page(group_by: str, sort: str, descending: bool, limit: int, rows: list) -> dict:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        key, _, count, quantity, value = rows[-1]
+        sorted_value = {"key": key, "count": count, "quantity": quantity, "revenue": value}[sort]
+        next_cursor = _encode_cursor([sorted_value, key])
+    return {
+        "group_by": group_by,
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+        "groups": [_breakdown_entry(*row) for row in rows],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
 def cancel_sale(db: Session, sale_id: int) -> bool:
     """
     Cancelar venda (estornar estoque)
     """
-    sale = db.query(SaleModel).filter(SaleModel.id == sale_id).first()
+    sale = db.scalars(_SELECT_SALE, {"sale_id": sale_id}).first()
     
     if not sale:
+        if partition_service.get_archived_sale(db, sale_id) is not None:
+            raise ValueError("Venda de mês arquivado não pode ser cancelada")
         return False
     
     # Estornar estoque
@@ -171,6 +445,93 @@ def cancel_sale(db: Session, sale_id: int) -> bool:
         pass
     
     # Remover venda
+    payload = sale_payload(sale)
     db.delete(sale)
     db.commit()
+    analytics_service.invalidate_snapshot()
+    sales_hub.publish_sale_cancelled(sale_id, payload)
     return True
+
+
+def cancel_sales_bulk(db: Session, request: SaleCancelBulk) -> dict:
+    """
+    Cancelar vendas em lote (estornar estoque) em uma única transação
+
+    O estoque é estornado com um UPDATE ... CASE por lote de produtos e as
+    vendas são removidas com um DELETE por lote de ids.
+    """
+    has_filter = any(
+        value is not None
+        for value in (request.start_date, request.end_date, request.user_id, request.product_id)
+    )
+    if not request.ids and not has_filter:
+        raise ValueError("Informe ids ou ao menos um filtro")
+
+    columns = select(
+        SaleModel.id, SaleModel.user_id, SaleModel.product_id, SaleModel.quantity,
+        SaleModel.unit_price, SaleModel.total_price, SaleModel.sale_date
+    )
+    if request.user_id is not None:
+        columns = columns.where(SaleModel.user_id == request.user_id)
+    if request.product_id is not None:
+        columns = columns.where(SaleModel.product_id == request.product_id)
+    columns = _filter_date_range(columns, request.start_date, request.end_date)
+
+    if request.ids:
+        requested = list(dict.fromkeys(request.ids))
+        sales = []
+        for chunk in _chunks(requested):
+            sales.extend(db.execute(columns.where(SaleModel.id.in_(chunk))).all())
+    else:
+        requested = None
+        sales = db.execute(columns.order_by(SaleModel.id)).all()
+
+    # Quantidade a estornar por produto
+    restock = {}
+    for sale in sales:
+        restock[sale.product_id] = restock.get(sale.product_id, 0) + sale.quantity
+
+    try:
+        product_ids = list(restock)
+        for chunk in _chunks(product_ids):
+            db.execute(
+                update(ProductModel)
+                .where(ProductModel.id.in_(chunk))
+                .values(stock_quantity=ProductModel.stock_quantity + case(
+                    {product_id: restock[product_id] for product_id in chunk},
+                    value=ProductModel.id,
+                    else_=0,
+                ))
+                .execution_options(synchronize_session=False)
+            )
+        sale_ids = [sale.id for sale in sales]
+        for chunk in _chunks(sale_ids):
+            db.execute(
+                delete(SaleModel).where(SaleModel.id.in_(chunk)).execution_options(synchronize_session=False)
+            )
+        change_service.record_changes(db, "product", product_ids, "updated")
+        http_cache.touch_tables(db, "products", "sales")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if sales:
+        analytics_service.invalidate_snapshot()
+    for sale in sales:
+        sales_hub.publish_sale_cancelled(sale.id, sale_payload(sale))
+
+    cancelled = {sale.id for sale in sales}
+    if requested is None:
+        results = [{"id": sale_id, "status": "cancelled"} for sale_id in sorted(cancelled)]
+    else:
+        results = [
+            {"id": sale_id, "status": "cancelled" if sale_id in cancelled else "not_found"}
+            for sale_id in requested
+        ]
+    return {
+        "cancelled": len(cancelled),
+        "not_found": len(results) - len(cancelled),
+        "restocked_products": len(restock),
+        "results": results,
+    }
@@ -0,0 +1,199 @@
+"""
+Serviços de estatísticas aproximadas de vendas (HyperLogLog + t-digest)
+"""
+from itertools import chain
+from sqlalchemy import select, true
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+from app.models import Sale as SaleModel, SaleSketch as SaleSketchModel
+from app.services import partition_service
+from app.services.partition_service import partition_sales
+from app.sketches import HyperLogLog, TDigest
+
+# Agregado de todos os produtos do dia
+ALL_PRODUCTS = 0
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _load(db: Session, day: str, product_id: int):
+    row = db.get(SaleSketchModel, (day, product_id))
+    if row is None:
+        return 0, HyperLogLog(), TDigest()
+    return row.sale_count, HyperLogLog.from_bytes(row.buyers_hll), TDigest.from_bytes(row.value_digest)
+
+
+def _store(db: Session, day: str, product_id: int, count: int, buyers: HyperLogLog, values: TDigest) -> None:
+    stmt = insert(SaleSketchModel).values(
+        day=day,
+        product_id=product_id,
+        sale_count=count,
+        buyers_hll=buyers.to_bytes(),
+        value_digest=values.to_bytes(),
+        dirty=False,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SaleSketchModel.day, SaleSketchModel.product_id],
+        set_={
+            "sale_count": stmt.excluded.sale_count,
+            "buyers_hll": stmt.excluded.buyers_hll,
+            "value_digest": stmt.excluded.value_digest,
+            "dirty": stmt.excluded.dirty,
+        },
+    ))
+
+
+def record_sale(db: Session, sale) -> None:
+    """
+    Atualizar sketches do dia (total e por produto) com uma venda
+
+    Executa na transação corrente; o commit fica a cargo do chamador. Deve
+    rodar na transação da venda: a escrita já detém o lock do banco, então
+    a leitura e a regravação do sketch não se intercalam com outros workers.
+    """
+    day = sale.sale_date.date().isoformat()
+    for product_id in (ALL_PRODUCTS, sale.product_id):
+        count, buyers, values = _load(db, day, product_id)
+        buyers.add(sale.user_id)
+        values.add(sale.total_price)
+        _store(db, day, product_id, count + 1, buyers, values)
+
+
+def mark_dirty(db: Session, sale) -> None:
+    """
+    Marcar os buckets da venda para reconstrução (sem commit)
+
+    Usado quando a atualização do sketch falha: a venda é gravada e a
+    manutenção refaz os buckets a partir de `sales` (`repair_dirty`).
+    """
+    day = sale.sale_date.date().isoformat()
+    for product_id in (ALL_PRODUCTS, sale.product_id):
+        stmt = insert(SaleSketchModel).values(
+            day=day,
+            product_id=product_id,
+            sale_count=0,
+            buyers_hll=HyperLogLog().to_bytes(),
+            value_digest=TDigest().to_bytes(),
+            dirty=True,
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[SaleSketchModel.day, SaleSketchModel.product_id], set_={"dirty": True},
+        ))
+
+
+def repair_dirty(db: Session) -> int:
+    """
+    Reconstruir os buckets marcados a partir das vendas do dia (sem commit)
+
+    Retorna a quantidade de buckets reconstruídos.
+    """
+    dirty = db.execute(
+        select(SaleSketchModel.day, SaleSketchModel.product_id).where(SaleSketchModel.dirty == true())
+    ).all()
+    for day, product_id in dirty:
+        current = date.fromisoformat(day)
+        hot = select(SaleModel.user_id, SaleModel.total_price).where(
+            *partition_service.date_range_conditions(SaleModel.sale_date, current, current)
+        )
+        archived = select(partition_sales.c.user_id, partition_sales.c.total_price).where(
+            *partition_service.date_range_conditions(partition_sales.c.sale_date, current, current)
+        )
+        if product_id != ALL_PRODUCTS:
+            hot = hot.where(SaleModel.product_id == product_id)
+            archived = archived.where(partition_sales.c.product_id == product_id)
+        count, buyers, values = 0, HyperLogLog(), TDigest()
+        for user_id, total_price in chain(
+            partition_service.iter_partition_rows(db, archived, current, current), db.execute(hot)
+        ):
+            count += 1
+            buyers.add(user_id)
+            values.add(total_price)
+        _store(db, day, product_id, count, buyers, values)
+    return len(dirty)
+
+
+def rebuild_sketches(db: Session, batch_size: int = 10000) -> int:
+    """
+    Reconstruir todos os sketches a partir da tabela de vendas
+
+    Usado para popular vendas anteriores à criação da tabela de sketches.
+    Retorna a quantidade de sketches gravados.
+    """
+    sketches = {}
+    query = db.query(SaleModel.user_id, SaleModel.product_id, SaleModel.total_price, SaleModel.sale_date)
+    archived = partition_service.iter_partition_rows(db, select(
+        partition_sales.c.user_id, partition_sales.c.product_id, partition_sales.c.total_price, partition_sales.c.sale_date
+    ))
+    for user_id, product_id, total_price, sale_date in chain(archived, query.yield_per(batch_size)):
+        day = sale_date.date().isoformat()
+        for key in ((day, ALL_PRODUCTS), (day, product_id)):
+            entry = sketches.get(key)
+            if entry is None:
+                entry = sketches[key] = [0, HyperLogLog(), TDigest()]
+            entry[0] += 1
+            entry[1].add(user_id)
+            entry[2].add(total_price)
+
+    db.query(SaleSketchModel).delete()
+    db.add_all(
+        SaleSketchModel(
+            day=day,
+            product_id=product_id,
+            sale_count=count,
+            buyers_hll=buyers.to_bytes(),
+            value_digest=values.to_bytes(),
+        )
+        for (day, product_id), (count, buyers, values) in sketches.items()
+    )
+    db.commit()
+    return len(sketches)
+
+
+def get_approx_stats(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[int] = None,
+    percentiles: List[int] = DEFAULT_PERCENTILES
+) -> dict:
+    """
+    Mesclar sketches do período e estimar compradores distintos e percentis
+    """
+    query = db.query(SaleSketchModel).filter(
+        SaleSketchModel.product_id == (product_id if product_id is not None else ALL_PRODUCTS)
+    )
+    if start_date:
+        query = query.filter(SaleSketchModel.day >= start_date.isoformat())
+    if end_date:
+        query = query.filter(SaleSketchModel.day <= end_date.isoformat())
+
+    buyers = HyperLogLog()
+    values = TDigest()
+    sales_count = 0
+    merged = 0
+    for row in query.all():
+        buyers.merge(HyperLogLog.from_bytes(row.buyers_hll))
+        values.merge(TDigest.from_bytes(row.value_digest))
+        sales_count += row.sale_count
+        merged += 1
+
+    estimate = buyers.estimate() if merged else 0.0
+    error = buyers.standard_error
+    return {
+        "sales_count": sales_count,
+        "sketches_merged": merged,
+        "distinct_buyers": {
+            "estimate": round(estimate),
+            "relative_standard_error": round(error, 4),
+            "interval_95": [max(0, round(estimate * (1 - 2 * error))), round(estimate * (1 + 2 * error))],
+        },
+        "order_value_percentiles": {
+            f"p{p}": {
+                "value": values.quantile(p / 100),
+                "max_rank_error": round(values.rank_error(p / 100), 4),
+            }
+            for p in percentiles
+        },
+    }
@@ -0,0 +1,183 @@
+"""
+Serviços para usuários: importação em lote
+"""
+import csv
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import http_cache
+from app.models import User as UserModel
+from app.services import change_service
+
+logger = logging.getLogger(__name__)
+
+# Linhas por commit na importação
+IMPORT_CHUNK_SIZE = int(os.getenv("USER_IMPORT_CHUNK_SIZE", "1000"))
+# Máximo de ocorrências (duplicados, inválidos...) detalhadas na resposta
+IMPORT_MAX_ISSUES = int(os.getenv("USER_IMPORT_MAX_ISSUES", "1000"))
+# Tamanho de cada IN contra o índice ix_users_email (limite de variáveis do SQLite)
+_EMAIL_LOOKUP_CHUNK = 500
+
+
+class RecordParser:
+    """
+    Converte linhas NDJSON ou CSV (com cabeçalho) em registros de usuário
+
+    No CSV cada registro ocupa uma linha; campos com quebra de linha não
+    são suportados.
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError("Formato de importação deve ser 'ndjson' ou 'csv'")
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+
+    def parse(self, line: str) -> Optional[dict]:
+        """Retorna o registro, None para linhas ignoradas, ou ValueError se inválida"""
+        if not line.strip():
+            return None
+        if self.fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError("JSON inválido")
+            if not isinstance(record, dict):
+                raise ValueError("Registro deve ser um objeto JSON")
+            return record
+        values = next(csv.reader([line]))
+        if self.header is None:
+            header = [name.strip().lower() for name in values]
+            if "email" not in header or "name" not in header:
+                raise ValueError("Cabeçalho CSV deve conter 'name' e 'email'")
+            self.header = header
+            return None
+        return dict(zip(self.header, values))
+
+
+class UserImporter:
+    """
+    Importação de usuários em lotes com deduplicação de emails
+
+    Emails repetidos no próprio arquivo são descartados por um conjunto em
+    memória; emails já cadastrados são detectados com IN em lotes contra o
+    índice de email. O INSERT usa ON CONFLICT DO NOTHING para não falhar se
+    outro processo cadastrar o mesmo email entre a consulta e a inserção.
+
+    `add` e `invalid` não acessam o banco; `flush` e `finish` sim, e numa
+    rota async devem rodar fora do event loop (`run_in_threadpool`).
+    """
+
+    def __init__(self, db: Session, chunk_size: int = IMPORT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError("Tamanho do lote deve ser positivo")
+        self.db = db
+        self.chunk_size = chunk_size
+        self._seen = set()
+        self._pending: List[Tuple[int, Dict[str, str]]] = []
+        self.stats = {
+            "processed": 0, "inserted": 0, "duplicates": 0, "existing": 0,
+            "conflicts": 0, "invalid": 0, "failed": 0, "chunks": 0,
+        }
+        self.issues: List[dict] = []
+
+    def _issue(self, line: int, status: str, detail: str, email: Optional[str] = None) -> None:
+        self.stats[status] += 1
+        if len(self.issues) < IMPORT_MAX_ISSUES:
+            issue = {"line": line, "status": status, "detail": detail}
+            if email is not None:
+                issue["email"] = email
+            self.issues.append(issue)
+
+    def invalid(self, line: int, detail: str) -> None:
+        """Registrar linha que não pôde ser interpretada"""
+        self.stats["processed"] += 1
+        self._issue(line, "invalid", detail)
+
+    def add(self, line: int, record: dict) -> bool:
+        """
+        Adicionar um registro ao lote pendente
+
+        Retorna True quando o lote atingiu chunk_size e deve ser gravado com
+        `flush`.
+        """
+        self.stats["processed"] += 1
+        name = str(record.get("name") or "").strip()
+        email = str(record.get("email") or "").strip()
+        if not name or not email:
+            self._issue(line, "invalid", "Campos 'name' e 'email' obrigatórios", email or None)
+            return False
+        if email in self._seen:
+            self._issue(line, "duplicates", "Email repetido no arquivo", email)
+            return False
+        self._seen.add(email)
+        self._pending.append((line, {"name": name, "email": email}))
+        return len(self._pending) >= self.chunk_size
+
+    def _existing_emails(self, emails: List[str]) -> set:
+        existing = set()
+        for start in range(0, len(emails), _EMAIL_LOOKUP_CHUNK):
+            chunk = emails[start:start + _EMAIL_LOOKUP_CHUNK]
+            existing.update(self.db.execute(select(UserModel.email).where(UserModel.email.in_(chunk))).scalars())
+        return existing
+
+    def flush(self) -> None:
+        """Gravar o lote pendente em uma transação"""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        existing = set()
+        try:
+            existing = self._existing_emails([row["email"] for _, row in batch])
+            new_rows = []
+            for line, row in batch:
+                if row["email"] in existing:
+                    self._issue(line, "existing", "Email já cadastrado", row["email"])
+                else:
+                    new_rows.append((line, row))
+
+            inserted = {}
+            if new_rows:
+                statement = (
+                    insert(UserModel)
+                    .on_conflict_do_nothing(index_elements=["email"])
+                    .returning(UserModel.email, UserModel.id)
+                )
+                inserted = dict(self.db.execute(statement, [row for _, row in new_rows]).all())
+                change_service.record_changes(self.db, "user", list(inserted.values()), "created")
+                http_cache.touch_tables(self.db, "users")
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.exception("Falha ao gravar lote de importação de usuários")
+            detail = str(e.orig) if getattr(e, "orig", None) is not None else str(e)
+            for line, row in batch:
+                if row["email"] not in existing:
+                    self._issue(line, "failed", detail, row["email"])
+            return
+
+        self.stats["inserted"] += len(inserted)
+        for line, row in new_rows:
+            if row["email"] not in inserted:
+                self._issue(line, "conflicts", "Email cadastrado durante a importação", row["email"])
+        self.stats["chunks"] += 1
+
+        logger.info("Importação de usuários: %(processed)d linhas, %(inserted)d inseridos", self.stats)
+
+    def finish(self) -> dict:
+        """Gravar o restante e retornar o resumo"""
+        self.flush()
+        return {
+            **self.stats,
+            "issues": self.issues,
+            "issues_truncated": len(self.issues) < sum(
+                self.stats[key] for key in ("duplicates", "existing", "conflicts", "invalid", "failed")
+            ),
+        }
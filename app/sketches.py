@@ -0,0 +1,230 @@
+"""
+Sketches probabilísticos mescláveis: HyperLogLog e t-digest
+
+HyperLogLog estima cardinalidade (compradores distintos) com erro padrão
+relativo de 1.04 / sqrt(m). O t-digest estima percentis com erro de rank
+menor nas caudas. Ambos podem ser mesclados e serializados em blobs
+compactos para persistência.
+"""
+import hashlib
+import math
+import re
+import struct
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+_HLL_VERSION = 1
+_TDIGEST_VERSION = 1
+
+_NONZERO = re.compile(b"[^\x00]")
+
+
+def _hash64(value) -> int:
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HyperLogLog:
+    """
+    Contador de cardinalidade aproximada
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("Precisão do HyperLogLog deve estar entre 4 e 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @property
+    def standard_error(self) -> float:
+        """Erro padrão relativo da estimativa"""
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value) -> None:
+        """Adicionar elemento"""
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        remaining = (h << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - self.precision + 1 if remaining == 0 else 65 - remaining.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Mesclar outro sketch (união), retornando self"""
+        if other.precision != self.precision:
+            raise ValueError("Sketches com precisões diferentes")
+        # Sketches diários costumam ser esparsos: visitar só registradores não nulos
+        registers, incoming = self.registers, other.registers
+        for match in _NONZERO.finditer(incoming):
+            index = match.start()
+            if incoming[index] > registers[index]:
+                registers[index] = incoming[index]
+        return self
+
+    def estimate(self) -> float:
+        """Estimar cardinalidade"""
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Correção para cardinalidades pequenas (linear counting)
+            return m * math.log(m / zeros)
+        return raw
+
+    def to_bytes(self) -> bytes:
+        """Serializar (registradores comprimidos com zlib)"""
+        return struct.pack("<BB", _HLL_VERSION, self.precision) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "HyperLogLog":
+        version, precision = struct.unpack_from("<BB", blob)
+        if version != _HLL_VERSION:
+            raise ValueError("Versão de HyperLogLog não suportada")
+        sketch = cls(precision)
+        sketch.registers = bytearray(zlib.decompress(blob[2:]))
+        return sketch
+
+
+class TDigest:
+    """
+    t-digest com fusão de centróides (função de escala k1)
+    """
+
+    def __init__(self, compression: float = 100.0, buffer_size: int = 500):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.centroids: List[Tuple[float, float]] = []
+        self._buffer: List[float] = []
+        # Centróides acrescentados fora de ordem (merge, pesos) ainda não ordenados
+        self._unsorted = False
+        self.count = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        """Adicionar valor"""
+        value = float(value)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.count += weight
+        if weight == 1.0:
+            self._buffer.append(value)
+        else:
+            self.centroids.append((value, weight))
+            self._unsorted = True
+        if len(self._buffer) >= self.buffer_size:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Mesclar outro digest, retornando self"""
+        other._compress()
+        if other.count == 0:
+            return self
+        self.centroids.extend(other.centroids)
+        self._unsorted = True
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        # Adiar a compressão: mesclar muitos digests custa uma única ordenação
+        if len(self.centroids) > self.buffer_size:
+            self._compress()
+        return self
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(min(max(k * 2 * math.pi / self.compression, -math.pi / 2), math.pi / 2)) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer and len(self.centroids) <= self.compression:
+            # Poucos centróides: basta ordená-los (sem fundir, mantém a precisão)
+            if self._unsorted:
+                self.centroids.sort()
+                self._unsorted = False
+            return
+        points = sorted(self.centroids + [(value, 1.0) for value in self._buffer])
+        self._buffer = []
+        self._unsorted = False
+        total = sum(weight for _, weight in points)
+        merged = []
+        mean, weight = points[0]
+        weight_so_far = 0.0
+        q_limit = self._k_inverse(self._k(0.0) + 1)
+        for next_mean, next_weight in points[1:]:
+            if (weight_so_far + weight + next_weight) / total <= q_limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                weight_so_far += weight
+                q_limit = self._k_inverse(self._k(weight_so_far / total) + 1)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimar o quantil q (0..1)"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target <= center:
+                span = center - previous_center
+                fraction = 0.0 if span == 0 else (target - previous_center) / span
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        span = self.count - previous_center
+        fraction = 0.0 if span == 0 else (target - previous_center) / span
+        return previous_mean + fraction * (self.max - previous_mean)
+
+    def rank_error(self, q: float) -> float:
+        """
+        Limite aproximado do erro de rank no quantil q
+
+        Metade da largura máxima de um centróide em q com a escala k1:
+        pi * sqrt(q(1-q)) / compressão.
+        """
+        return math.pi * math.sqrt(q * (1 - q)) / self.compression
+
+    def to_bytes(self) -> bytes:
+        """Serializar centróides"""
+        self._compress()
+        header = struct.pack("<BdddI", _TDIGEST_VERSION, self.compression,
+                             self.min if self.min is not None else math.nan,
+                             self.max if self.max is not None else math.nan,
+                             len(self.centroids))
+        body = b"".join(struct.pack("<dd", mean, weight) for mean, weight in self.centroids)
+        return header + body
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TDigest":
+        version, compression, minimum, maximum, size = struct.unpack_from("<BdddI", blob)
+        if version != _TDIGEST_VERSION:
+            raise ValueError("Versão de t-digest não suportada")
+        digest = cls(compression)
+        offset = struct.calcsize("<BdddI")
+        digest.centroids = [struct.unpack_from("<dd", blob, offset + 16 * i) for i in range(size)]
+        digest.count = sum(weight for _, weight in digest.centroids)
+        # Blobs gravados antes da ordenação no merge podem estar fora de ordem
+        digest._unsorted = True
+        digest.min = None if math.isnan(minimum) else minimum
+        digest.max = None if math.isnan(maximum) else maximum
+        return digest
+
+
+def merge_all(sketches: Iterable, empty):
+    """Mesclar uma sequência de sketches a partir de um sketch vazio"""
+    result = empty
+    for sketch in sketches:
+        result.merge(sketch)
+    return result
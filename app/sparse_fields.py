@@ -0,0 +1,67 @@
+"""
+Seleção de campos nas listagens (`?fields=id,name,price`)
+
+Os campos pedidos são validados contra os campos do schema completo da
+rota (a lista permitida) e `id` é sempre incluído. A consulta carrega só
+essas colunas (`load_only`) e a resposta é serializada por um modelo
+Pydantic com apenas esses campos, criado na primeira vez e reutilizado
+para a mesma combinação.
+"""
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import load_only
+
+# Combinações de campos com modelo em cache (por schema)
+MODEL_CACHE_SIZE = 256
+
+ALWAYS_INCLUDED = ("id",)
+
+
+def parse(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Campos pedidos na ordem do schema, ou None para todos
+
+    Levanta ValueError para campos fora do schema.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(schema.model_fields))
+    if unknown:
+        raise ValueError(
+            f"Campos inválidos: {', '.join(unknown)}. Permitidos: {', '.join(schema.model_fields)}"
+        )
+    requested.update(ALWAYS_INCLUDED)
+    return tuple(name for name in schema.model_fields if name in requested)
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def model_for(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Schema reduzido aos campos (mesmos tipos e padrões do schema completo)"""
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+    )
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _list_adapter(schema: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(List[model_for(schema, fields)])
+
+
+def load_columns(model, fields: Sequence[str]):
+    """Opção de consulta que carrega apenas as colunas dos campos"""
+    return load_only(*(getattr(model, name) for name in fields))
+
+
+def list_response(schema: Type[BaseModel], fields: Tuple[str, ...], items: list) -> Response:
+    """Resposta JSON da listagem apenas com os campos selecionados"""
+    adapter = _list_adapter(schema, fields)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(items, from_attributes=True)),
+        media_type="application/json",
+    )
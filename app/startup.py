@@ -0,0 +1,132 @@
+"""
+Perfil de inicialização do worker
+
+Registra marcos (imports, app montada, warm-up, pronto no yield do
+lifespan) em segundos desde o import deste módulo e, no Linux, a idade do
+processo quando ficou pronto (inclui interpretador e servidor).
+
+Com STARTUP_PROFILE=true também mede o tempo de import por módulo,
+envolvendo `builtins.__import__` até a aplicação ficar pronta (o mesmo
+recorte de `python -X importtime`, sem precisar da flag no servidor).
+Este módulo usa só a biblioteca padrão para poder ser o primeiro import.
+"""
+import builtins
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+# Módulos listados no relatório
+STARTUP_PROFILE_TOP = int(os.getenv("STARTUP_PROFILE_TOP", "15"))
+
+_T0 = time.perf_counter()
+_marks: Dict[str, float] = {}
+_ready_process_age: Optional[float] = None
+
+
+def process_age() -> Optional[float]:
+    """Segundos desde o início do processo (Linux), ou None"""
+    try:
+        with open("/proc/self/stat") as stat:
+            # Campos após o nome do executável (que pode conter espaços)
+            fields = stat.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as uptime:
+            system_uptime = float(uptime.read().split()[0])
+        return system_uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ImportTimer:
+    """
+    Tempo acumulado e próprio de cada import absoluto novo
+
+    Imports relativos e módulos já carregados passam direto; o tempo deles
+    entra no acumulado de quem os importou.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, List[float]] = {}  # nome -> [acumulado, próprio]
+        self._stack: List[List[float]] = []
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        frame = [0.0]  # tempo dos imports filhos
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += elapsed
+            self.records.setdefault(name, [elapsed, max(0.0, elapsed - frame[0])])
+
+    def install(self) -> None:
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def top(self, limit: int) -> List[dict]:
+        """Módulos mais caros pelo tempo próprio"""
+        ranked = sorted(self.records.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {"module": name, "self_ms": round(own * 1000, 1), "cumulative_ms": round(total * 1000, 1)}
+            for name, (total, own) in ranked
+        ]
+
+
+import_timer = ImportTimer()
+if STARTUP_PROFILE:
+    import_timer.install()
+
+
+def mark(name: str) -> float:
+    """Registrar um marco; retorna segundos desde o início"""
+    elapsed = time.perf_counter() - _T0
+    _marks[name] = elapsed
+    return elapsed
+
+
+def is_ready() -> bool:
+    """Lifespan concluiu o aquecimento"""
+    return "ready" in _marks
+
+
+def ready() -> dict:
+    """Marcar a aplicação como pronta, encerrar a medição e registrar o relatório"""
+    global _ready_process_age
+    mark("ready")
+    _ready_process_age = process_age()
+    import_timer.uninstall()
+    summary = report()
+    phases = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in summary["phases"].items())
+    logger.info("Inicialização: %s (processo com %s)", phases,
+                f"{_ready_process_age:.2f}s" if _ready_process_age is not None else "idade desconhecida")
+    for module in summary.get("imports", []):
+        logger.info("  import %-45s próprio %7.1fms  acumulado %7.1fms",
+                    module["module"], module["self_ms"], module["cumulative_ms"])
+    return summary
+
+
+def report() -> dict:
+    """Marcos registrados e, no modo de perfil, os imports mais caros"""
+    summary = {
+        "phases": dict(_marks),
+        "process_age_at_ready": _ready_process_age,
+    }
+    if STARTUP_PROFILE:
+        summary["imports"] = import_timer.top(STARTUP_PROFILE_TOP)
+    return summary
@@ -0,0 +1,91 @@
+"""
+Aquecimento do worker antes de reportar pronto
+
+Abre conexões das engines, executa uma vez as consultas quentes (com ids e
+períodos que não retornam linhas) para preencher o cache de compilação do
+SQLAlchemy e carrega os caches em memória habilitados. Statements de
+escrita não são executados: compilam na primeira requisição.
+Falhas são registradas e não impedem a inicialização.
+"""
+import logging
+import os
+import time
+from datetime import date
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import text
+
+from app import database
+from app.services import analytics_service, partition_service, product_service, sales_service
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
+# Período sem vendas: percorre manifesto de partições e índices sem custo
+_EMPTY_DAY = date(1970, 1, 1)
+_MISSING_ID = -1
+
+
+def _connect(db) -> None:
+    # RoutingSession: engines de escrita e de leitura
+    engines = {db.get_bind()} | {getattr(db, name) for name in ("writer", "reader") if getattr(db, name, None)}
+    for engine in engines:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+def _product_queries(db) -> None:
+    product_service.get_product(db, _MISSING_ID)
+    product_service.get_product_version(db, _MISSING_ID)
+    product_service.get_products(db, skip=0, limit=1)
+    product_service.get_products_by_name(db, "")
+    db.execute(sales_service._SELECT_USER_ID, {"user_id": _MISSING_ID}).first()
+    db.execute(sales_service._SELECT_ACTIVE_PRODUCT, {"product_id": _MISSING_ID}).first()
+
+
+def _sales_queries(db) -> None:
+    sales_service.get_sale(db, _MISSING_ID)
+    sales_service.get_sales_after(db, 2 ** 62, limit=1)
+    sales_service.get_sales_by_date_range(db, _EMPTY_DAY, _EMPTY_DAY)
+    sales_service.get_sales_summary(db, _EMPTY_DAY, _EMPTY_DAY)
+    sales_service.get_total_sales_value(db, _EMPTY_DAY, _EMPTY_DAY)
+
+
+def _caches(db) -> None:
+    partition_service.get_partitions(db)
+    if analytics_service.is_enabled():
+        analytics_service.get_snapshot(db)
+
+
+STEPS: List[Tuple[str, Callable]] = [
+    ("connections", _connect),
+    ("product_queries", _product_queries),
+    ("sales_queries", _sales_queries),
+    ("caches", _caches),
+]
+
+
+def warm_up(session_factory=None) -> Dict[str, dict]:
+    """
+    Executar as etapas de aquecimento, retornando duração e erro de cada uma
+    """
+    session_factory = session_factory or database.SessionLocal
+    results = {}
+    db = session_factory()
+    db.info["route_reads"] = True
+    try:
+        for name, step in STEPS:
+            start = time.perf_counter()
+            error = None
+            try:
+                step(db)
+            except Exception as e:
+                db.rollback()
+                error = str(e)
+                logger.warning("Aquecimento '%s' falhou: %s", name, e)
+            results[name] = {"ms": round((time.perf_counter() - start) * 1000, 1), "error": error}
+    finally:
+        db.close()
+    logger.info("Aquecimento concluído: %s", ", ".join(f"{name}={r['ms']}ms" for name, r in results.items()))
+    return results
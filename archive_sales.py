@@ -0,0 +1,40 @@
+"""
+Script para arquivar meses fechados de vendas em partições comprimidas
+
+Uso:
+    python archive_sales.py [meses_quentes]
+"""
+import sys
+
+from app.database import SessionLocal
+from app.services import partition_service
+
+
+def archive(hot_months: int) -> bool:
+    """Arquivar meses anteriores à janela quente"""
+    db = SessionLocal()
+    try:
+        cutoff = partition_service.hot_cutoff(hot_months=hot_months)
+        print(f"📅 Mantendo na tabela quente vendas a partir de {cutoff.isoformat()}")
+        results = partition_service.archive_closed_months(db, hot_months=hot_months)
+        if not results:
+            print("✅ Nenhum mês fechado para arquivar")
+        for result in results:
+            if not result["archived"]:
+                continue
+            print(f"  📦 {result['month']}: {result['archived']} vendas movidas "
+                  f"({result['raw_size'] / 1024:.0f} KiB -> {result['compressed_size'] / 1024:.0f} KiB)")
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao arquivar vendas: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    months = int(sys.argv[1]) if len(sys.argv) > 1 else partition_service.HOT_MONTHS
+    print("🗄️  Arquivando vendas...")
+    print("=" * 50)
+    success = archive(months)
+    sys.exit(0 if success else 1)
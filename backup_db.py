@@ -0,0 +1,71 @@
+"""
+Script para gerar e verificar backups online do banco SQLite
+
+Uso:
+    python backup_db.py [--compress] [--keep N]   # gerar backup
+    python backup_db.py --list                    # listar backups
+    python backup_db.py --verify ARQUIVO          # restaurar em temporário e verificar
+"""
+import argparse
+import sys
+
+from app.services import backup_service
+
+
+def backup(compress: bool, keep: int) -> bool:
+    """Gerar backup com a API de backup do SQLite"""
+    try:
+        result = backup_service.backup_database(compress=compress, keep=keep)
+    except Exception as e:
+        print(f"❌ Erro ao gerar backup: {e}")
+        return False
+    print(f"✅ Backup gerado: {result['path']}")
+    print(f"   {result['raw_size'] / 1024:.0f} KiB" + (f" -> {result['size'] / 1024:.0f} KiB (gzip)" if result["compressed"] else ""))
+    print(f"   {result['steps']} passos, {result['restarts']} reinícios, {result['total_seconds']:.2f}s")
+    for table, rows in result["rows"].items():
+        print(f"   📋 {table}: {rows} registros")
+    for name in result["removed"]:
+        print(f"   🗑️  Removido: {name}")
+    return True
+
+
+def verify(path: str) -> bool:
+    """Verificar integridade e registros de um backup"""
+    try:
+        result = backup_service.verify_backup(path)
+    except Exception as e:
+        print(f"❌ Erro ao verificar backup: {e}")
+        return False
+    print(f"{'✅' if result['ok'] else '❌'} integrity_check: {', '.join(result['integrity'][:5])}")
+    for table, rows in result["rows"].items():
+        print(f"   📋 {table}: {rows} registros")
+    return result["ok"]
+
+
+def list_backups() -> bool:
+    """Listar backups do diretório"""
+    backups = backup_service.list_backups()
+    if not backups:
+        print(f"Nenhum backup em {backup_service.BACKUP_DIR}")
+    for item in backups:
+        print(f"  💾 {item['name']} ({item['size'] / 1024:.0f} KiB)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backups online do banco SQLite")
+    parser.add_argument("--compress", action="store_true", default=backup_service.BACKUP_COMPRESS, help="Comprimir com gzip")
+    parser.add_argument("--keep", type=int, default=backup_service.BACKUP_KEEP, help="Backups mantidos (0 mantém todos)")
+    parser.add_argument("--list", action="store_true", help="Listar backups")
+    parser.add_argument("--verify", metavar="ARQUIVO", help="Verificar um backup")
+    args = parser.parse_args()
+
+    print("💾 Backup do banco SQLite...")
+    print("=" * 50)
+    if args.verify:
+        success = verify(args.verify)
+    elif args.list:
+        success = list_backups()
+    else:
+        success = backup(args.compress, args.keep)
+    sys.exit(0 if success else 1)
@@ -1,50 +1,41 @@
 """
 Script para verificar estrutura do banco SQLite
 """
-import sqlite3
 import sys
 import os
 
-def check_database():
-    """Verificar estrutura do banco de dados"""
-    db_path = "sales_portal.db"
-    
+from app.services import backup_service
+
+def check_database(db_path: str = "sales_portal.db"):
+    """Verificar integridade e estrutura do banco de dados"""
     if not os.path.exists(db_path):
         print("❌ Banco de dados não encontrado!")
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Listar todas as tabelas
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
+        # Backups comprimidos são restaurados num arquivo temporário
+        with backup_service.restored(db_path) as path:
+            result = backup_service.inspect_database(path)
         
         print("✅ Banco de dados encontrado!")
-        print(f"📊 Tabelas encontradas: {len(tables)}")
+        status = "✅" if result["ok"] else "❌"
+        print(f"{status} integrity_check: {', '.join(result['integrity'][:5])}")
+        print(f"📊 Tabelas encontradas: {len(result['tables'])}")
         
-        for table in tables:
-            table_name = table[0]
+        for table_name, table in result["tables"].items():
             print(f"  📋 {table_name}")
             
-            # Verificar estrutura da tabela
-            cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = cursor.fetchall()
-            
-            for col in columns:
-                col_name = col[1]
-                col_type = col[2]
-                is_pk = " (PK)" if col[5] else ""
-                print(f"    - {col_name}: {col_type}{is_pk}")
+            # Estrutura da tabela
+            for col in table["columns"]:
+                is_pk = " (PK)" if col["primary_key"] else ""
+                print(f"    - {col['name']}: {col['type']}{is_pk}")
             
-            # Contar registros
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
-            count = cursor.fetchone()[0]
-            print(f"    📊 Registros: {count}")
+            print(f"    📊 Registros: {table['rows']}")
             print()
         
-        conn.close()
+        if not result["ok"]:
+            print("💥 Banco com problemas de integridade!")
+            return False
         print("🎉 Verificação concluída com sucesso!")
         return True
         
@@ -55,5 +46,6 @@ def check_database():
 if __name__ == "__main__":
     print("🔍 Verificando estrutura do banco SQLite...")
     print("=" * 50)
-    success = check_database()
+    # Caminho opcional: verificar um backup (python check_db.py backups/arquivo.db.gz)
+    success = check_database(*sys.argv[1:2])
     sys.exit(0 if success else 1)
@@ -1,8 +1,20 @@
 import os
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+# Primeiro import da aplicação: marca o início e, com STARTUP_PROFILE, mede os demais imports
+from app import startup
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app import health, metrics
+from app.maintenance import scheduler as maintenance_scheduler
+from app.invalidation import bus as invalidation_bus
+from app.compression import CompressionMiddleware
+from app.rate_limit import RATE_LIMIT_CLIENT_HEADER, RATE_LIMIT_ENABLED, RateLimitMiddleware
+from app.db_pool import POOL_TIMEOUT, check_held_connections
+from app.query_timeout import QueryAborted
+from app.warmup import STARTUP_WARMUP, warm_up
 from app.database import engine
 from app.models import Base
 
@@ -23,10 +35,23 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Aplicação iniciada")
     # Nota: Tabelas são criadas via migrations (alembic)
+    # Com vários workers (CACHE_BUS=sqlite), receber invalidações dos demais
+    invalidation_bus.start()
+    # Compilar consultas quentes e carregar caches antes de aceitar requisições
+    if STARTUP_WARMUP:
+        startup.mark("warmup_start")
+        warm_up()
+        startup.mark("warmup_end")
+    startup.ready()
+    # ANALYZE, PRAGMA optimize, incremental_vacuum e checkpoints do WAL
+    maintenance_scheduler.start()
     
     yield
     
-    # Shutdown
+    # Shutdown: sair do balanceamento antes de liberar recursos
+    health.probe.drain()
+    maintenance_scheduler.stop()
+    invalidation_bus.stop()
     logger.info("Aplicação finalizada")
 
 
@@ -48,11 +73,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Configurar compressão de respostas (gzip sempre; br/zstd se instalados)
+if os.getenv("COMPRESSION_ENABLED", "true").lower() == "true":
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(","),
+        minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        cache_size=int(os.getenv("COMPRESSION_CACHE_SIZE", "256")),
+    )
+
+# Limitação de taxa e descarte por prioridade (mais externo: recusa antes de comprimir)
+if RATE_LIMIT_ENABLED:
+    if not RATE_LIMIT_CLIENT_HEADER:
+        logger.warning(
+            "RATE_LIMIT_CLIENT_HEADER não definido: clientes identificados pelo endereço da conexão "
+            "(atrás de proxy, todos compartilham o mesmo bucket)"
+        )
+    app.add_middleware(RateLimitMiddleware)
+
+# Pool esgotado: sinalizar sobrecarga em vez de erro interno
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    logger.warning("Timeout ao obter conexão do pool: %s", exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Banco de dados sobrecarregado, tente novamente"},
+        headers={"Retry-After": str(max(1, int(POOL_TIMEOUT)))},
+    )
+
+# Consulta interrompida: prazo esgotado (504) ou cliente desconectado (503)
+@app.exception_handler(QueryAborted)
+async def query_aborted_handler(request: Request, exc: QueryAborted):
+    if exc.reason == "timeout":
+        return JSONResponse(
+            status_code=504,
+            content={"detail": f"Consulta excedeu o tempo limite de {exc.timeout:g}s; reduza o período"},
+        )
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Consulta cancelada: cliente desconectado"},
+        headers={"Retry-After": "1"},
+    )
+
 # Incluir routers
-from app.routers import users, products, sales
+from app.routers import users, products, sales, changes, admin
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(products.router, prefix="/api/v1")
 app.include_router(sales.router, prefix="/api/v1")
+app.include_router(changes.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
+
+startup.mark("app_created")
 
 # Rota raiz
 @app.get("/")
@@ -66,6 +137,29 @@ async def health_check():
     logger.debug("Health check acessado")
     return {"status": "healthy", "debug": os.getenv("DEBUG", "false")}
 
+# Liveness: o processo responde (não consulta o banco)
+@app.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+# Readiness: inicialização concluída e banco, pool, WAL e fila de escrita saudáveis
+@app.get("/health/ready")
+async def readiness():
+    result = await health.probe.check()
+    status_code = 200 if result["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=result, headers={"Cache-Control": "no-store"})
+
+# Marcos da inicialização (e imports mais caros com STARTUP_PROFILE=true)
+@app.get("/health/startup")
+async def startup_report():
+    return startup.report()
+
+# Métricas no formato Prometheus
+@app.get("/metrics")
+async def read_metrics():
+    check_held_connections()
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 # Exemplo de rota com parâmetros
 @app.get("/items/{item_id}")
 async def read_item(item_id: int, q: str = None):
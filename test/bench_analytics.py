@@ -0,0 +1,99 @@
+"""
+Benchmark: motor NumPy x caminho SQL para resumos e agrupamentos de vendas
+
+Uso:
+    python test/bench_analytics.py [quantidade_de_vendas]
+"""
+import random
+import sys
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.services import analytics_service, sales_service
+
+
+def populate(db, count: int):
+    """Inserir produtos, usuários e vendas sintéticas"""
+    db.execute(text("INSERT INTO users (name, email, is_active) VALUES (:n, :e, 1)"),
+               [{"n": f"U{i}", "e": f"u{i}@example.com"} for i in range(1000)])
+    db.execute(text("INSERT INTO products (name, price, stock_quantity, is_active) VALUES (:n, :p, 0, 1)"),
+               [{"n": f"P{i}", "p": 1 + i % 50} for i in range(500)])
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        quantity = random.randint(1, 5)
+        price = float(random.randint(1, 500))
+        rows.append({
+            "u": random.randint(1, 1000), "p": random.randint(1, 500), "q": quantity,
+            "up": price, "t": price * quantity,
+            "d": start + timedelta(minutes=i * 525600 // count),
+        })
+    db.execute(text(
+        "INSERT INTO sales (user_id, product_id, quantity, unit_price, total_price, sale_date) "
+        "VALUES (:u, :p, :q, :up, :t, :d)"
+    ), rows)
+    db.commit()
+
+
+def timed(label: str, fn, rounds: int = 5):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"  {label:<40}{elapsed * 1000:>10.2f} ms")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    if analytics_service.load_numpy() is None:
+        print("❌ NumPy não instalado")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        print(f"📦 Gerando {count} vendas...")
+        populate(db, count)
+
+        snapshot = analytics_service.SalesSnapshot()
+        start = time.perf_counter()
+        snapshot.refresh(db)
+        print(f"⏱️  Carga inicial do snapshot: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        month = (date(2024, 6, 1), date(2024, 6, 30))
+        print("\n📊 Resumo (ano inteiro / um mês)")
+        timed("SQL get_sales_summary (tudo)", lambda: sales_service.get_sales_summary(db))
+        timed("NumPy summary (tudo)", lambda: snapshot.summary())
+        timed("SQL get_sales_summary (mês)", lambda: sales_service.get_sales_summary(db, *month))
+        timed("NumPy summary (mês)", lambda: snapshot.summary(*month))
+
+        print("\n📊 Agrupamentos (ano inteiro)")
+        for group_by in ("product", "user", "day"):
+            timed(f"SQL GROUP BY {group_by}", lambda: sales_service.get_sales_grouped(db, group_by))
+            timed(f"NumPy bincount {group_by}", lambda: snapshot.group_totals(group_by))
+
+        print("\n🔄 Atualização incremental")
+        db.execute(text(
+            "INSERT INTO sales (user_id, product_id, quantity, unit_price, total_price, sale_date) "
+            "VALUES (1, 1, 1, 1.0, 1.0, :d)"
+        ), [{"d": datetime(2025, 1, 1)} for _ in range(100)])
+        db.commit()
+        timed("refresh com 100 vendas novas", lambda: snapshot.refresh(db), rounds=1)
+        timed("refresh sem vendas novas", lambda: snapshot.refresh(db))
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: sincronização de catálogo linha a linha x upsert/estoque em lote
+
+Uso:
+    python test/bench_bulk_products.py [quantidade_de_produtos]
+"""
+import random
+import sys
+import os
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas import ProductCreate, ProductUpsertItem, StockAdjustment
+from app.services import product_service
+
+
+def _session(tmp: str, name: str):
+    engine = create_engine(f"sqlite:///{tmp}/{name}.db")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def _report(label: str, rows: int, elapsed: float):
+    print(f"  {label:<28} {elapsed * 1000:>9.0f} ms  {rows / elapsed:>10.0f} linhas/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    items = [
+        ProductUpsertItem(sku=f"ERP-{i}", name=f"Produto {i}", price=float(1 + i % 90), stock_quantity=100)
+        for i in range(count)
+    ]
+    deltas = [random.randint(-50, 50) for _ in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"📦 {count} produtos")
+
+        print("\n🐢 Linha a linha (um commit por produto)")
+        engine, db = _session(tmp, "row")
+        start = time.perf_counter()
+        ids = [product_service.create_product(db, ProductCreate(**item.model_dump(exclude={"id", "is_active"}))).id
+               for item in items]
+        _report("create_product", count, time.perf_counter() - start)
+        start = time.perf_counter()
+        for product_id, delta in zip(ids, deltas):
+            product_service.update_stock(db, product_id, delta)
+        _report("update_stock", count, time.perf_counter() - start)
+        db.close()
+        engine.dispose()
+
+        print("\n🚀 Em lote")
+        engine, db = _session(tmp, "bulk")
+        start = time.perf_counter()
+        result = product_service.bulk_upsert_products(db, items)
+        _report("bulk_upsert (criação)", result["created"], time.perf_counter() - start)
+        start = time.perf_counter()
+        result = product_service.bulk_upsert_products(db, items)
+        _report("bulk_upsert (atualização)", result["updated"], time.perf_counter() - start)
+        ids = [row["id"] for row in result["results"]]
+        start = time.perf_counter()
+        product_service.bulk_update_stock(
+            db, [StockAdjustment(product_id=product_id, quantity_change=delta) for product_id, delta in zip(ids, deltas)]
+        )
+        _report("bulk_update_stock", count, time.perf_counter() - start)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark de compressão: custo de CPU x bytes economizados
+
+Uso:
+    python test/bench_compression.py [quantidade_de_produtos]
+"""
+import json
+import sys
+import os
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.compression import CompressedBodyCache, available_encodings
+
+
+def build_payload(count: int) -> bytes:
+    """Gerar JSON semelhante a uma página de /products/"""
+    products = [
+        {
+            "id": i,
+            "name": f"Produto {i}",
+            "description": f"Descrição detalhada do produto {i} para o catálogo das lojas",
+            "price": round(10 + i * 0.37, 2),
+            "stock_quantity": i % 97,
+            "is_active": True,
+            "created_at": "2025-08-15T16:46:36",
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+    return json.dumps(products).encode()
+
+
+def bench(encoder, payload: bytes, level: int, rounds: int = 20):
+    """Medir tempo médio de compressão e tamanho resultante"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        compressed = encoder(payload, level)
+    elapsed = (time.perf_counter() - start) / rounds
+    return elapsed, len(compressed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    payload = build_payload(count)
+    print(f"📦 Payload: {count} produtos, {len(payload) / 1024:.1f} KiB")
+    print("=" * 72)
+    print(f"{'codificação':<12}{'nível':>6}{'ms/resp':>10}{'MiB/s':>10}{'KiB':>10}{'economia':>12}")
+
+    levels = {"gzip": (1, 6, 9), "br": (1, 4, 11), "zstd": (1, 3, 19)}
+    for coding, encoder in available_encodings().items():
+        for level in levels[coding]:
+            elapsed, size = bench(encoder, payload, level)
+            throughput = len(payload) / elapsed / (1024 * 1024)
+            saved = 100 * (1 - size / len(payload))
+            print(f"{coding:<12}{level:>6}{elapsed * 1000:>10.2f}{throughput:>10.1f}{size / 1024:>10.1f}{saved:>11.1f}%")
+
+    # Acerto no cache de corpos comprimidos
+    cache = CompressedBodyCache()
+    key = ("/api/v1/products/", b"", 'W/"bench"', "gzip")
+    cache.put(key, available_encodings()["gzip"](payload, 6))
+    rounds = 10000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cache.get(key)
+    elapsed = (time.perf_counter() - start) / rounds
+    print("=" * 72)
+    print(f"⚡ Acerto no cache comprimido: {elapsed * 1e6:.2f} µs/resp")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: POST /sales com o caminho de escrita anterior x RETURNING
+
+O caminho anterior faz commit da venda, refresh, relê o produto, faz um
+segundo commit para o estoque e recarrega os objetos expirados. O atual
+baixa o estoque e insere a venda com RETURNING em uma única transação, em
+uma sessão com expire_on_commit=False.
+
+Uso:
+    python test/bench_create_sale.py [requisições]
+"""
+import logging
+import sys
+import os
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.broadcast import sales_hub, sale_payload
+from app.database import Base, get_db
+from app.models import Sale as SaleModel
+from app.services import sales_service, sketch_service
+from app.services.product_service import update_stock
+from bench_analytics import populate
+from main import app
+
+
+def legacy_create_sale(db, sale):
+    """Implementação anterior (commit + refresh + update_stock)"""
+    if db.execute(sales_service._SELECT_USER_ID, {"user_id": sale.user_id}).first() is None:
+        raise ValueError("Usuário não encontrado")
+    product = db.scalars(sales_service._SELECT_ACTIVE_PRODUCT, {"product_id": sale.product_id}).first()
+    if not product:
+        raise ValueError("Produto não encontrado ou inativo")
+    if product.stock_quantity < sale.quantity:
+        raise ValueError(f"Estoque insuficiente. Disponível: {product.stock_quantity}")
+    unit_price = sale.unit_price if sale.unit_price else product.price
+    db_sale = SaleModel(
+        user_id=sale.user_id, product_id=sale.product_id, quantity=sale.quantity,
+        unit_price=unit_price, total_price=unit_price * sale.quantity
+    )
+    db.add(db_sale)
+    db.commit()
+    db.refresh(db_sale)
+    update_stock(db, sale.product_id, -sale.quantity)
+    sketch_service.record_sale(db, db_sale)
+    db.commit()
+    sales_hub.publish_sale_created(db_sale.id, sale_payload(db_sale))
+    return db_sale
+
+
+def run(client, requests: int, statements: list) -> tuple:
+    """Requisições por segundo e statements por requisição"""
+    for i in range(100):
+        client.post("/api/v1/sales/", json={"user_id": 1 + i % 1000, "product_id": 1 + i % 500, "quantity": 1})
+    statements.clear()
+    start = time.perf_counter()
+    for i in range(requests):
+        response = client.post(
+            "/api/v1/sales/", json={"user_id": 1 + i % 1000, "product_id": 1 + i % 500, "quantity": 1}
+        )
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, len(statements) / requests
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        # WAL + synchronous=NORMAL: sem fsync por commit o custo medido é o dos statements
+        event.listen(engine, "connect", lambda conn, record: conn.executescript(
+            "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;"
+        ))
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        populate(db, 10_000)
+        db.execute(text("UPDATE products SET stock_quantity = 1000000"))
+        db.commit()
+        db.close()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        client = TestClient(app)
+        results = []
+        original = sales_service.create_sale
+        for label, create_sale, expire_on_commit in (
+            ("anterior (refresh)", legacy_create_sale, True),
+            ("RETURNING", original, False),
+        ):
+            Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=expire_on_commit)
+
+            def override_get_db():
+                session = Session()
+                try:
+                    yield session
+                finally:
+                    session.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            sales_service.create_sale = create_sale
+            try:
+                results.append((label, *run(client, requests, statements)))
+            finally:
+                sales_service.create_sale = original
+                app.dependency_overrides.pop(get_db, None)
+
+        print(f"⏱️  {requests} requisições POST /sales por caminho\n")
+        print(f"  {'caminho':<22}{'req/s':>10}{'statements/req':>17}")
+        for label, rate, per_request in results:
+            print(f"  {label:<22}{rate:>10.0f}{per_request:>17.1f}")
+        print(f"\n🚀 Ganho: {results[1][1] / results[0][1]:.2f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: custo do middleware de limitação de taxa por requisição
+
+Mede uma aplicação ASGI trivial com e sem o RateLimitMiddleware e o custo
+do token bucket com poucos e com muitos clientes (busca em O(1)).
+
+Uso:
+    python test/bench_rate_limit.py [requisições]
+"""
+import asyncio
+import sys
+import os
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rate_limit import RateLimitMiddleware, TokenBuckets, classify
+
+PATHS = [
+    ("POST", "/api/v1/sales/"),
+    ("GET", "/api/v1/products/"),
+    ("GET", "/api/v1/products/17"),
+    ("GET", "/api/v1/sales/summary"),
+    ("DELETE", "/api/v1/sales/42"),
+]
+
+
+async def trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def measure(app, requests: int, clients: int) -> float:
+    """Microssegundos por requisição"""
+    scopes = []
+    for i in range(clients):
+        method, path = PATHS[i % len(PATHS)]
+        client = (f"10.0.{i // 256 % 256}.{i % 256}", 1)
+        scopes.append({"type": "http", "method": method, "path": path, "client": client, "headers": []})
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scopes[i % clients], receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def bench_buckets(calls: int, clients: int) -> float:
+    buckets = TokenBuckets(rate=1e9, burst=1e9, max_clients=clients)
+    names = [f"client-{i}" for i in range(clients)]
+    start = time.perf_counter()
+    for i in range(calls):
+        buckets.take(names[i % clients])
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def bench_classify(calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        classify(*PATHS[i % len(PATHS)])
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    limited = RateLimitMiddleware(trivial_app, rate=1e9, burst=1e9, max_inflight=10**6)
+
+    print(f"⏱️  {requests} requisições ASGI por caso\n")
+    base = await measure(trivial_app, requests, 1000)
+    print(f"  {'sem middleware':<32}{base:>8.2f} µs/req")
+    for clients in (10, 10_000):
+        cost = await measure(limited, requests, clients)
+        print(f"  {f'com middleware ({clients} clientes)':<32}{cost:>8.2f} µs/req  (+{cost - base:.2f} µs)")
+
+    print("\n🪣 Token bucket (ns por chamada)")
+    for clients in (10, 1_000, 100_000):
+        print(f"  {clients:>7} clientes: {bench_buckets(requests, clients):>7.0f} ns")
+    print(f"\n🧭 Classificação de rota: {bench_classify(requests):.0f} ns por chamada")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark: estatísticas aproximadas (sketches) x SQL exato
+
+Compara COUNT(DISTINCT user_id) e percentis por ordenação completa com a
+mesclagem de sketches diários, reportando tempo e erro observado.
+
+Uso:
+    python test/bench_sketches.py [quantidade_de_vendas]
+"""
+import sys
+import os
+import tempfile
+import time
+from datetime import date
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.services import sketch_service
+from bench_analytics import populate
+
+
+def exact_stats(db, start: date, end: date) -> dict:
+    """Estatísticas exatas via SQL"""
+    params = {"start": start.isoformat(), "end": end.isoformat()}
+    where = "WHERE date(sale_date) BETWEEN :start AND :end"
+    distinct = db.execute(text(f"SELECT COUNT(DISTINCT user_id) FROM sales {where}"), params).scalar()
+    values = [row[0] for row in db.execute(text(f"SELECT total_price FROM sales {where} ORDER BY total_price"), params)]
+    percentiles = {p: values[max(0, int(p / 100 * len(values)) - 1)] for p in (50, 90, 99)}
+    return {"distinct": distinct, "percentiles": percentiles}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        print(f"📦 Gerando {count} vendas...")
+        populate(db, count)
+
+        start = time.perf_counter()
+        built = sketch_service.rebuild_sketches(db)
+        print(f"⏱️  Construção de {built} sketches: {(time.perf_counter() - start) * 1000:.0f} ms")
+        size = db.execute(text("SELECT SUM(LENGTH(buyers_hll) + LENGTH(value_digest)) FROM sales_sketches")).scalar()
+        print(f"💾 Tamanho total dos blobs: {size / 1024:.0f} KiB")
+
+        for label, period in [("um mês", (date(2024, 6, 1), date(2024, 6, 30))),
+                              ("ano inteiro", (date(2024, 1, 1), date(2024, 12, 31)))]:
+            print(f"\n📊 Período: {label}")
+            t0 = time.perf_counter()
+            exact = exact_stats(db, *period)
+            t_exact = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            approx = sketch_service.get_approx_stats(db, *period)
+            t_approx = time.perf_counter() - t0
+
+            estimate = approx["distinct_buyers"]["estimate"]
+            print(f"  SQL exato:  {t_exact * 1000:>8.1f} ms   distintos={exact['distinct']}")
+            print(f"  Sketches:   {t_approx * 1000:>8.1f} ms   distintos={estimate} "
+                  f"(erro {abs(estimate - exact['distinct']) / max(exact['distinct'], 1):.2%}, "
+                  f"erro padrão {approx['distinct_buyers']['relative_standard_error']:.2%})")
+            for p in (50, 90, 99):
+                value = approx["order_value_percentiles"][f"p{p}"]["value"]
+                print(f"    p{p}: exato={exact['percentiles'][p]:.2f} aproximado={value:.2f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
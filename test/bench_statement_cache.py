@@ -0,0 +1,92 @@
+"""
+Benchmark: custo por chamada de db.query(...) x statements pré-construídos
+
+Compara as consultas de leitura dos serviços no estilo anterior (Query do
+ORM montada a cada chamada) com os select() de módulo usados hoje, e mostra
+os acertos no cache de compilação.
+
+Uso:
+    python test/bench_statement_cache.py [chamadas]
+"""
+import sys
+import os
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import db_pool
+from app.database import Base
+from app.models import Product as ProductModel, Sale as SaleModel, User as UserModel
+from app.services import product_service, sales_service
+from bench_analytics import populate
+
+
+def legacy_get_product(db, product_id):
+    return db.query(ProductModel).filter(ProductModel.id == product_id).first()
+
+
+def legacy_get_sale(db, sale_id):
+    return db.query(SaleModel).filter(SaleModel.id == sale_id).first()
+
+
+def legacy_create_sale_lookups(db, user_id, product_id):
+    db.query(UserModel).filter(UserModel.id == user_id).first()
+    return db.query(ProductModel).filter(ProductModel.id == product_id, ProductModel.is_active == True).first()
+
+
+def new_create_sale_lookups(db, user_id, product_id):
+    db.execute(sales_service._SELECT_USER_ID, {"user_id": user_id}).first()
+    return db.scalars(sales_service._SELECT_ACTIVE_PRODUCT, {"product_id": product_id}).first()
+
+
+def measure(db, function, calls: int) -> float:
+    """Microssegundos por chamada (identity map limpo a cada 100 chamadas)"""
+    for i in range(200):
+        function(i)
+    db.expunge_all()
+    start = time.perf_counter()
+    for i in range(calls):
+        function(i)
+        if i % 100 == 99:
+            db.expunge_all()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        db_pool.instrument_engine(engine, "bench")
+        db = sessionmaker(bind=engine)()
+        populate(db, 50_000)
+
+        cases = [
+            ("get_product", lambda i: legacy_get_product(db, 1 + i % 500),
+             lambda i: product_service.get_product(db, 1 + i % 500)),
+            ("get_sale", lambda i: legacy_get_sale(db, 1 + i % 50_000),
+             lambda i: sales_service.get_sale(db, 1 + i % 50_000)),
+            ("create_sale (consultas)", lambda i: legacy_create_sale_lookups(db, 1 + i % 1000, 1 + i % 500),
+             lambda i: new_create_sale_lookups(db, 1 + i % 1000, 1 + i % 500)),
+        ]
+        print(f"⏱️  {calls} chamadas por caso\n")
+        print(f"  {'consulta':<26}{'db.query':>12}{'select()':>12}{'ganho':>9}")
+        for label, legacy, new in cases:
+            before = measure(db, legacy, calls)
+            after = measure(db, new, calls)
+            print(f"  {label:<26}{before:>9.1f} µs{after:>9.1f} µs{before / after:>8.2f}x")
+
+        stats = db_pool.statement_cache_stats("bench")
+        print(f"\n📊 Cache de compilação: {stats['cache_hit']} acertos, {stats['cache_miss']} faltas "
+              f"({stats['hit_ratio']:.2%})")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Fixtures de banco em memória para a suíte pytest
+
+O schema é criado uma vez por processo (cada worker de `pytest -n auto` tem
+o seu) numa conexão SQLite em memória. Cada teste roda dentro de uma
+transação externa desfeita no final; o `commit()` da aplicação libera só
+um SAVEPOINT e o `rollback()` volta a ele, então os testes não veem os
+dados uns dos outros e não é preciso recriar tabelas.
+
+A aplicação é acessada em processo, via ASGI (TestClient), sem servidor
+na porta 8001 e sem tocar em `sales_portal.db`.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, RoutingSession, get_db
+from main import app
+
+# Demonstrações manuais contra o servidor em execução (python test/test_sqlite.py)
+collect_ignore = ["test_sqlite.py", "test_products_sales.py"]
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """Banco em memória com o schema criado uma vez por processo"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    # pysqlite abre transações por conta própria e quebra SAVEPOINT:
+    # desligar o controle do driver e emitir BEGIN pelo SQLAlchemy
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_connection(db_engine):
+    """Conexão com transação externa desfeita ao final do teste"""
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    try:
+        yield connection
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+def _session(connection) -> RoutingSession:
+    # Como o SessionLocal da aplicação, mas dentro da transação do teste
+    return RoutingSession(
+        bind=connection, join_transaction_mode="create_savepoint",
+        autoflush=False, expire_on_commit=False,
+    )
+
+
+@pytest.fixture
+def db_session(db_connection):
+    """Sessão para preparar e conferir dados do teste"""
+    session = _session(db_connection)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db_connection, request):
+    """Cliente ASGI em processo com `get_db` apontando para a transação do teste"""
+    def override_get_db():
+        db = _session(db_connection)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        # Endereço próprio por teste: com RATE_LIMIT_ENABLED=true, cada um tem seu balde
+        yield TestClient(app, client=(request.node.nodeid, 50000))
+    finally:
+        app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,89 @@
+"""
+Testes do snapshot colunar de vendas (motor NumPy)
+"""
+import unittest
+import sys
+import os
+from datetime import date, datetime
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Sale, Product, User
+from app.services import analytics_service, sales_service
+
+
+@unittest.skipIf(analytics_service.load_numpy() is None, "NumPy não instalado")
+class TestSalesSnapshot(unittest.TestCase):
+    """
+    Comparar o motor NumPy com o caminho SQL
+    """
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([User(name="U1", email="u1@example.com"), User(name="U2", email="u2@example.com")])
+        self.db.add_all([Product(name="A", price=1.5), Product(name="B", price=10.0)])
+        self.db.commit()
+        self._add_sales([
+            (1, 1, 2, 3.0, datetime(2025, 8, 1, 9, 0)),
+            (1, 2, 1, 10.0, datetime(2025, 8, 1, 18, 30)),
+            (2, 1, 4, 6.0, datetime(2025, 8, 3, 12, 0)),
+            (2, 2, 3, 30.0, datetime(2025, 8, 5, 23, 59)),
+        ])
+
+    def tearDown(self):
+        self.db.close()
+
+    def _add_sales(self, rows):
+        for user_id, product_id, quantity, total, sale_date in rows:
+            self.db.add(Sale(user_id=user_id, product_id=product_id, quantity=quantity,
+                             unit_price=total / quantity, total_price=total, sale_date=sale_date))
+        self.db.commit()
+
+    def test_summary_matches_sql(self):
+        """Testar resumo igual ao caminho SQL, com dias inclusivos"""
+        snapshot = analytics_service.SalesSnapshot()
+        snapshot.refresh(self.db)
+        for period in [(None, None), (date(2025, 8, 1), date(2025, 8, 1)), (date(2025, 8, 2), date(2025, 8, 5))]:
+            self.assertEqual(snapshot.summary(*period), sales_service.get_sales_summary(self.db, *period))
+        self.assertEqual(snapshot.summary(date(2025, 8, 1), date(2025, 8, 1))["total_sales"], 2)
+
+    def test_group_totals_match_sql(self):
+        """Testar agrupamentos iguais ao GROUP BY do SQL"""
+        snapshot = analytics_service.SalesSnapshot()
+        snapshot.refresh(self.db)
+        for group_by in ("product", "user", "day"):
+            self.assertEqual(snapshot.group_totals(group_by), sales_service.get_sales_grouped(self.db, group_by))
+
+    def test_incremental_refresh(self):
+        """Testar anexação incremental e reordenação por data"""
+        snapshot = analytics_service.SalesSnapshot()
+        self.assertEqual(snapshot.refresh(self.db), 4)
+        self.assertEqual(snapshot.refresh(self.db), 0)
+
+        # Venda com data anterior às já carregadas
+        self._add_sales([(1, 1, 1, 1.5, datetime(2025, 7, 31, 10, 0))])
+        self.assertEqual(snapshot.refresh(self.db), 1)
+        self.assertEqual(len(snapshot), 5)
+        self.assertEqual(snapshot.summary(date(2025, 7, 31), date(2025, 7, 31))["total_sales"], 1)
+
+    def test_invalidate_after_cancel(self):
+        """Testar reconstrução após cancelamento"""
+        snapshot = analytics_service.SalesSnapshot()
+        snapshot.refresh(self.db)
+        self.db.delete(self.db.get(Sale, 1))
+        self.db.commit()
+        snapshot.invalidate()
+        snapshot.refresh(self.db)
+        self.assertEqual(snapshot.summary()["total_sales"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
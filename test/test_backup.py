@@ -0,0 +1,169 @@
+"""
+Testes dos backups online (API de backup do SQLite)
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import sys
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.database import Base
+from app.routers import admin
+from app.services import backup_service
+from main import app
+
+
+class BackupTestCase(unittest.TestCase):
+    """
+    Banco em arquivo (WAL) com algumas centenas de páginas
+    """
+
+    def setUp(self):
+        """Criar banco e diretório de backups temporários"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sales_portal.db")
+        self.backup_dir = os.path.join(self.tmp.name, "backups")
+        engine = create_engine(f"sqlite:///{self.path}")
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executemany(
+            "INSERT INTO products (name, description, price, stock_quantity, is_active) VALUES (?, ?, 1.0, 1, 1)",
+            [(f"Produto {i}", "x" * 500) for i in range(2000)],
+        )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        """Remover arquivos"""
+        self.tmp.cleanup()
+
+    def backup(self, **kw):
+        kw.setdefault("keep", 0)
+        kw.setdefault("step_sleep", 0)
+        return backup_service.backup_database(self.path, backup_dir=self.backup_dir, **kw)
+
+
+class TestBackupService(BackupTestCase):
+    """
+    Testes de cópia em passos, compressão, rotação e verificação
+    """
+
+    def test_incremental_copy_is_verified(self):
+        """Testar cópia em vários passos com contagem de linhas"""
+        result = self.backup(pages=16)
+        self.assertGreater(result["steps"], 1)
+        self.assertEqual(result["rows"]["products"], 2000)
+        self.assertTrue(os.path.exists(result["path"]))
+        verification = backup_service.verify_backup(result["path"])
+        self.assertTrue(verification["ok"])
+        self.assertEqual(verification["rows"]["products"], 2000)
+
+    def test_compression_and_rotation(self):
+        """Testar backups comprimidos e remoção dos mais antigos"""
+        names = [self.backup(compress=True, keep=2)["name"] for _ in range(3)]
+        remaining = [item["name"] for item in backup_service.list_backups(self.backup_dir)]
+        self.assertEqual(remaining, names[:0:-1])
+        self.assertTrue(all(name.endswith(".db.gz") for name in remaining))
+
+        newest = os.path.join(self.backup_dir, remaining[0])
+        self.assertLess(os.path.getsize(newest), os.path.getsize(self.path))
+        self.assertEqual(backup_service.verify_backup(newest)["rows"]["products"], 2000)
+
+    def test_consistent_while_writing(self):
+        """Testar backup íntegro com escritas concorrentes, com e sem WAL"""
+        for mode, snapshot in (("wal", "wal"), ("delete", "locks")):
+            with self.subTest(journal_mode=mode):
+                conn = sqlite3.connect(self.path)
+                conn.execute(f"PRAGMA journal_mode={mode}")
+                conn.close()
+                stop = threading.Event()
+
+                def writer():
+                    conn = sqlite3.connect(self.path, timeout=5)
+                    while not stop.is_set():
+                        conn.execute("INSERT INTO products (name, price, stock_quantity, is_active) VALUES ('novo', 1.0, 1, 1)")
+                        conn.commit()
+                        time.sleep(0.001)
+                    conn.close()
+
+                thread = threading.Thread(target=writer)
+                thread.start()
+                try:
+                    result = self.backup(pages=8, step_sleep=0.001)
+                finally:
+                    stop.set()
+                    thread.join()
+                self.assertEqual(result["snapshot"], snapshot)
+                self.assertLessEqual(result["restarts"], backup_service.BACKUP_MAX_RESTARTS + 1)
+                self.assertGreaterEqual(result["rows"]["products"], 2000)
+                self.assertTrue(backup_service.verify_backup(result["path"])["ok"])
+
+    def test_single_backup_at_a_time(self):
+        """Testar recusa de backup simultâneo no mesmo processo"""
+        backup_service._running.acquire()
+        try:
+            with self.assertRaises(backup_service.BackupInProgress):
+                self.backup()
+        finally:
+            backup_service._running.release()
+
+    def test_memory_database_rejected(self):
+        """Testar erro para banco em memória"""
+        with self.assertRaises(ValueError):
+            backup_service.database_path("sqlite://")
+
+
+class TestBackupApi(BackupTestCase):
+    """
+    Testes das rotas administrativas de backup
+    """
+
+    def setUp(self):
+        """Apontar o serviço para o banco temporário"""
+        super().setUp()
+        self.previous = (admin.ADMIN_TOKEN, backup_service.DATABASE_URL, backup_service.BACKUP_DIR)
+        backup_service.DATABASE_URL = f"sqlite:///{self.path}"
+        backup_service.BACKUP_DIR = self.backup_dir
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        """Restaurar configuração"""
+        admin.ADMIN_TOKEN, backup_service.DATABASE_URL, backup_service.BACKUP_DIR = self.previous
+        super().tearDown()
+
+    def test_requires_token(self):
+        """Testar rotas desativadas sem ADMIN_TOKEN e token inválido"""
+        admin.ADMIN_TOKEN = ""
+        self.assertEqual(self.client.get("/api/v1/admin/backups").status_code, 403)
+        admin.ADMIN_TOKEN = "segredo"
+        self.assertEqual(self.client.get("/api/v1/admin/backups", headers={"X-Admin-Token": "x"}).status_code, 401)
+
+    def test_create_list_verify(self):
+        """Testar geração, listagem e verificação pela API"""
+        admin.ADMIN_TOKEN = "segredo"
+        headers = {"X-Admin-Token": "segredo"}
+        response = self.client.post("/api/v1/admin/backups", params={"compress": "true", "keep": 0}, headers=headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        name = response.json()["name"]
+
+        listed = self.client.get("/api/v1/admin/backups", headers=headers).json()
+        self.assertEqual([item["name"] for item in listed], [name])
+
+        response = self.client.post(f"/api/v1/admin/backups/{name}/verify", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rows"]["products"], 2000)
+        self.assertEqual(self.client.post("/api/v1/admin/backups/outro.db/verify", headers=headers).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
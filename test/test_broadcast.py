@@ -0,0 +1,135 @@
+"""
+Testes do hub de broadcast do feed de vendas (SSE)
+"""
+import asyncio
+import tempfile
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.broadcast import BroadcastHub, encode_event, stream_frames
+from app.database import Base
+from app.routers import sales as sales_router
+
+
+class TestBroadcastHub(unittest.TestCase):
+    """
+    Testes de fan-out, consumidores lentos e retomada
+    """
+
+    def test_encode_event(self):
+        """Testar formato do frame SSE"""
+        frame = encode_event("sale.created", '{"id": 7}', 7)
+        self.assertEqual(frame, b'id: 7\nevent: sale.created\ndata: {"id": 7}\n\n')
+        self.assertNotIn(b"id:", encode_event("sale.cancelled", "{}"))
+
+    def test_fan_out_shares_frame(self):
+        """Testar que todos os assinantes recebem o mesmo frame"""
+        async def scenario():
+            hub = BroadcastHub(buffer_size=10)
+            subscribers = [hub.subscribe() for _ in range(1000)]
+            hub.publish_sale_created(1, '{"id": 1}')
+            frames = [s.queue.get_nowait() for s in subscribers]
+            self.assertTrue(all(frame is frames[0] for frame in frames))
+            self.assertEqual(frames[0][0], 1)
+
+        asyncio.run(scenario())
+
+    def test_slow_consumer_dropped(self):
+        """Testar desconexão de consumidor com buffer cheio"""
+        async def scenario():
+            hub = BroadcastHub(buffer_size=2)
+            slow = hub.subscribe()
+            for sale_id in range(1, 4):
+                hub.publish_sale_created(sale_id, "{}")
+            self.assertTrue(slow.dropped)
+            self.assertEqual(hub.subscriber_count, 0)
+            self.assertEqual(hub.dropped, 1)
+
+        asyncio.run(scenario())
+
+    def test_cancellations_since(self):
+        """Testar cancelamentos guardados para retomada"""
+        hub = BroadcastHub()
+        hub.publish_sale_created(5, "{}")
+        hub.publish_sale_cancelled(3, "{}")
+        hub.publish_sale_created(9, "{}")
+        hub.publish_sale_cancelled(9, "{}")
+        self.assertEqual(len(hub.cancellations_since(5)), 2)
+        self.assertEqual(len(hub.cancellations_since(6)), 1)
+
+    def test_stream_skips_replayed_sales(self):
+        """Testar que vendas da retomada não são reenviadas ao vivo"""
+        async def scenario():
+            hub = BroadcastHub()
+            subscriber = hub.subscribe()
+            hub.publish_sale_created(4, "{}")
+            hub.publish_sale_created(5, "{}")
+
+            async def never_disconnected():
+                return False
+
+            stream = stream_frames(hub, subscriber, [b"replay\n\n"], 4, never_disconnected)
+            received = [await stream.__anext__() for _ in range(3)]
+            await stream.aclose()
+            self.assertEqual(received[1], b"replay\n\n")
+            self.assertTrue(received[2].startswith(b"id: 5\n"))
+            self.assertEqual(hub.subscriber_count, 0)
+
+        asyncio.run(scenario())
+
+
+class TestStreamRoute(unittest.TestCase):
+    """
+    Teste da rota SSE: a retomada não prende conexão do pool durante o stream
+    """
+
+    def setUp(self):
+        """Banco em arquivo com pool de conexões e uma venda"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'stream.db')}", pool_size=2)
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO sales (user_id, product_id, quantity, unit_price, total_price) VALUES (1, 1, 1, 2.0, 2.0)"
+            )
+        self.previous = sales_router.SessionLocal
+        sales_router.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    def tearDown(self):
+        """Restaurar a fábrica de sessões"""
+        sales_router.SessionLocal = self.previous
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_resumed_stream_releases_connection(self):
+        """Testar pool sem conexões em uso com o stream ainda aberto"""
+        async def receive():
+            await asyncio.sleep(3600)
+
+        async def scenario():
+            request = Request({
+                "type": "http", "method": "GET", "path": "/api/v1/sales/stream",
+                "headers": [(b"last-event-id", b"0")], "query_string": b"",
+            }, receive)
+            response = await sales_router.stream_sales(request, last_event_id=None)
+            frames = response.body_iterator
+            try:
+                received = [await frames.__anext__() for _ in range(2)]
+                self.assertTrue(received[1].startswith(b"id: 1\n"))
+                self.assertEqual(self.engine.pool.checkedout(), 0)
+            finally:
+                await frames.aclose()
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Testes do upsert de produtos e do ajuste de estoque em lote
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+
+
+class TestBulkProducts:
+    """
+    Testes para /products/bulk-upsert e /products/stock/bulk
+    """
+
+    def test_upsert_by_sku(self, client):
+        """Testar criação e atualização por sku, com erros por linha"""
+        items = [{"sku": f"ERP-{i}", "name": f"Item {i}", "price": 1.0 + i} for i in range(5)]
+        result = client.post("/api/v1/products/bulk-upsert", json={"items": items}).json()
+        assert (result["created"], result["updated"], result["errors"]) == (5, 0, 0)
+
+        items = [
+            {"sku": "ERP-0", "name": "Item 0 novo", "price": 9.0, "stock_quantity": 7},
+            {"sku": "ERP-9", "name": "Item 9", "price": 2.0},
+            {"name": "Sem sku", "price": 1.0},
+            {"sku": "ERP-9", "name": "Duplicado", "price": 3.0},
+        ]
+        result = client.post("/api/v1/products/bulk-upsert", json={"items": items, "key": "sku"}).json()
+        assert [r["status"] for r in result["results"]] == ["updated", "created", "error", "error"]
+
+        product = client.get(f"/api/v1/products/{result['results'][0]['id']}").json()
+        assert (product["name"], product["price"], product["stock_quantity"]) == ("Item 0 novo", 9.0, 7)
+        assert product["updated_at"] is not None
+
+    def test_upsert_isolates_failing_rows(self, client):
+        """Testar que erro de banco em uma linha não descarta o lote"""
+        client.post("/api/v1/products/", json={"sku": "A", "name": "A", "price": 1.0})
+        existing_id = client.post("/api/v1/products/", json={"sku": "B", "name": "B", "price": 1.0}).json()["id"]
+
+        # Atualização por id que tenta reutilizar o sku "A" viola o índice único
+        items = [
+            {"id": existing_id, "sku": "A", "name": "B", "price": 1.0},
+            {"id": 500, "sku": "C", "name": "C", "price": 1.0},
+        ]
+        result = client.post("/api/v1/products/bulk-upsert", json={"items": items, "key": "id"}).json()
+        assert [r["status"] for r in result["results"]] == ["error", "created"]
+        assert client.get("/api/v1/products/500").json()["sku"] == "C"
+
+    def test_upsert_partial_fields_keeps_existing(self, client):
+        """Testar que campos não enviados não sobrescrevem o produto existente"""
+        product_id = client.post("/api/v1/products/", json={
+            "sku": "P", "name": "Livro", "description": "Capa dura", "price": 10.0, "stock_quantity": 8,
+        }).json()["id"]
+        client.delete(f"/api/v1/products/{product_id}")
+
+        items = [
+            {"sku": "P", "name": "Livro novo", "price": 12.0},
+            {"sku": "Q", "name": "Caderno", "price": 5.0, "stock_quantity": 3},
+            {"sku": "R", "name": "Lápis", "price": 1.0},
+        ]
+        result = client.post("/api/v1/products/bulk-upsert", json={"items": items}).json()
+        assert [r["status"] for r in result["results"]] == ["updated", "created", "created"]
+
+        product = client.get(f"/api/v1/products/{product_id}").json()
+        assert (
+            product["name"], product["price"], product["description"], product["stock_quantity"], product["is_active"]
+        ) == ("Livro novo", 12.0, "Capa dura", 8, False)
+        # Produtos novos sem os campos recebem os padrões
+        created = client.get(f"/api/v1/products/{result['results'][2]['id']}").json()
+        assert (created["stock_quantity"], created["is_active"]) == (0, True)
+
+    def test_stock_bulk_atomic(self, client):
+        """Testar ajuste de estoque tudo-ou-nada"""
+        ids = [
+            client.post("/api/v1/products/", json={"name": f"P{i}", "price": 1.0, "stock_quantity": 10}).json()["id"]
+            for i in range(2)
+        ]
+        response = client.patch("/api/v1/products/stock/bulk", json={"adjustments": [
+            {"product_id": ids[0], "quantity_change": -4},
+            {"product_id": ids[1], "quantity_change": 5},
+            {"product_id": ids[0], "quantity_change": -1},
+        ]})
+        assert response.status_code == 200
+        assert {r["product_id"]: r["new_stock"] for r in response.json()["results"]} == {ids[0]: 5, ids[1]: 15}
+
+        response = client.patch("/api/v1/products/stock/bulk", json={"adjustments": [
+            {"product_id": ids[0], "quantity_change": -6},
+            {"product_id": ids[1], "quantity_change": -1},
+            {"product_id": 9999, "quantity_change": 1},
+        ]})
+        assert response.status_code == 409
+        statuses = [r["status"] for r in response.json()["detail"]["results"]]
+        assert statuses == ["insufficient_stock", "not_applied", "not_found"]
+        # Nada foi aplicado
+        assert client.get(f"/api/v1/products/{ids[1]}").json()["stock_quantity"] == 15
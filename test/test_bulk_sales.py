@@ -0,0 +1,71 @@
+"""
+Testes do cancelamento de vendas em lote
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def sales(client):
+    """Dois usuários, dois produtos e uma venda de 3 unidades por par"""
+    user_ids = [
+        client.post("/api/v1/users/", json={"name": f"U{i}", "email": f"u{i}@example.com"}).json()["id"]
+        for i in range(2)
+    ]
+    product_ids = [
+        client.post("/api/v1/products/", json={"name": f"P{i}", "price": 5.0, "stock_quantity": 100}).json()["id"]
+        for i in range(2)
+    ]
+    sale_ids = []
+    for user_id in user_ids:
+        for product_id in product_ids:
+            sale = client.post("/api/v1/sales/", json={"user_id": user_id, "product_id": product_id, "quantity": 3})
+            sale_ids.append(sale.json()["id"])
+    return user_ids, product_ids, sale_ids
+
+
+def _stock(client, product_id):
+    return client.get(f"/api/v1/products/{product_id}").json()["stock_quantity"]
+
+
+class TestCancelBulk:
+    """
+    Testes para POST /api/v1/sales/cancel-bulk
+    """
+
+    def test_cancel_by_ids(self, client, db_connection, sales):
+        """Testar cancelamento por ids com resultado por id"""
+        _, product_ids, sale_ids = sales
+        statements = []
+        event.listen(db_connection, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement.split()[0]))
+
+        response = client.post("/api/v1/sales/cancel-bulk", json={"ids": sale_ids + [99999]})
+        assert response.status_code == 200
+        result = response.json()
+        assert result["cancelled"] == 4
+        assert result["not_found"] == 1
+        assert result["results"][-1] == {"id": 99999, "status": "not_found"}
+
+        # Um UPDATE agrupado para os produtos e um DELETE para as vendas
+        assert statements.count("UPDATE") == 1
+        assert statements.count("DELETE") == 1
+
+        assert [_stock(client, p) for p in product_ids] == [100, 100]
+        assert client.get("/api/v1/sales/").json() == []
+
+    def test_cancel_by_filter(self, client, sales):
+        """Testar cancelamento por usuário"""
+        user_ids, product_ids, _ = sales
+        response = client.post("/api/v1/sales/cancel-bulk", json={"user_id": user_ids[0]})
+        assert response.json()["cancelled"] == 2
+        assert [_stock(client, p) for p in product_ids] == [97, 97]
+        remaining = client.get("/api/v1/sales/").json()
+        assert {sale["user_id"] for sale in remaining} == {user_ids[1]}
+
+    def test_requires_ids_or_filter(self, client):
+        """Testar que lote vazio é rejeitado"""
+        response = client.post("/api/v1/sales/cancel-bulk", json={})
+        assert response.status_code == 400
@@ -0,0 +1,53 @@
+"""
+Testes do change feed (sincronização incremental)
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+
+
+class TestChangeFeed:
+    """
+    Testes para GET /api/v1/changes
+    """
+
+    def test_created_updated_deleted(self, client):
+        """Testar criação, alteração e tombstone de deleção"""
+        product_id = client.post("/api/v1/products/", json={"name": "Lápis", "price": 1.0}).json()["id"]
+        user_id = client.post("/api/v1/users/", json={"name": "Bia", "email": "bia@example.com"}).json()["id"]
+
+        feed = client.get("/api/v1/changes").json()
+        assert [(c["entity"], c["operation"]) for c in feed["changes"]] == [("product", "created"), ("user", "created")]
+        assert feed["changes"][0]["data"]["name"] == "Lápis"
+        token = feed["next_token"]
+
+        client.put(f"/api/v1/products/{product_id}", json={"price": 2.0})
+        client.delete(f"/api/v1/users/{user_id}")
+
+        feed = client.get(f"/api/v1/changes?since={token}").json()
+        assert [(c["entity_id"], c["operation"]) for c in feed["changes"]] == [
+            (product_id, "updated"), (user_id, "deleted"),
+        ]
+        assert feed["changes"][0]["data"]["price"] == 2.0
+        assert feed["changes"][1]["data"] is None
+
+        # Nada novo desde o último token
+        feed = client.get(f"/api/v1/changes?since={feed['next_token']}").json()
+        assert feed["changes"] == []
+
+    def test_pagination_and_filter(self, client):
+        """Testar paginação por limite e filtro de entidade"""
+        for i in range(3):
+            client.post("/api/v1/products/", json={"name": f"P{i}", "price": 1.0})
+        client.post("/api/v1/users/", json={"name": "Caio", "email": "caio@example.com"})
+
+        feed = client.get("/api/v1/changes?limit=2").json()
+        assert feed["has_more"]
+        assert len(feed["changes"]) == 2
+
+        feed = client.get("/api/v1/changes?entity=user").json()
+        assert [c["entity"] for c in feed["changes"]] == ["user"]
+
+    def test_invalid_token(self, client):
+        """Testar token inválido"""
+        response = client.get("/api/v1/changes?since=abc")
+        assert response.status_code == 400
@@ -0,0 +1,87 @@
+"""
+Testes do middleware de compressão
+"""
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware, negotiate
+
+
+class TestNegotiation(unittest.TestCase):
+    """
+    Testes de negociação de Accept-Encoding
+    """
+
+    def test_server_preference(self):
+        """Testar que a ordem do servidor prevalece"""
+        self.assertEqual(negotiate("gzip, br", ["br", "gzip"]), "br")
+        self.assertEqual(negotiate("gzip, br", ["gzip", "br"]), "gzip")
+
+    def test_q_zero_and_wildcard(self):
+        """Testar q=0 e curinga"""
+        self.assertEqual(negotiate("br;q=0, gzip", ["br", "gzip"]), "gzip")
+        self.assertEqual(negotiate("*", ["gzip"]), "gzip")
+        self.assertIsNone(negotiate("identity", ["gzip"]))
+        self.assertIsNone(negotiate(None, ["gzip"]))
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    """
+    Testes do middleware com uma aplicação mínima
+    """
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=100)
+
+        @app.get("/big")
+        async def big(response: Response):
+            response.headers["ETag"] = '"v1"'
+            return {"data": "x" * 1000}
+
+        @app.get("/small")
+        async def small():
+            return {"ok": True}
+
+        self.client = TestClient(app)
+
+    def test_compresses_large_response(self):
+        """Testar compressão acima do tamanho mínimo"""
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        # ETag forte vira fraco na representação comprimida
+        self.assertEqual(response.headers["etag"], 'W/"v1"')
+        self.assertEqual(response.json()["data"], "x" * 1000)
+
+    def test_skips_small_response(self):
+        """Testar que respostas pequenas não são comprimidas"""
+        response = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_cache_hit(self):
+        """Testar reaproveitamento do corpo comprimido"""
+        self.client.get("/big", headers={"Accept-Encoding": "gzip"})
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip"})
+        middleware = self.client.app.middleware_stack
+        while not isinstance(middleware, CompressionMiddleware):
+            middleware = middleware.app
+        self.assertEqual(middleware.cache.stats()["hits"], 1)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+
+    def test_identity_when_not_accepted(self):
+        """Testar resposta sem compressão quando o cliente não aceita"""
+        response = self.client.get("/big", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.json()["data"], "x" * 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Testes do pool de conexões instrumentado
+"""
+import tempfile
+import threading
+import time
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import db_pool
+from app.db_pool import InstrumentedQueuePool, instrument_engine
+from app.metrics import registry
+from main import app
+
+
+class TestPoolSaturation(unittest.TestCase):
+    """
+    Testes com pool pequeno em banco de arquivo temporário
+    """
+
+    def setUp(self):
+        """Criar engine com pool de uma conexão e sem overflow"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.label = self.id()
+        self.engine = create_engine(
+            f"sqlite:///{self.tmp.name}/pool.db",
+            connect_args={"check_same_thread": False},
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.2,
+        )
+        self.detector = instrument_engine(self.engine, self.label, threshold=0.05, debug=True)
+
+    def tearDown(self):
+        """Descartar engine e detector"""
+        db_pool.detectors.pop(self.label, None)
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_timeout_when_exhausted(self):
+        """Testar timeout e contador quando o pool está esgotado"""
+        held = self.engine.connect()
+        start = time.perf_counter()
+        with self.assertRaises(PoolTimeoutError):
+            self.engine.connect()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+        held.close()
+
+        self.assertEqual(db_pool.checkout_timeouts.value(engine=self.label), 1)
+        self.assertEqual(db_pool.checkout_wait.count(engine=self.label), 2)
+
+    def test_waiters_served_in_turn(self):
+        """Testar que requisições concorrentes esperam e são atendidas"""
+        errors = []
+
+        def work():
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    time.sleep(0.03)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(db_pool.checkout_wait.count(engine=self.label), 4)
+        rendered = registry.render()
+        # Pelo menos um checkout esperou mais de 25 ms pela conexão ocupada
+        fast = [line for line in rendered.splitlines()
+                if line.startswith("db_pool_checkout_wait_seconds_bucket") and self.label in line and 'le="0.025"' in line]
+        self.assertLess(int(fast[0].rsplit(" ", 1)[1]), 4)
+        self.assertIn(f'db_pool_checked_out{{engine="{self.label}"}} 0', rendered)
+
+    def test_leak_detection_logs_origin(self):
+        """Testar aviso de conexão retida com a pilha de origem"""
+        with self.assertLogs("app.db_pool", level="WARNING") as logs:
+            conn = self.engine.connect()
+            time.sleep(0.08)
+            overdue = self.detector.check()
+            conn.close()
+        self.assertEqual(len(overdue), 1)
+        self.assertIn("test_leak_detection_logs_origin", logs.output[0])
+        # Avisado uma única vez por checkout
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(db_pool.held_too_long.value(engine=self.label), 1)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """
+    Testes de GET /metrics
+    """
+
+    def test_metrics_exposed(self):
+        """Testar exposição em formato de texto"""
+        client = TestClient(app)
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('db_pool_checked_out{engine="writer"}', response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Testes das sondas de liveness e readiness
+"""
+import asyncio
+import sqlite3
+import tempfile
+import time
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app import health
+from app.health import ReadinessProbe
+from main import app
+
+
+class TestReadinessProbe(unittest.TestCase):
+    """
+    Testes da avaliação de readiness sobre um arquivo SQLite temporário
+    """
+
+    def setUp(self):
+        """Criar banco em arquivo com pool limitado"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "health.db")
+        self.engine = create_engine(
+            f"sqlite:///{self.path}", connect_args={"check_same_thread": False, "timeout": 1},
+            poolclass=QueuePool, pool_size=1, max_overflow=1, pool_timeout=5,
+        )
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    def tearDown(self):
+        """Descartar engine e arquivos"""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def probe(self, **kw):
+        kw.setdefault("cache_seconds", 0)
+        return ReadinessProbe(self.engine, is_started=lambda: True, **kw)
+
+    def test_ready_with_latency(self):
+        """Testar pronto com latência medida e pool reportado"""
+        result = asyncio.run(self.probe().check())
+        self.assertEqual(result["status"], "ready", result["reasons"])
+        self.assertIsNotNone(result["checks"]["db"]["latency_ms"])
+        self.assertEqual(result["checks"]["pool"]["writer"], {"checked_out": 0, "capacity": 2, "saturation": 0.0})
+        self.assertEqual(result["checks"]["wal_bytes"], 0)
+
+    def test_not_ready_before_startup_and_while_draining(self):
+        """Testar fora antes do aquecimento e durante o encerramento"""
+        probe = ReadinessProbe(self.engine, cache_seconds=0, is_started=lambda: False)
+        self.assertIn("inicialização em andamento", asyncio.run(probe.check())["reasons"])
+        probe = self.probe()
+        probe.drain()
+        self.assertEqual(asyncio.run(probe.check())["reasons"], ["encerrando"])
+
+    def test_cached_result_limits_pings(self):
+        """Testar que sondas dentro da validade não executam novo ping"""
+        probe = self.probe(cache_seconds=60)
+
+        async def burst():
+            for _ in range(20):
+                await probe.check()
+
+        asyncio.run(burst())
+        self.assertEqual(probe.pings, 1)
+
+    def test_locked_file_goes_unready_without_piling_pings(self):
+        """Testar arquivo bloqueado: fora no prazo e um único ping em andamento"""
+        locker = sqlite3.connect(self.path, isolation_level=None)
+        locker.execute("BEGIN EXCLUSIVE")
+        try:
+            probe = self.probe(db_timeout=0.1)
+            start = time.perf_counter()
+            result = asyncio.run(probe.check())
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertEqual(result["status"], "unready")
+            self.assertIn("sem resposta", result["checks"]["db"]["error"])
+            asyncio.run(probe.check())
+            self.assertEqual(probe.pings, 1)
+        finally:
+            locker.execute("ROLLBACK")
+            locker.close()
+        probe._pending.result(timeout=5)
+        self.assertEqual(asyncio.run(probe.check())["status"], "ready")
+
+    def test_pool_saturation_skips_ping(self):
+        """Testar pool esgotado: fora sem tentar obter conexão"""
+        held = [self.engine.connect(), self.engine.connect()]
+        try:
+            probe = self.probe()
+            result = asyncio.run(probe.check())
+        finally:
+            for conn in held:
+                conn.close()
+        self.assertEqual(result["status"], "unready")
+        self.assertEqual(result["checks"]["db"]["error"], "pool esgotado")
+        self.assertEqual(probe.pings, 0)
+
+    def test_wal_threshold(self):
+        """Testar limite do tamanho do WAL"""
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+        result = asyncio.run(self.probe(wal_max_bytes=0).check())
+        self.assertGreater(result["checks"]["wal_bytes"], 0)
+        self.assertTrue(any(reason.startswith("WAL") for reason in result["reasons"]))
+
+
+class TestHealthEndpoints(unittest.TestCase):
+    """
+    Testes das rotas /health/live e /health/ready
+    """
+
+    def setUp(self):
+        """Cliente da aplicação e sonda original"""
+        self.client = TestClient(app)
+        self.original = health.probe
+
+    def tearDown(self):
+        """Restaurar a sonda da aplicação"""
+        health.probe = self.original
+
+    def test_live(self):
+        """Testar liveness"""
+        response = self.client.get("/health/live")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "alive"})
+
+    def test_ready_status_codes(self):
+        """Testar 200 quando pronto e 503 quando fora"""
+        engine = create_engine("sqlite://")
+        health.probe = ReadinessProbe(engine, cache_seconds=0, is_started=lambda: True)
+        response = self.client.get("/health/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["cache-control"], "no-store")
+
+        health.probe = ReadinessProbe(engine, cache_seconds=0, is_started=lambda: False)
+        response = self.client.get("/health/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "unready")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Testes de GET condicional (ETag / Last-Modified)
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+
+
+def _create_product(client):
+    response = client.post("/api/v1/products/", json={"name": "Caneta", "price": 2.5, "stock_quantity": 10})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+class TestConditionalGet:
+    """
+    Testes para ETag/If-None-Match em produtos e usuários
+    """
+
+    def test_product_not_modified(self, client):
+        """Testar 304 com If-None-Match no produto"""
+        product_id = _create_product(client)
+        response = client.get(f"/api/v1/products/{product_id}")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "last-modified" in response.headers
+
+        response = client.get(f"/api/v1/products/{product_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_product_etag_changes_on_update(self, client):
+        """Testar que atualização invalida o ETag"""
+        product_id = _create_product(client)
+        etag = client.get(f"/api/v1/products/{product_id}").headers["etag"]
+
+        client.put(f"/api/v1/products/{product_id}", json={"price": 3.0})
+        response = client.get(f"/api/v1/products/{product_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_product_list_etag(self, client):
+        """Testar ETag de listagem baseado na versão da tabela"""
+        _create_product(client)
+        etag = client.get("/api/v1/products/").headers["etag"]
+        assert etag.startswith("W/")
+
+        response = client.get("/api/v1/products/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        # Parâmetros diferentes geram ETag diferente
+        other = client.get("/api/v1/products/?limit=5").headers["etag"]
+        assert other != etag
+
+        _create_product(client)
+        response = client.get("/api/v1/products/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+
+    def test_user_if_modified_since(self, client):
+        """Testar 304 com If-Modified-Since no usuário"""
+        response = client.post("/api/v1/users/", json={"name": "Ana", "email": "ana.etag@example.com"})
+        user_id = response.json()["id"]
+        response = client.get(f"/api/v1/users/{user_id}")
+        last_modified = response.headers["last-modified"]
+
+        response = client.get(f"/api/v1/users/{user_id}", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+    def test_missing_resource(self, client):
+        """Testar 404 para recurso inexistente"""
+        response = client.get("/api/v1/users/99999", headers={"If-None-Match": "*"})
+        assert response.status_code == 404
@@ -0,0 +1,221 @@
+"""
+Testes do barramento de invalidação de caches entre processos
+"""
+import multiprocessing
+import queue
+import tempfile
+import time
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app import http_cache
+from app.database import Base
+from app.models import CacheVersion, Product, User
+from app.schemas import SaleCreate
+from app.services import sales_service, sketch_service
+from app.invalidation import InvalidationBus, SqliteVersionsBackend
+
+POLL_SECONDS = 0.05
+
+
+def _worker(events, stop):
+    """Worker que sobe o barramento da aplicação e relata as invalidações recebidas"""
+    sys.path.append(ROOT)
+    from app import http_cache
+    from app.invalidation import bus
+    from app.services import analytics_service
+
+    def report(channel):
+        events.put({
+            "pid": os.getpid(),
+            "channel": channel,
+            "received_at": time.time(),
+            "products_version": http_cache.get_table_version("products"),
+            "snapshot_stale": analytics_service.sales_snapshot.stale,
+        })
+
+    bus.subscribe("", report)
+    analytics_service.sales_snapshot.stale = False
+    bus.start()
+    events.put({"pid": os.getpid(), "channel": None})
+    stop.wait(30)
+    bus.stop()
+
+
+class TestInvalidationBus(unittest.TestCase):
+    """
+    Testes de publicação e polling entre barramentos
+    """
+
+    def setUp(self):
+        """Criar banco em arquivo temporário"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{self.tmp.name}/bus.db"
+        self.engine = create_engine(self.url, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        """Remover banco"""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _bus(self):
+        bus = InvalidationBus(SqliteVersionsBackend(self.engine), poll_interval=POLL_SECONDS)
+        received = []
+        bus.subscribe("table:", received.append)
+        return bus, received
+
+    def test_remote_invalidation_dispatched_once(self):
+        """Testar que o outro barramento recebe a invalidação e o emissor não a repete"""
+        a, received_a = self._bus()
+        b, received_b = self._bus()
+        a.invalidate("table:products")
+        self.assertEqual(received_a, ["table:products"])
+
+        self.assertEqual(b.poll(), ["table:products"])
+        self.assertEqual(received_b, ["table:products"])
+        self.assertEqual(a.poll(), [])
+        self.assertEqual(received_a, ["table:products"])
+
+        # Sem commits novos, o polling não consulta a tabela
+        self.assertIsNone(b.backend.poll())
+
+    def test_start_uses_existing_versions_as_baseline(self):
+        """Testar que versões anteriores à inicialização não disparam callbacks"""
+        a, _ = self._bus()
+        a.publish("table:products", "table:sales")
+        b, received = self._bus()
+        b.start()
+        try:
+            self.assertEqual(b.poll(), [])
+            a.publish("table:sales")
+            self.assertEqual(b.poll(), ["table:sales"])
+            self.assertEqual(received, ["table:sales"])
+        finally:
+            b.stop()
+
+    def test_table_versions_shared_between_workers(self):
+        """Testar ETag de listagem igual entre workers e versão gravada na transação da escrita"""
+        Session = sessionmaker(bind=self.engine)
+        commits = []
+        event.listen(self.engine, "commit", lambda conn: commits.append(conn))
+        writer, _ = self._bus()
+        with patch.object(http_cache, "bus", writer), patch.object(http_cache, "_table_versions", {}):
+            with Session() as db:
+                db.add(Product(name="Caneta", price=2.5))
+                db.commit()
+            self.assertEqual(len(commits), 1)
+            self.assertEqual(http_cache.get_table_version("products"), 1)
+            etag = http_cache.list_etag("products", (0, 100))
+            # Não depende do processo
+            with patch.object(http_cache, "_BOOT_ID", "outro"):
+                self.assertEqual(http_cache.list_etag("products", (0, 100)), etag)
+            self.assertEqual(writer.poll(), [])
+
+        # Outro worker: parte das versões do banco e acompanha pelo polling
+        reader, _ = self._bus()
+        with patch.object(http_cache, "bus", reader), patch.object(http_cache, "_table_versions", {}):
+            reader.start()
+            try:
+                self.assertEqual(http_cache.list_etag("products", (0, 100)), etag)
+                with Session() as db:
+                    db.add(Product(name="Lápis", price=1.0))
+                    db.rollback()
+                    db.add(Product(name="Lápis", price=1.0))
+                    db.commit()
+                self.assertEqual(http_cache.get_table_version("products"), 2)
+            finally:
+                reader.stop()
+        with patch.object(http_cache, "bus", writer), patch.object(http_cache, "_table_versions", {"products": 1}):
+            self.assertEqual(writer.poll(), ["table:products"])
+            self.assertEqual(http_cache.get_table_version("products"), 2)
+
+    def test_sale_with_savepoint_bumps_shared_versions(self):
+        """Testar versões publicadas no commit da venda, com SAVEPOINT liberado ou desfeito antes"""
+        Session = sessionmaker(bind=self.engine)
+        with Session() as db:
+            db.add_all([User(id=1, name="Ana", email="ana@example.com"),
+                        Product(id=1, name="Caneta", price=2.5, stock_quantity=10)])
+            db.commit()
+        bus, _ = self._bus()
+
+        def versions():
+            with self.engine.connect() as conn:
+                return dict(conn.execute(select(CacheVersion.name, CacheVersion.version)).all())
+
+        def failing_record_sale(db, sale):
+            raise RuntimeError("falha no sketch")
+
+        with patch.object(http_cache, "bus", bus), patch.object(http_cache, "_table_versions", {}):
+            before = versions()
+            with Session() as db:
+                sales_service.create_sale(db, SaleCreate(user_id=1, product_id=1, quantity=1))
+            after = versions()
+            for channel in ("table:products", "table:sales"):
+                self.assertEqual(after[channel], before.get(channel, 0) + 1)
+
+            with patch.object(sketch_service, "record_sale", failing_record_sale), Session() as db:
+                sales_service.create_sale(db, SaleCreate(user_id=1, product_id=1, quantity=1))
+            self.assertEqual(versions()["table:sales"], after["table:sales"] + 1)
+            self.assertEqual(http_cache.get_table_version("sales"), after["table:sales"] + 1)
+
+    def test_workers_drop_stale_entries(self):
+        """Testar invalidação em dois processos worker dentro do atraso configurado"""
+        env = {"DATABASE_URL": self.url, "CACHE_BUS": "sqlite", "CACHE_BUS_POLL_SECONDS": str(POLL_SECONDS)}
+        previous = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        context = multiprocessing.get_context("spawn")
+        events, stop = context.Queue(), context.Event()
+        workers = [context.Process(target=_worker, args=(events, stop)) for _ in range(2)]
+        try:
+            for worker in workers:
+                worker.start()
+            ready = {events.get(timeout=60)["pid"] for _ in workers}
+            self.assertEqual(len(ready), 2)
+
+            publisher, _ = self._bus()
+            published_at = time.time()
+            publisher.invalidate("table:products", "sales_snapshot")
+
+            received = {}
+            deadline = time.time() + 10
+            while len(received) < 4 and time.time() < deadline:
+                try:
+                    event = events.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                received[(event["pid"], event["channel"])] = event
+
+            self.assertEqual(set(received), {(pid, ch) for pid in ready for ch in ("table:products", "sales_snapshot")})
+            for (pid, channel), event in received.items():
+                # Atraso limitado pelo intervalo de polling (com folga para a máquina de teste)
+                self.assertLess(event["received_at"] - published_at, 2.0)
+                if channel == "table:products":
+                    self.assertEqual(event["products_version"], 1)
+                else:
+                    self.assertTrue(event["snapshot_stale"])
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(10)
+                if worker.is_alive():
+                    worker.terminate()
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Testes da manutenção periódica do banco (ANALYZE, optimize, vacuum, checkpoint)
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+import sys
+
+# Adicionar o diretório raiz ao path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import fcntl
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app import maintenance
+from app.maintenance import MaintenanceScheduler
+from app.routers import admin
+from main import app
+
+
+class FakeClock:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MaintenanceTestCase(unittest.TestCase):
+    """
+    Banco em arquivo com auto_vacuum=INCREMENTAL, WAL e páginas livres
+    """
+
+    def setUp(self):
+        """Criar banco com linhas removidas"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "maintenance.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("CREATE INDEX ix_products_name ON products (name)")
+        conn.executemany("INSERT INTO products (name) VALUES (?)", [("x" * 200,) for _ in range(3000)])
+        conn.commit()
+        conn.execute("DELETE FROM products WHERE id > 500")
+        conn.commit()
+        # Conexão aberta mantém o WAL (a última conexão a fechar faz checkpoint)
+        self.keeper = conn
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        self.clock = FakeClock()
+        self.activity = 0
+
+    def tearDown(self):
+        """Descartar engine e arquivos"""
+        self.keeper.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def scheduler(self, intervals, **kw):
+        return MaintenanceScheduler(
+            self.engine, intervals=intervals, activity=lambda: self.activity, clock=self.clock, **kw
+        )
+
+    def pragma(self, statement):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(statement).fetchone()[0]
+        finally:
+            conn.close()
+
+
+class TestMaintenanceTasks(MaintenanceTestCase):
+    """
+    Testes das tarefas
+    """
+
+    def test_incremental_vacuum_frees_pages(self):
+        """Testar devolução das páginas livres após deletes"""
+        # Checkpoint antes: o vacuum incremental atua no arquivo principal
+        self.scheduler({}).run(["checkpoint"])
+        free = self.pragma("PRAGMA freelist_count")
+        self.assertGreater(free, 0)
+        result = self.scheduler({}).run(["vacuum"])["vacuum"]
+        self.assertEqual(result["pages_freed"], free)
+        self.assertEqual(self.pragma("PRAGMA freelist_count"), 0)
+
+    def test_vacuum_skipped_without_incremental_mode(self):
+        """Testar aviso quando o banco não passou pela migration"""
+        self.keeper.execute("PRAGMA auto_vacuum=NONE")
+        self.keeper.execute("VACUUM")
+        result = self.scheduler({}).run(["vacuum"])["vacuum"]
+        self.assertIn("skipped", result)
+
+    def test_checkpoint_truncates_wal_when_idle(self):
+        """Testar TRUNCATE em janela ociosa e PASSIVE com tráfego"""
+        self.assertGreater(os.path.getsize(self.path + "-wal"), 0)
+        result = self.scheduler({}).run(["checkpoint"], idle=False)["checkpoint"]
+        self.assertEqual(result["mode"], "PASSIVE")
+        result = self.scheduler({}).run(["checkpoint"])["checkpoint"]
+        self.assertEqual(result["mode"], "TRUNCATE")
+        self.assertEqual(os.path.getsize(self.path + "-wal"), 0)
+
+    def test_unknown_task(self):
+        """Testar tarefa inexistente"""
+        with self.assertRaises(ValueError):
+            self.scheduler({}).run(["reindex"])
+
+    def test_single_maintenance_across_processes(self):
+        """Testar lock de arquivo ocupado por outro processo"""
+        with open(self.path + ".maintenance.lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            with self.assertRaises(RuntimeError):
+                self.scheduler({}).run(["optimize"])
+        self.assertIn("optimize", self.scheduler({}).run(["optimize"]))
+
+
+class TestMaintenanceSchedule(MaintenanceTestCase):
+    """
+    Testes da agenda e das janelas de pouco tráfego
+    """
+
+    def test_analyze_runs_first_tick_without_statistics(self):
+        """Testar ANALYZE imediato quando o planejador não tem estatísticas"""
+        scheduler = self.scheduler({"analyze": 86400})
+        scheduler.start()
+        scheduler.stop()
+        self.clock.now = 60
+        results = scheduler.tick()
+        self.assertEqual(results["analyze"]["tables"], 1)
+        self.assertEqual(self.pragma("SELECT count(*) FROM sqlite_stat1"), 1)
+        self.clock.now = 120
+        self.assertEqual(scheduler.tick(), {})
+
+    def test_busy_traffic_defers_until_overdue(self):
+        """Testar adiamento com tráfego e execução quando muito atrasada"""
+        scheduler = self.scheduler({"optimize": 100}, max_defer=3, idle_rate=1)
+        scheduler.start()
+        scheduler.stop()
+        before = maintenance.deferred.value(task="optimize")
+
+        self.clock.now, self.activity = 150, 1000
+        self.assertEqual(scheduler.tick(), {})
+        self.assertEqual(maintenance.deferred.value(task="optimize"), before + 1)
+
+        self.clock.now, self.activity = 200, 1010
+        self.assertIn("optimize", scheduler.tick())
+
+        self.clock.now, self.activity = 600, 100000
+        self.assertIn("optimize", scheduler.tick())
+
+    def test_status(self):
+        """Testar resumo das tarefas"""
+        scheduler = self.scheduler({"optimize": 100})
+        scheduler.run(["optimize"])
+        status = scheduler.status()["optimize"]
+        self.assertEqual(status["interval_seconds"], 100)
+        self.assertIsNotNone(status["last_result"]["finished_at"])
+
+
+class TestMaintenanceApi(MaintenanceTestCase):
+    """
+    Testes do disparo manual pelas rotas administrativas
+    """
+
+    def setUp(self):
+        """Trocar a agenda da aplicação pela do banco temporário"""
+        super().setUp()
+        self.previous = (admin.ADMIN_TOKEN, maintenance.scheduler)
+        admin.ADMIN_TOKEN = "segredo"
+        maintenance.scheduler = self.scheduler(dict(maintenance.TASK_INTERVALS))
+        self.client = TestClient(app)
+        self.headers = {"X-Admin-Token": "segredo"}
+
+    def tearDown(self):
+        """Restaurar configuração"""
+        admin.ADMIN_TOKEN, maintenance.scheduler = self.previous
+        super().tearDown()
+
+    def test_manual_trigger(self):
+        """Testar execução manual de todas as tarefas e status"""
+        response = self.client.post("/api/v1/admin/maintenance/all", headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(set(response.json()), set(maintenance.TASKS))
+        self.assertTrue(all("error" not in result for result in response.json().values()))
+
+        status = self.client.get("/api/v1/admin/maintenance", headers=self.headers).json()
+        self.assertIsNotNone(status["analyze"]["seconds_since_run"])
+        self.assertEqual(self.client.post("/api/v1/admin/maintenance/reindex", headers=self.headers).status_code, 400)
+
+
+class TestAutoVacuumMigration(unittest.TestCase):
+    """
+    Teste da migration que ativa auto_vacuum=INCREMENTAL
+    """
+
+    def test_upgrade_and_downgrade(self):
+        """Testar conversão de banco existente e reversão"""
+        from alembic import command
+        from alembic.config import Config
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "migrated.db")
+            config = Config(os.path.join(ROOT, "alembic.ini"))
+            config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+            config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+            command.upgrade(config, "9e4b7c1d3a58")
+            self.assertEqual(sqlite3.connect(path).execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+            command.upgrade(config, "a7c3e9f1b265")
+            self.assertEqual(sqlite3.connect(path).execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+            command.downgrade(config, "9e4b7c1d3a58")
+            self.assertEqual(sqlite3.connect(path).execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Testes do particionamento mensal e do arquivador de vendas
+
+Usa o banco em memória das fixtures de `conftest.py`; as partições vão
+para um diretório temporário.
+"""
+import os
+import stat
+from datetime import date, datetime
+
+import pytest
+
+from app.models import Product, Sale, SalePartition, User
+from app.services import partition_service, sales_service
+from app.services.partition_service import partition_store
+
+
+@pytest.fixture
+def db(db_session, tmp_path, monkeypatch):
+    """Vendas de janeiro a abril de 2024 e cache de partições temporário"""
+    monkeypatch.setattr(partition_store, "cache_dir", str(tmp_path / "cache"))
+    db_session.add_all([User(id=1, name="Ana", email="ana@example.com"), User(id=2, name="Bia", email="bia@example.com")])
+    db_session.add_all([Product(id=1, name="Livro", price=10.0, stock_quantity=100),
+                        Product(id=2, name="Caneta", price=2.5, stock_quantity=100)])
+    for month in (1, 2, 3, 4):
+        for day in (1, 15, 28):
+            product_id = 1 + day % 2
+            price = 10.0 if product_id == 1 else 2.5
+            db_session.add(Sale(user_id=1 + month % 2, product_id=product_id, quantity=month,
+                                unit_price=price, total_price=price * month,
+                                sale_date=datetime(2024, month, day, 12, 0)))
+    db_session.commit()
+    try:
+        yield db_session
+    finally:
+        # Liberar partições abertas antes de remover os arquivos
+        partition_store.clear()
+
+
+@pytest.fixture
+def archive(db, tmp_path):
+    """Arquivar meses fechados com abril como mês quente"""
+    def run():
+        return partition_service.archive_closed_months(
+            db, hot_months=1, today=date(2024, 4, 20), archive_dir=str(tmp_path / "archive")
+        )
+    return run
+
+
+def _snapshot(db):
+    return {
+        "summary": sales_service.get_sales_summary(db),
+        "february": sales_service.get_sales_summary(db, date(2024, 2, 1), date(2024, 2, 29)),
+        "grouped": sales_service.get_sales_grouped(db, "product"),
+        "days": sales_service.get_sales_grouped(db, "day", date(2024, 3, 1), date(2024, 4, 30)),
+        "ids": [sale.id for sale in sales_service.get_sales(db, limit=1000)],
+        "page": [sale.id for sale in sales_service.get_sales(db, skip=5, limit=4)],
+        "user": sorted(sale.id for sale in sales_service.get_sales_by_user(db, 2)),
+        "breakdown": sales_service.get_sales_breakdown(db, "product", sort="revenue", descending=True),
+        "breakdown_page": sales_service.get_sales_breakdown(
+            db, "day", date(2024, 2, 1), date(2024, 4, 30), limit=4,
+            cursor=sales_service.get_sales_breakdown(db, "day", date(2024, 2, 1), date(2024, 4, 30), limit=2)["next_cursor"],
+        ),
+    }
+
+
+class TestSalesPartitions:
+    """
+    Testes com vendas de janeiro a abril de 2024 e abril como mês quente
+    """
+
+    def test_archive_moves_closed_months(self, db, archive):
+        """Testar que meses fechados saem da tabela quente para arquivos somente leitura"""
+        results = archive()
+        assert [r["month"] for r in results] == ["2024-01", "2024-02", "2024-03"]
+        assert db.query(Sale).count() == 3
+
+        partition = db.get(SalePartition, "2024-02")
+        assert partition.row_count == 3
+        assert partition.path.endswith(".db.gz")
+        assert not os.stat(partition.path).st_mode & stat.S_IWUSR
+        assert partition.compressed_size < partition.raw_size
+
+    def test_queries_match_before_and_after(self, db, archive):
+        """Testar resultados iguais com e sem arquivamento"""
+        before = _snapshot(db)
+        archive()
+        assert _snapshot(db) == before
+
+    def test_date_range_prunes_partitions(self, db, archive):
+        """Testar que consultas por período só abrem as partições do intervalo"""
+        archive()
+        partition_store.clear()
+        sales = sales_service.get_sales_by_date_range(db, date(2024, 2, 10), date(2024, 2, 20))
+        assert [sale.sale_date.day for sale in sales] == [15]
+        assert list(partition_store._engines) == ["2024-02"]
+
+        sales_service.get_sales_summary(db, date(2024, 4, 1), date(2024, 4, 30))
+        assert list(partition_store._engines) == ["2024-02"]
+
+    def test_archived_sale_lookup_and_cancel(self, client, db, archive):
+        """Testar busca por id arquivado e recusa de cancelamento"""
+        january_id = db.query(Sale.id).filter(Sale.sale_date < datetime(2024, 2, 1)).first()[0]
+        archive()
+        sale = sales_service.get_sale(db, january_id)
+        assert sale.sale_date.month == 1
+        with pytest.raises(ValueError):
+            sales_service.cancel_sale(db, january_id)
+
+        assert client.get(f"/api/v1/sales/{january_id}").json()["id"] == january_id
+        assert client.delete(f"/api/v1/sales/{january_id}").status_code == 400
+
+    def test_late_sales_merge_into_partition(self, db, archive):
+        """Testar que vendas atrasadas são mescladas sem duplicar"""
+        archive()
+        db.add(Sale(user_id=1, product_id=1, quantity=1, unit_price=10.0, total_price=10.0,
+                    sale_date=datetime(2024, 2, 29, 23, 0)))
+        db.commit()
+        results = archive()
+        assert [(r["month"], r["row_count"]) for r in results] == [("2024-02", 4)]
+        february = sales_service.get_sales_by_date_range(db, date(2024, 2, 1), date(2024, 2, 29))
+        assert len(february) == 4
+        assert len({sale.id for sale in february}) == 4
@@ -0,0 +1,110 @@
+"""
+Testes do histórico de preços e das consultas "preço em X"
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.models import ProductPrice
+from app.schemas import ProductUpdate, ProductUpsertItem
+from app.services import price_service, product_service
+
+
+def _history(db_session, product_id):
+    return [
+        (row.price, row.valid_to is None)
+        for row in db_session.query(ProductPrice).filter_by(product_id=product_id).order_by(ProductPrice.id)
+    ]
+
+
+class TestPriceHistory:
+    """
+    Testes da gravação do histórico pelas alterações de produto
+    """
+
+    def test_create_and_update_record_intervals(self, client, db_session):
+        """Testar intervalo aberto na criação e fechado a cada troca de preço"""
+        product_id = client.post("/api/v1/products/", json={"name": "Livro", "price": 10.0}).json()["id"]
+        client.put(f"/api/v1/products/{product_id}", json={"price": 12.0})
+        client.put(f"/api/v1/products/{product_id}", json={"stock_quantity": 5})
+        client.put(f"/api/v1/products/{product_id}", json={"price": 12.0, "name": "Livro novo"})
+        assert _history(db_session, product_id) == [(10.0, False), (12.0, True)]
+
+        first, second = db_session.query(ProductPrice).filter_by(product_id=product_id).order_by(ProductPrice.id)
+        assert first.valid_to == second.valid_from
+
+    def test_bulk_upsert_records_changed_prices(self, db_session):
+        """Testar histórico no upsert em lote apenas para preços novos ou alterados"""
+        items = [ProductUpsertItem(sku="A", name="A", price=1.0), ProductUpsertItem(sku="B", name="B", price=2.0)]
+        ids = [r["id"] for r in product_service.bulk_upsert_products(db_session, items)["results"]]
+        items = [ProductUpsertItem(sku="A", name="A", price=1.5), ProductUpsertItem(sku="B", name="B2", price=2.0)]
+        product_service.bulk_upsert_products(db_session, items)
+        assert _history(db_session, ids[0]) == [(1.0, False), (1.5, True)]
+        assert _history(db_session, ids[1]) == [(2.0, True)]
+
+    def test_hard_delete_removes_history(self, client, db_session):
+        """Testar remoção do histórico junto com o produto"""
+        product_id = client.post("/api/v1/products/", json={"name": "Livro", "price": 10.0}).json()["id"]
+        product_service.update_product(db_session, product_id, ProductUpdate(price=11.0))
+        assert client.delete(f"/api/v1/products/{product_id}/hard").status_code == 200
+        assert _history(db_session, product_id) == []
+
+
+class TestPriceAsOf:
+    """
+    Testes das consultas por instante
+    """
+
+    def _seed(self, client, db_session):
+        ids = [client.post("/api/v1/products/", json={"name": name, "price": 1.0}).json()["id"] for name in "ABC"]
+        db_session.query(ProductPrice).delete()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for days, price in ((0, 10.0), (31, 11.0), (60, 9.5)):
+            price_service.record_prices(db_session, {ids[0]: price, ids[1]: price * 2}, start + timedelta(days=days))
+        db_session.commit()
+        return ids
+
+    def test_single_lookup(self, client, db_session):
+        """Testar preço vigente em instantes dentro, na borda e antes do histórico"""
+        product_id = self._seed(client, db_session)[0]
+        url = f"/api/v1/products/{product_id}/price"
+        assert client.get(url, params={"at": "2024-01-15T00:00:00Z"}).json()["price"] == 10.0
+        assert client.get(url, params={"at": "2024-02-01T00:00:00Z"}).json()["price"] == 11.0
+        # 2024-02-01T00:00-03:00 = 03:00 UTC, ainda no segundo intervalo
+        assert client.get(url, params={"at": "2024-02-01T00:00:00-03:00"}).json()["price"] == 11.0
+        current = client.get(url).json()
+        assert (current["price"], current["valid_to"]) == (9.5, None)
+        assert client.get(url, params={"at": "2023-12-31T23:59:59Z"}).status_code == 404
+
+    def test_price_at_creation(self, client):
+        """Testar preço encontrado no próprio created_at do produto (criação e upsert)"""
+        product = client.post("/api/v1/products/", json={"name": "Livro", "price": 10.0}).json()
+        response = client.get(f"/api/v1/products/{product['id']}/price", params={"at": product["created_at"]})
+        assert response.status_code == 200
+        assert response.json()["price"] == 10.0
+
+        result = client.post("/api/v1/products/bulk-upsert", json={"items": [{"sku": "A", "name": "A", "price": 3.0}]})
+        product = client.get(f"/api/v1/products/{result.json()['results'][0]['id']}").json()
+        response = client.get(f"/api/v1/products/{product['id']}/price", params={"at": product["created_at"]})
+        assert response.json()["price"] == 3.0
+
+    def test_batch_lookup(self, client, db_session):
+        """Testar vários produtos numa consulta, com produtos sem preço no instante"""
+        ids = self._seed(client, db_session)
+        response = client.get("/api/v1/products/prices", params={
+            "ids": ",".join(str(product_id) for product_id in [*ids, 99999]), "at": "2024-02-10T00:00:00Z",
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert [(price["product_id"], price["price"]) for price in data["prices"]] == [(ids[0], 11.0), (ids[1], 22.0)]
+        assert data["missing"] == [ids[2], 99999]
+        assert client.get("/api/v1/products/prices", params={"ids": "1,x"}).status_code == 400
+
+    def test_lookup_uses_index(self, db_session):
+        """Testar busca pelo índice (product_id, valid_from)"""
+        plan = " ".join(row[3] for row in db_session.connection().exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT price FROM product_prices "
+            "WHERE product_id IN (1, 2) AND valid_from <= '2024-02-10' "
+            "AND (valid_to IS NULL OR valid_to > '2024-02-10')"
+        ))
+        assert "ix_product_prices_product_valid_from (product_id=? AND valid_from<?)" in plan
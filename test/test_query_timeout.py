@@ -0,0 +1,99 @@
+"""
+Testes de prazos de consulta (progress handler) e cancelamento na desconexão
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from starlette.requests import Request
+
+from app import query_timeout
+from app.query_timeout import QueryAborted, QueryDeadline, call_with_deadline, run_with_deadline
+from app.routers import sales as sales_router
+
+# Consulta que leva muito tempo sem depender de dados
+ENDLESS_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+    "SELECT count(*) FROM (SELECT x FROM c LIMIT 1000000000)"
+)
+
+
+class TestQueryDeadline:
+    """
+    Testes do progress handler
+    """
+
+    def test_timeout_aborts_statement(self, db_session):
+        """Testar interrupção pelo prazo e conexão reutilizável depois"""
+        before = query_timeout.aborted.value(route="test", reason="timeout")
+        start = time.perf_counter()
+        with pytest.raises(QueryAborted) as ctx:
+            call_with_deadline(QueryDeadline(0.05), "test", lambda: db_session.execute(ENDLESS_QUERY).scalar())
+        assert time.perf_counter() - start < 2
+        assert ctx.value.reason == "timeout"
+        assert query_timeout.aborted.value(route="test", reason="timeout") == before + 1
+
+        db_session.rollback()
+        assert db_session.execute(text("SELECT 1")).scalar() == 1
+
+    def test_cancel_from_another_thread(self, db_session):
+        """Testar cancelamento durante a execução"""
+        deadline = QueryDeadline(60)
+        threading.Timer(0.05, deadline.cancel).start()
+        with pytest.raises(QueryAborted) as ctx:
+            call_with_deadline(deadline, "test", lambda: db_session.execute(ENDLESS_QUERY).scalar())
+        assert ctx.value.reason == "disconnect"
+
+    def test_disconnect_cancels_running_query(self, db_session):
+        """Testar que http.disconnect interrompe a consulta em andamento"""
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        async def scenario():
+            request = Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+            await run_with_deadline(request, "test", 60, lambda: db_session.execute(ENDLESS_QUERY).scalar())
+
+        with pytest.raises(QueryAborted) as ctx:
+            asyncio.run(scenario())
+        assert ctx.value.reason == "disconnect"
+
+    def test_no_deadline_outside_helper(self, db_session):
+        """Testar que consultas comuns não são afetadas"""
+        query = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c LIMIT 200000) SELECT count(*) FROM c")
+        assert db_session.execute(query).scalar() == 200000
+
+
+class TestQueryTimeoutApi:
+    """
+    Testes da resposta 504 nas rotas analíticas
+    """
+
+    @pytest.fixture
+    def sales(self, db_session):
+        """20 mil vendas em janeiro de 2025"""
+        db_session.execute(text("INSERT INTO users (id, name, email, is_active) VALUES (1, 'Ana', 'ana@example.com', 1)"))
+        db_session.execute(text("INSERT INTO products (id, name, price, stock_quantity, is_active) VALUES (1, 'P', 1, 0, 1)"))
+        db_session.execute(
+            text("INSERT INTO sales (user_id, product_id, quantity, unit_price, total_price, sale_date) "
+                 "VALUES (1, 1, 1, 1.0, 1.0, :d)"),
+            [{"d": datetime(2025, 1, 1 + i % 28, 12)} for i in range(20000)],
+        )
+        db_session.commit()
+
+    def test_date_range_timeout_returns_504(self, client, sales, monkeypatch):
+        """Testar 504 quando o prazo da rota se esgota"""
+        params = {"start_date": "2025-01-01", "end_date": "2025-01-31"}
+        response = client.get("/api/v1/sales/date-range", params=params)
+        assert response.status_code == 200
+        assert response.json()["total_sales"] == 20000
+
+        monkeypatch.setattr(sales_router, "DATE_RANGE_TIMEOUT", 1e-6)
+        response = client.get("/api/v1/sales/date-range", params=params)
+        assert response.status_code == 504
+        assert "tempo limite" in response.json()["detail"]
@@ -0,0 +1,189 @@
+"""
+Testes de limitação de taxa e descarte de carga por prioridade
+"""
+import asyncio
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rate_limit import PRIORITY_CLASSES, PriorityClass, RateLimitMiddleware, TokenBuckets, classify
+
+
+class FakeClock:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _scope(method: str, path: str, client: str = "10.0.0.1", headers=()):
+    return {"type": "http", "method": method, "path": path, "client": (client, 1234), "headers": list(headers)}
+
+
+async def _request(app, scope) -> dict:
+    """Executar uma requisição ASGI e devolver status e cabeçalhos"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return {"status": start["status"], "headers": {k.decode(): v.decode() for k, v in start["headers"]}}
+
+
+class BlockingApp:
+    """Aplicação que segura as requisições analíticas até ser liberada"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        if scope["path"].endswith("/summary"):
+            await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+class TestClassification(unittest.TestCase):
+    """
+    Testes da classificação de rotas
+    """
+
+    def test_priority_classes(self):
+        """Testar classes por método e caminho"""
+        self.assertEqual(classify("POST", "/api/v1/sales/"), "sales_write")
+        self.assertEqual(classify("DELETE", "/api/v1/sales/42"), "sales_write")
+        self.assertEqual(classify("GET", "/api/v1/sales/summary"), "analytics")
+        self.assertEqual(classify("GET", "/api/v1/sales/date-range"), "analytics")
+        self.assertEqual(classify("GET", "/api/v1/products/"), "read")
+        self.assertEqual(classify("PUT", "/api/v1/products/1"), "write")
+        self.assertIsNone(classify("GET", "/api/v1/sales/stream"))
+        self.assertIsNone(classify("GET", "/health"))
+
+
+class TestTokenBuckets(unittest.TestCase):
+    """
+    Testes do token bucket por cliente
+    """
+
+    def test_burst_refill_and_retry_after(self):
+        """Testar rajada, espera sugerida e reposição"""
+        clock = FakeClock()
+        buckets = TokenBuckets(rate=2, burst=3, clock=clock)
+        self.assertEqual([buckets.take("a") for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(buckets.take("a"), 0.5)
+        self.assertEqual(buckets.take("b"), 0.0)  # clientes independentes
+
+        clock.now = 1.0
+        self.assertEqual(buckets.take("a", cost=2), 0.0)
+        self.assertGreater(buckets.take("a"), 0)
+
+    def test_least_recent_client_evicted(self):
+        """Testar limite de clientes acompanhados"""
+        buckets = TokenBuckets(rate=1, burst=1, max_clients=2, clock=FakeClock())
+        buckets.take("a")
+        buckets.take("b")
+        buckets.take("a")
+        buckets.take("c")
+        self.assertEqual(len(buckets), 2)
+        self.assertEqual(buckets.take("b"), 0.0)  # "b" foi descartado e recomeça cheio
+
+
+class TestRateLimitMiddleware(unittest.TestCase):
+    """
+    Testes de admissão, 429 e 503
+    """
+
+    def test_token_exhaustion_returns_429(self):
+        """Testar 429 com Retry-After quando o cliente esgota as fichas"""
+        async def scenario():
+            app = RateLimitMiddleware(BlockingApp(), rate=1, burst=5, clock=FakeClock())
+            first = await _request(app, _scope("GET", "/api/v1/products/"))
+            # Consulta analítica custa 5 fichas: só restam 4
+            analytics = await _request(app, _scope("GET", "/api/v1/sales/total-value"))
+            other_client = await _request(app, _scope("GET", "/api/v1/sales/total-value", client="10.0.0.2"))
+            return first, analytics, other_client
+
+        first, analytics, other_client = asyncio.run(scenario())
+        self.assertEqual(first["status"], 200)
+        self.assertEqual(analytics["status"], 429)
+        self.assertEqual(analytics["headers"]["retry-after"], "1")
+        self.assertEqual(other_client["status"], 200)
+
+    def test_client_header(self):
+        """Testar identificação do cliente pelo cabeçalho do proxy"""
+        async def scenario():
+            app = RateLimitMiddleware(BlockingApp(), rate=1, burst=1, client_header="x-forwarded-for", clock=FakeClock())
+            results = []
+            for forwarded in ("1.1.1.1", "2.2.2.2, 10.0.0.9", "1.1.1.1"):
+                scope = _scope("GET", "/api/v1/products/", headers=[(b"x-forwarded-for", forwarded.encode())])
+                results.append((await _request(app, scope))["status"])
+            return results
+
+        self.assertEqual(asyncio.run(scenario()), [200, 200, 429])
+
+    def test_analytics_shed_while_sales_admitted(self):
+        """Testar que analíticas saturadas são descartadas sem bloquear POST /sales"""
+        classes = [
+            PRIORITY_CLASSES["sales_write"],
+            PRIORITY_CLASSES["read"],
+            PriorityClass("analytics", concurrency=2, queue_timeout=0.05, max_queue=1, share=0.5, cost=1),
+        ]
+
+        async def scenario():
+            inner = BlockingApp()
+            app = RateLimitMiddleware(inner, rate=1000, burst=1000, max_inflight=64, classes=classes)
+            held = [asyncio.create_task(_request(app, _scope("GET", "/api/v1/sales/summary"))) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            queued, overflow = (
+                asyncio.create_task(_request(app, _scope("GET", "/api/v1/sales/summary"))),
+                asyncio.create_task(_request(app, _scope("GET", "/api/v1/sales/summary"))),
+            )
+            sale = await _request(app, _scope("POST", "/api/v1/sales/"))
+            shed = await asyncio.gather(queued, overflow)
+            inner.release.set()
+            finished = await asyncio.gather(*held)
+            return sale, shed, finished
+
+        sale, shed, finished = asyncio.run(scenario())
+        self.assertEqual(sale["status"], 200)
+        # Um excedeu a fila (descarte imediato), o outro esgotou o orçamento de espera
+        self.assertEqual([r["status"] for r in shed], [503, 503])
+        self.assertTrue(all(r["headers"]["retry-after"] == "1" for r in shed))
+        self.assertEqual([r["status"] for r in finished], [200, 200])
+
+    def test_global_share_reserves_capacity_for_writes(self):
+        """Testar que leituras não ocupam a folga reservada às vendas"""
+        async def scenario():
+            inner = BlockingApp()
+            app = RateLimitMiddleware(inner, rate=1000, burst=1000, max_inflight=4)
+            held = [asyncio.create_task(_request(app, _scope("GET", "/api/v1/sales/summary"))) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            analytics = await _request(app, _scope("GET", "/api/v1/sales/summary"))   # 2 >= 4 * 0.5
+            read = await _request(app, _scope("GET", "/api/v1/products/"))            # 2 < 4 * 0.8
+            sale = await _request(app, _scope("POST", "/api/v1/sales/"))
+            inner.release.set()
+            await asyncio.gather(*held)
+            return analytics, read, sale, app.inflight
+
+        analytics, read, sale, inflight = asyncio.run(scenario())
+        self.assertEqual(analytics["status"], 503)
+        self.assertEqual(read["status"], 200)
+        self.assertEqual(sale["status"], 200)
+        self.assertEqual(inflight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
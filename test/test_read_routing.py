@@ -0,0 +1,105 @@
+"""
+Testes da separação de engines de leitura e escrita
+"""
+import tempfile
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import Base, RoutingSession, create_reader_engine, _enable_wal
+from app.models import User
+from main import app
+
+
+class TestReadRouting(unittest.TestCase):
+    """
+    Testes com duas conexões SQLite ao mesmo arquivo (escrita + mode=ro)
+    """
+
+    def setUp(self):
+        """Criar banco em arquivo temporário com engines separadas"""
+        self.tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{self.tmp.name}/routing.db"
+        self.writer = create_engine(url, connect_args={"check_same_thread": False})
+        _enable_wal(self.writer)
+        Base.metadata.create_all(bind=self.writer)
+        self.reader = create_reader_engine(url)
+
+        self.statements = {"writer": [], "reader": []}
+        for name, engine in (("writer", self.writer), ("reader", self.reader)):
+            event.listen(engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args, name=name: self.statements[name].append(statement.split()[0]))
+
+    def tearDown(self):
+        """Descartar engines e arquivo"""
+        self.writer.dispose()
+        self.reader.dispose()
+        self.tmp.cleanup()
+
+    def _session(self, **kw):
+        db = RoutingSession(writer=self.writer, reader=self.reader, **kw)
+        db.info["route_reads"] = True
+        return db
+
+    def test_reader_is_read_only(self):
+        """Testar que a engine de leitura rejeita escritas"""
+        with self.reader.connect() as conn:
+            with self.assertRaises(OperationalError):
+                conn.execute(text("INSERT INTO users (name, email) VALUES ('x', 'x@example.com')"))
+
+    def test_reads_routed_and_read_your_writes(self):
+        """Testar SELECT na leitura e permanência na escrita após escrever"""
+        db = self._session()
+        self.assertEqual(db.query(User).count(), 0)
+        self.assertEqual(self.statements["reader"], ["SELECT"])
+
+        db.add(User(name="Ana", email="ana@example.com"))
+        db.commit()
+        self.assertIn("INSERT", self.statements["writer"])
+        self.assertEqual(db.query(User).count(), 1)
+        self.assertEqual(self.statements["reader"], ["SELECT"])
+        db.close()
+
+    def test_without_read_your_writes(self):
+        """Testar volta à leitura após o commit quando read-your-writes está desligado"""
+        db = self._session(read_your_writes=False)
+        db.add(User(name="Ana", email="ana@example.com"))
+        db.flush()
+        # Escrita pendente: leitura precisa ver dados não confirmados
+        self.assertEqual(db.query(User).count(), 1)
+        self.assertEqual(self.statements["reader"], [])
+        db.commit()
+        self.assertEqual(db.query(User).count(), 1)
+        self.assertEqual(self.statements["reader"], ["SELECT"])
+        db.close()
+
+    def test_get_routes_use_reader(self):
+        """Testar get_db: GET lê da réplica, POST usa apenas a escrita"""
+        previous = database.SessionLocal
+        database.SessionLocal = sessionmaker(class_=RoutingSession, autoflush=False, writer=self.writer, reader=self.reader)
+        try:
+            client = TestClient(app)
+            response = client.post("/api/v1/users/", json={"name": "Ana", "email": "ana@example.com"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.statements["reader"], [])
+
+            writer_statements = len(self.statements["writer"])
+            self.assertEqual(len(client.get("/api/v1/users/").json()), 1)
+            self.assertEqual(len(client.get("/api/v1/sales/").json()), 0)
+            self.assertEqual(len(self.statements["writer"]), writer_statements)
+            self.assertGreaterEqual(len(self.statements["reader"]), 2)
+        finally:
+            database.SessionLocal = previous
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Testes do caminho de escrita enxuto de create_sale (RETURNING, sem refresh)
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Change, Product, Sale, User
+from app.schemas import SaleCreate
+from app.services import sales_service
+
+# Statements por venda: usuário, UPDATE de estoque, INSERT da venda e do
+# change feed; depois leitura e upsert dos dois sketches do dia. Os
+# SAVEPOINT/RELEASE das transações não entram na conta
+STATEMENTS_PER_SALE = 8
+
+_TRANSACTION_CONTROL = re.compile(r"(SAVEPOINT|RELEASE|ROLLBACK)\b")
+
+
+@pytest.fixture
+def db(db_session):
+    """Usuário, produto ativo e produto inativo"""
+    db_session.add(User(id=1, name="Ana", email="ana@example.com"))
+    db_session.add(Product(id=1, name="Caneta", price=2.5, stock_quantity=10))
+    db_session.add(Product(id=2, name="Lápis", price=1.0, stock_quantity=10, is_active=False))
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def statements(db_connection):
+    """Statements de dados executados durante o teste"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not _TRANSACTION_CONTROL.match(statement):
+            executed.append(statement)
+
+    event.listen(db_connection, "before_cursor_execute", record)
+    try:
+        yield executed
+    finally:
+        event.remove(db_connection, "before_cursor_execute", record)
+
+
+class TestSaleWritePath:
+    """
+    Testes de contagem de statements e consistência de create_sale
+    """
+
+    def test_statements_per_sale(self, db, statements):
+        """Testar que a venda não relê a venda nem o produto"""
+        sale = sales_service.create_sale(db, SaleCreate(user_id=1, product_id=1, quantity=3))
+        assert len(statements) == STATEMENTS_PER_SALE, statements
+        rereads = [s for s in statements if re.match(r"SELECT .*\bFROM (sales|products)\b", s, re.S)]
+        assert rereads == []
+
+        # Valores do servidor vieram pelo RETURNING e sobrevivem ao commit
+        statements.clear()
+        assert sale.id is not None
+        assert sale.sale_date is not None
+        assert sale.created_at is not None
+        assert sale.total_price == 7.5
+        assert statements == []
+
+        db.expire_all()
+        assert db.get(Product, 1).stock_quantity == 7
+        assert db.query(Sale).count() == 1
+        changes = db.query(Change).filter(Change.operation == "updated").all()
+        assert [(c.entity_id, c.operation) for c in changes] == [(1, "updated")]
+
+    def test_errors_leave_stock_untouched(self, db):
+        """Testar erros de usuário, produto inativo e estoque insuficiente"""
+        cases = [
+            (SaleCreate(user_id=99, product_id=1, quantity=1), "Usuário não encontrado"),
+            (SaleCreate(user_id=1, product_id=2, quantity=1), "Produto não encontrado ou inativo"),
+            (SaleCreate(user_id=1, product_id=1, quantity=11), "Estoque insuficiente. Disponível: 10"),
+        ]
+        for sale, message in cases:
+            with pytest.raises(ValueError) as ctx:
+                sales_service.create_sale(db, sale)
+            assert str(ctx.value) == message
+
+        db.expire_all()
+        assert db.get(Product, 1).stock_quantity == 10
+        assert db.query(Sale).count() == 0
+
+    def test_api_response_without_reload(self, client, db, statements):
+        """Testar resposta da API com campos gerados pelo banco"""
+        response = client.post("/api/v1/sales/", json={"user_id": 1, "product_id": 1, "quantity": 2, "unit_price": 2.0})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["total_price"] == 4.0
+        assert data["sale_date"] is not None
+        assert len(statements) == STATEMENTS_PER_SALE
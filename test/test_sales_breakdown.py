@@ -0,0 +1,113 @@
+"""
+Testes do breakdown de vendas agrupadas (/sales/breakdown)
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.models import Product, Sale, User
+
+
+@pytest.fixture
+def sales(db_session):
+    """Três produtos, dois usuários e vendas em maio de 2024"""
+    db_session.add_all([User(id=1, name="Ana", email="ana@example.com"),
+                        User(id=2, name="Bia", email="bia@example.com")])
+    db_session.add_all([Product(id=1, name="Livro", price=10.0, stock_quantity=100),
+                        Product(id=2, name="Caneta", price=2.0, stock_quantity=100),
+                        Product(id=3, name="Mochila", price=50.0, stock_quantity=100)])
+    rows = [
+        # (usuário, produto, quantidade, preço, dia)
+        (1, 1, 2, 10.0, 1), (2, 1, 1, 8.0, 2), (1, 2, 10, 2.0, 2),
+        (2, 2, 5, 2.0, 3), (1, 3, 1, 50.0, 3), (2, 3, 1, 50.0, 20),
+    ]
+    for user_id, product_id, quantity, price, day in rows:
+        db_session.add(Sale(user_id=user_id, product_id=product_id, quantity=quantity, unit_price=price,
+                            total_price=price * quantity, sale_date=datetime(2024, 5, day, 12, 0)))
+    db_session.commit()
+
+
+def _pages(client, **params):
+    """Percorrer todas as páginas seguindo next_cursor"""
+    groups, pages = [], 0
+    while True:
+        response = client.get("/api/v1/sales/breakdown", params=params)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        groups.extend(data["groups"])
+        pages += 1
+        if not data["has_more"]:
+            assert data["next_cursor"] is None
+            return groups, pages
+        params["cursor"] = data["next_cursor"]
+
+
+class TestSalesBreakdown:
+    """
+    Testes de agregação, nomes, ordenação e paginação por keyset
+    """
+
+    def test_group_by_product(self, client, sales):
+        """Testar totais, nomes e preço médio por produto"""
+        data = client.get("/api/v1/sales/breakdown", params={"group_by": "product"}).json()
+        assert data["groups"][0] == {
+            "key": 1, "name": "Livro", "total_sales": 2, "total_quantity": 3,
+            "total_value": 28.0, "average_unit_price": 9.33,
+        }
+        assert [group["name"] for group in data["groups"]] == ["Livro", "Caneta", "Mochila"]
+        assert not data["has_more"]
+
+    def test_group_by_user_and_day_with_period(self, client, sales):
+        """Testar agrupamento por usuário e por dia com período"""
+        params = {"start_date": "2024-05-02", "end_date": "2024-05-03"}
+        users = client.get("/api/v1/sales/breakdown", params={"group_by": "user", **params}).json()["groups"]
+        assert [(group["name"], group["total_sales"], group["total_value"]) for group in users] == [
+            ("Ana", 2, 70.0), ("Bia", 2, 18.0)
+        ]
+        days = client.get("/api/v1/sales/breakdown", params={"group_by": "day", **params}).json()["groups"]
+        assert [(group["key"], group["name"], group["total_quantity"]) for group in days] == [
+            ("2024-05-02", None, 11), ("2024-05-03", None, 6)
+        ]
+
+    @pytest.mark.parametrize("sort", ["key", "count", "quantity", "revenue"])
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_keyset_pages_match_full_listing(self, client, sales, sort, order):
+        """Testar que as páginas de um grupo somam a listagem completa, sem repetir grupos"""
+        params = {"group_by": "day", "sort": sort, "order": order}
+        full = client.get("/api/v1/sales/breakdown", params=params).json()["groups"]
+        paged, pages = _pages(client, limit=1, **params)
+        assert paged == full
+        assert pages == len(full)
+
+    def test_sort_by_revenue_with_ties(self, client, sales):
+        """Testar ordenação por receita com desempate pela chave"""
+        groups, _ = _pages(client, group_by="product", sort="revenue", order="desc", limit=2)
+        assert [group["key"] for group in groups] == [3, 2, 1]
+        groups, _ = _pages(client, group_by="day", sort="count", order="desc", limit=1)
+        assert [group["key"] for group in groups] == ["2024-05-03", "2024-05-02", "2024-05-20", "2024-05-01"]
+
+    def test_invalid_parameters(self, client):
+        """Testar cursor, agrupamento e período inválidos"""
+        assert client.get("/api/v1/sales/breakdown", params={"cursor": "nao-e-cursor"}).status_code == 400
+        assert client.get("/api/v1/sales/breakdown", params={"group_by": "category"}).status_code == 422
+        response = client.get("/api/v1/sales/breakdown", params={"start_date": "2024-05-10", "end_date": "2024-05-01"})
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("group_by, index", [
+        ("product_id", "ix_sales_product_date"),
+        ("user_id", "ix_sales_user_date"),
+    ])
+    def test_uses_covering_indexes(self, db_session, group_by, index):
+        """Testar que o agrupamento lê apenas o índice composto"""
+        plan = " ".join(row[3] for row in db_session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN SELECT {group_by}, count(id), sum(quantity), sum(total_price) "
+            f"FROM sales GROUP BY {group_by}"
+        ))
+        assert f"COVERING INDEX {index}" in plan
+        plan = " ".join(row[3] for row in db_session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN SELECT {group_by}, count(id), sum(quantity), sum(total_price) "
+            f"FROM sales WHERE sale_date >= '2024-05-01' AND sale_date < '2024-05-02' GROUP BY {group_by}"
+        ))
+        assert "COVERING INDEX" in plan
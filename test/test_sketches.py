@@ -0,0 +1,170 @@
+"""
+Testes dos sketches HyperLogLog / t-digest e do endpoint de estatísticas aproximadas
+
+Os testes do endpoint usam o banco em memória das fixtures de `conftest.py`.
+"""
+import random
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import true
+from sqlalchemy.exc import OperationalError
+
+from app.models import Sale as SaleModel, SaleSketch as SaleSketchModel
+from app.services import sketch_service
+from app.sketches import HyperLogLog, TDigest
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """
+    Testes de cardinalidade aproximada
+    """
+
+    def test_estimate_within_bounds(self):
+        """Testar estimativa dentro de 3 erros padrão"""
+        sketch = HyperLogLog()
+        for user_id in range(20000):
+            sketch.add(user_id)
+        error = abs(sketch.estimate() - 20000) / 20000
+        self.assertLess(error, 3 * sketch.standard_error)
+
+    def test_small_cardinality_and_duplicates(self):
+        """Testar contagem pequena com repetições"""
+        sketch = HyperLogLog()
+        for _ in range(10):
+            for user_id in range(5):
+                sketch.add(user_id)
+        self.assertEqual(round(sketch.estimate()), 5)
+
+    def test_merge_and_serialization(self):
+        """Testar união e ida/volta pelo blob"""
+        a, b, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            a.add(i)
+            union.add(i)
+        for i in range(2000, 6000):
+            b.add(i)
+            union.add(i)
+        merged = HyperLogLog.from_bytes(a.to_bytes()).merge(HyperLogLog.from_bytes(b.to_bytes()))
+        self.assertEqual(merged.registers, union.registers)
+        self.assertLess(len(a.to_bytes()), a.m)
+
+
+class TestTDigest(unittest.TestCase):
+    """
+    Testes de percentis aproximados
+    """
+
+    def test_quantiles_uniform(self):
+        """Testar percentis de distribuição uniforme"""
+        rng = random.Random(42)
+        digest = TDigest()
+        values = [rng.uniform(0, 1000) for _ in range(20000)]
+        for value in values:
+            digest.add(value)
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(digest.quantile(q), exact, delta=1000 * (digest.rank_error(q) + 0.005))
+
+    def test_merge_and_serialization(self):
+        """Testar mesclagem de digests serializados"""
+        parts = [TDigest() for _ in range(4)]
+        for i in range(10000):
+            parts[i % 4].add(i)
+        merged = TDigest()
+        for part in parts:
+            merged.merge(TDigest.from_bytes(part.to_bytes()))
+        self.assertEqual(merged.count, 10000)
+        self.assertEqual((merged.min, merged.max), (0, 9999))
+        self.assertAlmostEqual(merged.quantile(0.5), 5000, delta=100)
+
+    def test_merge_small_daily_digests(self):
+        """Testar percentis exatos ao mesclar digests pequenos (um por dia)"""
+        days = [range(1, 41), range(1001, 1041), range(501, 521)]
+        merged = TDigest()
+        for values in reversed(days):
+            digest = TDigest()
+            for value in values:
+                digest.add(value)
+            merged.merge(TDigest.from_bytes(digest.to_bytes()))
+        values = sorted(value for day in days for value in day)
+        for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(merged.quantile(q), exact, delta=1.0)
+        restored = TDigest.from_bytes(merged.to_bytes())
+        self.assertEqual(restored.centroids, sorted(restored.centroids))
+
+
+class TestApproxStatsEndpoint:
+    """
+    Testes de GET /api/v1/sales/stats/approx
+    """
+
+    def test_stats_from_created_sales(self, client):
+        """Testar sketches atualizados por create_sale"""
+        user_ids = [
+            client.post("/api/v1/users/", json={"name": f"U{i}", "email": f"u{i}@example.com"}).json()["id"]
+            for i in range(3)
+        ]
+        product_id = client.post("/api/v1/products/", json={"name": "Livro", "price": 10.0, "stock_quantity": 100}).json()["id"]
+        for user_id in user_ids + user_ids[:1]:
+            response = client.post("/api/v1/sales/", json={"user_id": user_id, "product_id": product_id, "quantity": 1})
+            assert response.status_code == 200
+
+        stats = client.get("/api/v1/sales/stats/approx").json()
+        assert stats["sales_count"] == 4
+        assert stats["distinct_buyers"]["estimate"] == 3
+        assert stats["order_value_percentiles"]["p50"]["value"] == 10.0
+        assert "max_rank_error" in stats["order_value_percentiles"]["p99"]
+
+        stats = client.get(f"/api/v1/sales/stats/approx?product_id={product_id}&percentiles=25").json()
+        assert stats["sales_count"] == 4
+        assert "p25" in stats["order_value_percentiles"]
+
+    def test_invalid_percentiles(self, client):
+        """Testar validação de percentis"""
+        response = client.get("/api/v1/sales/stats/approx?percentiles=150")
+        assert response.status_code == 400
+
+
+class TestSketchRecovery:
+    """
+    Testes da recuperação de buckets quando a escrita do sketch falha
+    """
+
+    def test_failed_sketch_write_is_rebuilt(self, client, db_session, monkeypatch):
+        """Testar venda gravada, bucket marcado e contagens refeitas pela manutenção"""
+        user_id = client.post("/api/v1/users/", json={"name": "Ana", "email": "ana@example.com"}).json()["id"]
+        product_id = client.post("/api/v1/products/", json={"name": "Livro", "price": 10.0, "stock_quantity": 100}).json()["id"]
+        sale = {"user_id": user_id, "product_id": product_id, "quantity": 1}
+        assert client.post("/api/v1/sales/", json=sale).status_code == 200
+
+        def failing_record_sale(db, sale):
+            raise OperationalError("INSERT INTO sales_sketches", {}, Exception("database is locked"))
+
+        with monkeypatch.context() as patch:
+            patch.setattr(sketch_service, "record_sale", failing_record_sale)
+            for _ in range(2):
+                assert client.post("/api/v1/sales/", json=sale).status_code == 200
+
+        assert db_session.query(SaleModel).count() == 3
+        dirty = db_session.query(SaleSketchModel).filter(SaleSketchModel.dirty == true()).count()
+        assert dirty == 2
+        assert client.get("/api/v1/sales/stats/approx").json()["sales_count"] == 1
+
+        assert sketch_service.repair_dirty(db_session) == 2
+        db_session.commit()
+        assert db_session.query(SaleSketchModel).filter(SaleSketchModel.dirty == true()).count() == 0
+        stats = client.get(f"/api/v1/sales/stats/approx?product_id={product_id}").json()
+        assert stats["sales_count"] == 3
+        assert stats["distinct_buyers"]["estimate"] == 1
+        assert client.get("/api/v1/sales/stats/approx").json()["sales_count"] == 3
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Testes da seleção de campos nas listagens (`?fields=`)
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import sparse_fields
+from app.models import Product as ProductModel, Sale as SaleModel, User as UserModel
+from app.schemas import Product, Sale
+
+
+@pytest.fixture
+def catalog(db_session):
+    """Dois produtos com descrição longa e uma venda"""
+    db_session.add(UserModel(id=1, name="Ana", email="ana@example.com"))
+    db_session.add_all([
+        ProductModel(id=1, name="Livro", description="x" * 5000, price=10.0, stock_quantity=5),
+        ProductModel(id=2, name="Caneta", description="y" * 5000, price=2.0, stock_quantity=50),
+    ])
+    db_session.add(SaleModel(user_id=1, product_id=1, quantity=2, unit_price=10.0, total_price=20.0,
+                             sale_date=datetime(2024, 5, 1, 12, 0)))
+    db_session.commit()
+
+
+@pytest.fixture
+def statements(db_connection):
+    """SELECTs executados durante o teste"""
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            executed.append(statement)
+
+    event.listen(db_connection, "before_cursor_execute", capture)
+    try:
+        yield executed
+    finally:
+        event.remove(db_connection, "before_cursor_execute", capture)
+
+
+class TestSparseFields:
+    """
+    Testes de validação, consulta reduzida e serialização
+    """
+
+    def test_products_selected_fields(self, client, catalog, statements):
+        """Testar resposta e SELECT apenas com os campos pedidos (id sempre incluído)"""
+        response = client.get("/api/v1/products/", params={"fields": "price,name"})
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 1, "name": "Livro", "price": 10.0},
+            {"id": 2, "name": "Caneta", "price": 2.0},
+        ]
+        select_products = [statement for statement in statements if "FROM products" in statement]
+        assert select_products
+        assert all("description" not in statement for statement in select_products)
+
+    def test_products_without_fields_unchanged(self, client, catalog):
+        """Testar listagem completa sem `fields`"""
+        products = client.get("/api/v1/products/").json()
+        assert set(products[0]) == set(Product.model_fields)
+        assert len(products[0]["description"]) == 5000
+
+    def test_sales_selected_fields(self, client, catalog, statements):
+        """Testar vendas com id, total_price e sale_date"""
+        response = client.get("/api/v1/sales/", params={"fields": "id,total_price,sale_date"})
+        assert response.status_code == 200
+        assert response.json() == [{"id": 1, "total_price": 20.0, "sale_date": "2024-05-01T12:00:00"}]
+        select_sales = [statement for statement in statements if "FROM sales" in statement]
+        assert all("unit_price" not in statement for statement in select_sales)
+
+    def test_unknown_field_rejected(self, client):
+        """Testar campo fora da lista permitida"""
+        response = client.get("/api/v1/products/", params={"fields": "name,password"})
+        assert response.status_code == 400
+        assert "password" in response.json()["detail"]
+        assert client.get("/api/v1/sales/", params={"fields": "__class__"}).status_code == 400
+
+    def test_etag_depends_on_fields(self, client, catalog):
+        """Testar ETag distinto por seleção e 304 para a mesma seleção"""
+        narrow = client.get("/api/v1/products/", params={"fields": "name"})
+        full = client.get("/api/v1/products/")
+        assert narrow.headers["etag"] != full.headers["etag"]
+        again = client.get("/api/v1/products/", params={"fields": "name"},
+                           headers={"If-None-Match": narrow.headers["etag"]})
+        assert again.status_code == 304
+
+    def test_models_cached_per_selection(self):
+        """Testar reuso do modelo reduzido para a mesma combinação de campos"""
+        fields = sparse_fields.parse(" name , price,name", Product)
+        # Ordem do schema completo, sem repetições
+        assert fields == ("name", "price", "id")
+        assert sparse_fields.model_for(Product, fields) is sparse_fields.model_for(
+            Product, sparse_fields.parse("price,name", Product)
+        )
+        assert set(sparse_fields.model_for(Sale, ("id",)).model_fields) == {"id"}
+        assert sparse_fields.parse("", Product) is None
@@ -0,0 +1,133 @@
+"""
+Testes do perfil de inicialização e do aquecimento
+"""
+import json
+import subprocess
+import tempfile
+import unittest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import db_pool, startup
+from app.database import Base
+from app.models import Product
+from app.services import product_service, sales_service
+from app.warmup import warm_up
+
+# Sobe a aplicação com lifespan (TestClient como contexto) e imprime o relatório
+LIFESPAN_SCRIPT = """
+import json
+import main
+from fastapi.testclient import TestClient
+from app.database import Base, engine
+Base.metadata.create_all(bind=engine)
+with TestClient(main.app) as client:
+    print(json.dumps(client.get("/health/startup").json()))
+"""
+
+
+class TestStartupProfile(unittest.TestCase):
+    """
+    Testes dos marcos e da medição de imports
+    """
+
+    def test_import_timer_records_new_modules(self):
+        """Testar medição de um import novo e restauração do __import__"""
+        import builtins
+        module = "startup_probe_module"
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, f"{module}.py"), "w") as source:
+                source.write("import time\ntime.sleep(0.01)\n")
+            sys.path.insert(0, tmp)
+            timer = startup.ImportTimer()
+            original = builtins.__import__
+            timer.install()
+            try:
+                __import__(module)
+            finally:
+                timer.uninstall()
+                sys.path.remove(tmp)
+                sys.modules.pop(module, None)
+        self.assertIs(builtins.__import__, original)
+        self.assertIn(module, timer.records)
+        cumulative, own = timer.records[module]
+        self.assertGreaterEqual(cumulative, own)
+        self.assertGreaterEqual(own, 0.01)
+        self.assertEqual(timer.top(1)[0]["module"], module)
+
+    def test_process_age(self):
+        """Testar idade do processo no Linux"""
+        age = startup.process_age()
+        if age is None:
+            self.skipTest("/proc indisponível")
+        self.assertGreater(age, 0)
+
+    def test_lifespan_report_with_profile(self):
+        """Testar relatório após o lifespan, com imports medidos e warm-up"""
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/startup.db",
+                STARTUP_PROFILE="true",
+                SALES_ARCHIVE_DIR=os.path.join(tmp, "archive"),
+            )
+            output = subprocess.run(
+                [sys.executable, "-c", LIFESPAN_SCRIPT], cwd=ROOT, env=env,
+                capture_output=True, text=True, timeout=120, check=True,
+            ).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        phases = report["phases"]
+        self.assertLess(phases["app_created"], phases["warmup_start"])
+        self.assertLess(phases["warmup_end"], phases["ready"])
+        self.assertGreater(report["process_age_at_ready"], phases["ready"] * 0.5)
+        modules = {item["module"] for item in report["imports"]}
+        self.assertTrue(modules & {"fastapi", "sqlalchemy"})
+        self.assertNotIn("numpy", modules)
+
+
+class TestWarmUp(unittest.TestCase):
+    """
+    Testes do aquecimento das consultas quentes
+    """
+
+    def setUp(self):
+        """Criar banco em memória instrumentado"""
+        self.label = self.id()
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        db_pool.instrument_engine(self.engine, self.label)
+        self.Session = sessionmaker(bind=self.engine)
+        db = self.Session()
+        db.add(Product(id=1, name="Caneta", price=2.5, stock_quantity=10))
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        """Descartar engine"""
+        db_pool.detectors.pop(self.label, None)
+        self.engine.dispose()
+
+    def test_hot_queries_compiled_before_first_request(self):
+        """Testar que as consultas quentes não compilam de novo após o aquecimento"""
+        results = warm_up(self.Session)
+        self.assertEqual({name: r["error"] for name, r in results.items()}, {name: None for name in results})
+
+        misses = db_pool.statement_cache_stats(self.label)["cache_miss"]
+        db = self.Session()
+        self.assertEqual(product_service.get_product(db, 1).name, "Caneta")
+        product_service.get_products(db, skip=0, limit=10)
+        sales_service.get_sale(db, 1)
+        db.close()
+        self.assertEqual(db_pool.statement_cache_stats(self.label)["cache_miss"], misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Testes do cache de statements pré-construídos dos serviços
+"""
+import unittest
+import sys
+import os
+from datetime import date
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import db_pool
+from app.database import Base
+from app.schemas import SaleCreate
+from app.services import product_service, sales_service
+from app.models import Product, User
+
+
+class TestStatementCache(unittest.TestCase):
+    """
+    Testes de acertos no cache de compilação
+    """
+
+    def setUp(self):
+        """Criar banco em memória instrumentado"""
+        self.label = self.id()
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        db_pool.instrument_engine(self.engine, self.label)
+        self.db = sessionmaker(bind=self.engine)()
+        self.db.add(User(id=1, name="Ana", email="ana@example.com"))
+        self.db.add_all([Product(id=i, name=f"P{i}", price=1.0, stock_quantity=50) for i in range(1, 4)])
+        self.db.commit()
+
+    def tearDown(self):
+        """Descartar engine"""
+        db_pool.detectors.pop(self.label, None)
+        self.db.close()
+        self.engine.dispose()
+
+    def _calls(self, product_id: int):
+        product_service.get_product(self.db, product_id)
+        product_service.get_product_version(self.db, product_id)
+        product_service.get_products(self.db, skip=product_id, limit=10)
+        product_service.get_products_by_name(self.db, f"P{product_id}")
+        sale = sales_service.create_sale(self.db, SaleCreate(user_id=1, product_id=product_id, quantity=1))
+        sales_service.get_sale(self.db, sale.id)
+        sales_service.get_sales_by_date_range(self.db, date(2024, 1, product_id), date.today())
+
+    def test_repeated_calls_hit_cache(self):
+        """Testar que, após o aquecimento, valores diferentes não geram novas compilações"""
+        self._calls(1)
+        warm = db_pool.statement_cache_stats(self.label)
+        self.assertGreater(warm["cache_miss"], 0)
+
+        for product_id in (2, 3):
+            self._calls(product_id)
+        stats = db_pool.statement_cache_stats(self.label)
+        self.assertEqual(stats["cache_miss"], warm["cache_miss"])
+        self.assertGreater(stats["cache_hit"], warm["cache_hit"])
+        self.assertGreater(stats["hit_ratio"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
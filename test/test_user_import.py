@@ -0,0 +1,80 @@
+"""
+Testes da importação de usuários em lote
+
+Usa o banco em memória das fixtures de `conftest.py`.
+"""
+import asyncio
+import json
+
+from sqlalchemy import event
+
+from app.services import user_service
+
+
+class TestUserImport:
+    """
+    Testes para POST /api/v1/users/bulk
+    """
+
+    def test_ndjson_import_with_duplicates(self, client, db_connection):
+        """Testar deduplicação no arquivo e contra a base, com lotes pequenos"""
+        client.post("/api/v1/users/", json={"name": "Antigo", "email": "u3@example.com"})
+        lines = [json.dumps({"name": f"U{i}", "email": f"u{i}@example.com"}) for i in range(10)]
+        lines += [json.dumps({"name": "Repetido", "email": "u0@example.com"}), "{quebrado", json.dumps({"name": "Sem email"})]
+
+        statements = []
+        event.listen(db_connection, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement.split()[0]))
+        response = client.post(
+            "/api/v1/users/bulk?chunk_size=4",
+            content="\n".join(lines).encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert result["processed"] == 13
+        assert result["inserted"] == 9
+        assert (result["existing"], result["duplicates"], result["invalid"]) == (1, 1, 2)
+        assert result["chunks"] == 3
+        assert {issue["line"] for issue in result["issues"]} == {4, 11, 12, 13}
+        # Uma consulta de emails existentes por lote, sem SELECT por linha
+        assert statements.count("SELECT") == 3
+
+        users = client.get("/api/v1/users/?limit=100").json()
+        assert len(users) == 10
+
+        changes = client.get("/api/v1/changes?entity=user").json()
+        assert len(changes["changes"]) == 10
+
+    def test_flush_runs_outside_event_loop(self, client, monkeypatch):
+        """Testar gravação dos lotes no threadpool, sem bloquear o event loop"""
+        flush = user_service.UserImporter.flush
+        on_loop = []
+
+        def recording_flush(importer):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            flush(importer)
+
+        monkeypatch.setattr(user_service.UserImporter, "flush", recording_flush)
+        lines = [json.dumps({"name": f"U{i}", "email": f"u{i}@example.com"}) for i in range(5)]
+        response = client.post("/api/v1/users/bulk?chunk_size=2", content="\n".join(lines).encode())
+        assert response.json()["inserted"] == 5
+        # Dois lotes cheios e o restante em finish()
+        assert on_loop == [False, False, False]
+
+    def test_csv_import(self, client):
+        """Testar importação CSV pelo Content-Type"""
+        body = "email,name\r\na@example.com,\"Silva, Ana\"\r\nb@example.com,Bruno\r\n"
+        response = client.post("/api/v1/users/bulk", content=body.encode(), headers={"Content-Type": "text/csv"})
+        assert response.json()["inserted"] == 2
+        names = sorted(user["name"] for user in client.get("/api/v1/users/").json())
+        assert names == ["Bruno", "Silva, Ana"]
+
+    def test_csv_without_required_header(self, client):
+        """Testar rejeição de cabeçalho CSV inválido"""
+        response = client.post("/api/v1/users/bulk?format=csv", content=b"nome,mail\nx,y\n")
+        assert response.status_code == 400